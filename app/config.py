@@ -141,6 +141,24 @@ class ConfigClientDirectory(BaseModel):
         description="Delay after directory marked as to be deleted before permanent cleanup",
     )
 
+    max_parallel_directories: int = Field(
+        default=1,
+        ge=1,
+        description="Maximum number of directories that are updated concurrently",
+    )
+
+    http_pool_size: int = Field(
+        default=10,
+        ge=1,
+        description="Maximum number of kept-alive connections per FHIR server origin",
+    )
+
+    directories_provider_max_parallel_pages: int = Field(
+        default=1,
+        ge=1,
+        description="Maximum number of directory provider search pages that are fetched concurrently",
+    )
+
     @field_validator("timeout", mode="before")
     def validate_timeout(cls, v: Any) -> int:
         if v in (None, "", " "):
@@ -153,6 +171,24 @@ class ConfigClientDirectory(BaseModel):
             return 0.5
         return float(v)
 
+    @field_validator("max_parallel_directories", mode="before")
+    def validate_max_parallel_directories(cls, v: Any) -> int:
+        if v in (None, "", " "):
+            return 1
+        return int(v)
+
+    @field_validator("http_pool_size", mode="before")
+    def validate_http_pool_size(cls, v: Any) -> int:
+        if v in (None, "", " "):
+            return 10
+        return int(v)
+
+    @field_validator("directories_provider_max_parallel_pages", mode="before")
+    def validate_directories_provider_max_parallel_pages(cls, v: Any) -> int:
+        if v in (None, "", " "):
+            return 1
+        return int(v)
+
     @field_validator("ignore_client_directory_after_failed_attempts_threshold", mode="before")
     def validate_ignore_client_directory_after_failed_attempts_threshold(cls, v: Any) -> Any:
         if v in (None, "", " "):
@@ -244,6 +280,46 @@ class ConfigExternalCache(BaseModel):
     check_hostname: bool = Field(default=True)
     object_ttl: int = Field(default=600)
     default_cache_namespace: str = Field(default="mcsd")
+    compress_nodes: bool = Field(default=False)
+    max_connections: int = Field(default=20, ge=1)
+    health_check_interval: int = Field(default=30, ge=1)
+    l1_max_nodes: int = Field(
+        default=10000,
+        ge=0,
+        description="Maximum number of nodes kept in process in front of the external cache, 0 to disable",
+    )
+    in_memory_max_nodes: int = Field(
+        default=0,
+        ge=0,
+        description="Maximum number of nodes in the in memory cache, 0 for no limit",
+    )
+    in_memory_max_bytes: int = Field(
+        default=0,
+        ge=0,
+        description="Approximate maximum size in bytes of the in memory cache, 0 for no limit",
+    )
+    in_memory_spill_dir: str | None = Field(
+        default=None,
+        description="Directory to which nodes evicted from the in memory cache are written",
+    )
+
+    @field_validator("l1_max_nodes", mode="before")
+    def validate_l1_max_nodes(cls, v: Any) -> int:
+        if v in (None, "", " "):
+            return 10000
+        return int(v)
+
+    @field_validator("in_memory_max_nodes", "in_memory_max_bytes", mode="before")
+    def validate_in_memory_limits(cls, v: Any) -> int:
+        if v in (None, "", " "):
+            return 0
+        return int(v)
+
+    @field_validator("in_memory_spill_dir", mode="before")
+    def validate_in_memory_spill_dir(cls, v: Any) -> str | None:
+        if v in (None, "", " "):
+            return None
+        return str(v)
 
 
 class ConfigTelemetry(BaseModel):
@@ -294,6 +370,141 @@ class ConfigMcsd(BaseModel):
     mtls_client_key_path: str | None = Field(default=None)
     verify_ca: str | bool = Field(default=True)
     check_capability_statement: bool = Field(default=False, description="Whether to check the CapabilityStatement of client directories")
+    capability_statement_cache_ttl_in_sec: int = Field(
+        default=3600,
+        ge=0,
+        description="Number of seconds the outcome of a CapabilityStatement check is cached per directory endpoint, 0 disables caching",
+    )
+    capability_statement_timeout_in_sec: int = Field(
+        default=5,
+        ge=1,
+        description="Timeout of a CapabilityStatement request, the request is not retried",
+    )
+    max_parallel_capability_checks: int = Field(
+        default=8,
+        ge=1,
+        description="Maximum number of directory CapabilityStatements that are checked concurrently",
+    )
+    max_parallel_resource_types: int = Field(
+        default=1,
+        ge=1,
+        description="Maximum number of independent resource types of a directory that are updated concurrently",
+    )
+    directory_requests_per_second: float = Field(
+        default=0,
+        ge=0,
+        description="Maximum number of requests per second to a single directory, 0 keeps the fixed pause of 0.5 seconds after every resource type",
+    )
+    history_prefetch_depth: int = Field(
+        default=0,
+        ge=0,
+        description="Number of _history pages fetched ahead while the current page is processed, 0 disables prefetching",
+    )
+    history_stream_window: int = Field(
+        default=0,
+        ge=0,
+        description="Stream _history pages and process them in windows of at most this many entries, 0 reads every page as a whole",
+    )
+    max_bundle_entries: int = Field(
+        default=1,
+        ge=1,
+        description="Maximum number of entries in a transaction bundle sent to the update client, independent groups are combined up to this limit",
+    )
+    max_bundle_bytes: int = Field(
+        default=0,
+        ge=0,
+        description="Maximum approximate size in bytes of a transaction bundle sent to the update client, 0 disables the limit",
+    )
+    use_async_client: bool = Field(
+        default=False,
+        description="Fetch directory resources with the asyncio client when updating through the API",
+    )
+    verify_update_client: bool = Field(
+        default=False,
+        description="Read the current content from the update client instead of trusting the content hash stored in the resource map",
+    )
+    persistent_node_state: bool = Field(
+        default=False,
+        description="Resolve references to resources that did not change since the previous sync from the resource maps",
+    )
+
+    @field_validator("capability_statement_cache_ttl_in_sec", mode="before")
+    def validate_capability_statement_cache_ttl_in_sec(cls, v: Any) -> int:
+        if v in (None, "", " "):
+            return 3600
+        return int(v)
+
+    @field_validator("capability_statement_timeout_in_sec", mode="before")
+    def validate_capability_statement_timeout_in_sec(cls, v: Any) -> int:
+        if v in (None, "", " "):
+            return 5
+        return int(v)
+
+    @field_validator("max_parallel_capability_checks", mode="before")
+    def validate_max_parallel_capability_checks(cls, v: Any) -> int:
+        if v in (None, "", " "):
+            return 8
+        return int(v)
+
+    @field_validator("max_parallel_resource_types", mode="before")
+    def validate_max_parallel_resource_types(cls, v: Any) -> int:
+        if v in (None, "", " "):
+            return 1
+        return int(v)
+
+    @field_validator("directory_requests_per_second", mode="before")
+    def validate_directory_requests_per_second(cls, v: Any) -> float:
+        if v in (None, "", " "):
+            return 0
+        return float(v)
+
+    @field_validator("history_prefetch_depth", mode="before")
+    def validate_history_prefetch_depth(cls, v: Any) -> int:
+        if v in (None, "", " "):
+            return 0
+        return int(v)
+
+    @field_validator("history_stream_window", mode="before")
+    def validate_history_stream_window(cls, v: Any) -> int:
+        if v in (None, "", " "):
+            return 0
+        return int(v)
+
+    @field_validator("max_bundle_entries", mode="before")
+    def validate_max_bundle_entries(cls, v: Any) -> int:
+        if v in (None, "", " "):
+            return 1
+        return int(v)
+
+    @field_validator("max_bundle_bytes", mode="before")
+    def validate_max_bundle_bytes(cls, v: Any) -> int:
+        if v in (None, "", " "):
+            return 0
+        return int(v)
+
+    @field_validator("use_async_client", mode="before")
+    def validate_use_async_client(cls, v: Any) -> bool:
+        if v in (None, "", " "):
+            return False
+        if isinstance(v, str):
+            return v.lower() in ("yes", "true", "t", "1")
+        return bool(v)
+
+    @field_validator("persistent_node_state", mode="before")
+    def validate_persistent_node_state(cls, v: Any) -> bool:
+        if v in (None, "", " "):
+            return False
+        if isinstance(v, str):
+            return v.lower() in ("yes", "true", "t", "1")
+        return bool(v)
+
+    @field_validator("verify_update_client", mode="before")
+    def validate_verify_update_client(cls, v: Any) -> bool:
+        if v in (None, "", " "):
+            return False
+        if isinstance(v, str):
+            return v.lower() in ("yes", "true", "t", "1")
+        return bool(v)
 
     @field_validator("request_count", mode="before")
     def validate_request_count(cls, v: Any) -> int:
@@ -1,4 +1,5 @@
 from app.services.api.fhir_api import FhirApiConfig
+from app.services.api.session_registry import setup_session_registry
 from app.services.entity.directory_info_service import DirectoryInfoService
 from app.services.directory_provider.factory import DirectoryProviderFactory
 from app.services.directory_provider.directory_provider import DirectoryProvider
@@ -19,6 +20,8 @@ from app.stats import get_stats
 def container_config(binder: inject.Binder) -> None:
     config = get_config()
 
+    setup_session_registry(pool_size=config.client_directory.http_pool_size)
+
     db = Database(dsn=config.database.dsn)
     binder.bind(Database, db)
 
@@ -54,10 +57,20 @@ def container_config(binder: inject.Binder) -> None:
         verify_ca=config.mcsd.verify_ca,
     )
     cache_provider = CacheProvider(config=config.external_cache)
+    binder.bind(CacheProvider, cache_provider)
     update_service = UpdateClientService(
         api_config=api_config,
         resource_map_service=resource_map_service,
         cache_provider=cache_provider,
+        max_parallel_resource_types=config.mcsd.max_parallel_resource_types,
+        directory_requests_per_second=config.mcsd.directory_requests_per_second,
+        history_prefetch_depth=config.mcsd.history_prefetch_depth,
+        history_stream_window=config.mcsd.history_stream_window,
+        use_async_client=config.mcsd.use_async_client,
+        max_bundle_entries=config.mcsd.max_bundle_entries,
+        max_bundle_bytes=config.mcsd.max_bundle_bytes,
+        verify_update_client=config.mcsd.verify_update_client,
+        persistent_node_state=config.mcsd.persistent_node_state,
     )
     binder.bind(UpdateClientService, update_service)
 
@@ -72,6 +85,7 @@ def container_config(binder: inject.Binder) -> None:
         mark_client_directory_as_deleted_after_lrza_delete=config.client_directory.mark_client_directory_as_deleted_after_lrza_delete,
         ignore_client_directory_after_success_timeout_seconds=config.client_directory.ignore_client_directory_after_success_timeout_in_sec,  # type: ignore
         ignore_client_directory_after_failed_attempts_threshold=config.client_directory.ignore_client_directory_after_failed_attempts_threshold,
+        max_parallel_directories=config.client_directory.max_parallel_directories,
     )
 
     update_scheduler = Scheduler(
@@ -104,6 +118,11 @@ def get_database() -> Database:
 def get_directory_provider() -> DirectoryProvider:
     return inject.instance(DirectoryProvider)  # type: ignore
 
+
+def get_cache_provider() -> CacheProvider:
+    return inject.instance(CacheProvider)
+
+
 def get_resource_map_service() -> ResourceMapService:
     return inject.instance(ResourceMapService)
 
@@ -39,6 +39,12 @@ class ResourceMap(Base):
     update_client_resource_id: Mapped[str] = mapped_column(
         "update_client_resource_id", String, nullable=False, unique=True
     )
+    content_hash: Mapped[str | None] = mapped_column(
+        "content_hash", String, nullable=True
+    )
+    directory_version_id: Mapped[str | None] = mapped_column(
+        "directory_version_id", String, nullable=True
+    )
     last_update: Mapped[datetime] = mapped_column(
         "last_update",
         TIMESTAMP(timezone=True),
@@ -1,9 +1,11 @@
 from collections.abc import Sequence
-from typing import Any
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
 import logging
-from uuid import UUID
+from uuid import UUID, uuid4
 
-from sqlalchemy import exists, select
+from sqlalchemy import bindparam, exists, func, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import DatabaseError
 from app.db.decorator import repository
 from app.db.entities.resource_map import ResourceMap
@@ -11,6 +13,18 @@ from app.db.repositories.repository_base import RepositoryBase
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of rows per bulk statement, keeps the number of bound parameters well below
+# the limits of the supported databases
+BULK_CHUNK_SIZE = 500
+
+# Insert statements with ON CONFLICT support per dialect, other dialects upsert row by row
+ON_CONFLICT_INSERTS: Dict[str, Callable[..., Any]] = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+ResourceMapKey = Tuple[str, str, str]
+
 
 @repository(ResourceMap)
 class ResourceMapRepository(RepositoryBase):
@@ -85,6 +99,129 @@ class ResourceMapRepository(RepositoryBase):
             logging.error(f"Failed to delete organization {data.id}: {e}")
             raise
 
+    def get_many(self, keys: List[ResourceMapKey]) -> Sequence[ResourceMap]:
+        """
+        Returns the resource maps with the given (directory_id, resource_type, directory_resource_id) keys.
+        """
+        results: List[ResourceMap] = []
+        for i in range(0, len(keys), BULK_CHUNK_SIZE):
+            stmt = select(ResourceMap).where(
+                tuple_(
+                    ResourceMap.directory_id,
+                    ResourceMap.resource_type,
+                    ResourceMap.directory_resource_id,
+                ).in_(keys[i : i + BULK_CHUNK_SIZE])
+            )
+            results.extend(self.db_session.session.execute(stmt).scalars().all())
+
+        return results
+
+    def upsert_many(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Inserts the given resource maps, or updates the existing resource map with the same
+        directory_id, resource_type and directory_resource_id. Does not commit.
+        """
+        dialect = self.db_session.session.get_bind().dialect.name
+        insert = ON_CONFLICT_INSERTS.get(dialect)
+        if insert is None:
+            self.__upsert_rows(rows)
+            return
+
+        now = datetime.now()
+        for i in range(0, len(rows), BULK_CHUNK_SIZE):
+            values = [
+                {"id": uuid4(), "created_at": now, "modified_at": now, **row}
+                for row in rows[i : i + BULK_CHUNK_SIZE]
+            ]
+            stmt = insert(ResourceMap).values(values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[
+                    ResourceMap.directory_id,
+                    ResourceMap.resource_type,
+                    ResourceMap.directory_resource_id,
+                ],
+                set_={
+                    "update_client_resource_id": stmt.excluded.update_client_resource_id,
+                    "content_hash": stmt.excluded.content_hash,
+                    "directory_version_id": stmt.excluded.directory_version_id,
+                    "last_update": func.now(),
+                    "modified_at": now,
+                },
+            )
+            self.db_session.execute(stmt)
+
+    def __upsert_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Same as upsert_many, for databases without ON CONFLICT: the existing resource maps are
+        looked up per chunk, and updated or added one by one.
+        """
+        now = datetime.now()
+        for i in range(0, len(rows), BULK_CHUNK_SIZE):
+            chunk = rows[i : i + BULK_CHUNK_SIZE]
+            existing = {
+                (m.directory_id, m.resource_type, m.directory_resource_id): m
+                for m in self.get_many(
+                    [
+                        (row["directory_id"], row["resource_type"], row["directory_resource_id"])
+                        for row in chunk
+                    ]
+                )
+            }
+            for row in chunk:
+                key = (row["directory_id"], row["resource_type"], row["directory_resource_id"])
+                resource_map = existing.get(key)
+                if resource_map is None:
+                    resource_map = ResourceMap(id=uuid4(), created_at=now, **row)
+                    existing[key] = resource_map
+                else:
+                    resource_map.update_client_resource_id = row["update_client_resource_id"]
+                    resource_map.content_hash = row.get("content_hash")
+                    resource_map.directory_version_id = row.get("directory_version_id")
+                    resource_map.last_update = now
+                resource_map.modified_at = now
+                self.db_session.add(resource_map)
+
+    def update_many(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Marks the resource maps matching the directory_id, resource_type and directory_resource_id
+        of the given rows as updated and stores their content_hash and directory_version_id.
+        Returns the number of resource maps found. Does not commit.
+        """
+        if not rows:
+            return 0
+
+        table = ResourceMap.metadata.tables[ResourceMap.__tablename__]
+        stmt = (
+            update(table)
+            .where(
+                table.c.directory_id == bindparam("b_directory_id"),
+                table.c.resource_type == bindparam("b_resource_type"),
+                table.c.directory_resource_id == bindparam("b_directory_resource_id"),
+            )
+            .values(
+                content_hash=bindparam("b_content_hash"),
+                directory_version_id=bindparam("b_directory_version_id"),
+                last_update=func.now(),
+                modified_at=datetime.now(),
+            )
+        )
+
+        count = 0
+        for i in range(0, len(rows), BULK_CHUNK_SIZE):
+            params = [
+                {
+                    "b_directory_id": row["directory_id"],
+                    "b_resource_type": row["resource_type"],
+                    "b_directory_resource_id": row["directory_resource_id"],
+                    "b_content_hash": row.get("content_hash"),
+                    "b_directory_version_id": row.get("directory_version_id"),
+                }
+                for row in rows[i : i + BULK_CHUNK_SIZE]
+            ]
+            count += self.db_session.execute(stmt, params).rowcount
+
+        return count
+
     def resource_map_exists(
         self, directory_resource_id: str, update_client_resource_id: str
     ) -> bool:
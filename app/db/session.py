@@ -102,14 +102,15 @@ class DbSession:
         """
         return self._retry(self.session.query, *entities)
 
-    def execute(self, stmt: Any) -> Any:
+    def execute(self, stmt: Any, params: Any = None) -> Any:
         """
         Execute a statement in the current session
 
         :param stmt:
+        :param params: optional parameters, a list of parameter sets executes the statement for each set
         :return:
         """
-        return self._retry(self.session.execute, stmt)
+        return self._retry(self.session.execute, stmt, params)
 
     def begin(self) -> Any:
         """
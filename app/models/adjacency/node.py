@@ -1,8 +1,9 @@
-from typing import List, Literal
-from pydantic import BaseModel
+from typing import Any, Dict, List, Literal
+from pydantic import BaseModel, ConfigDict
 from fhir.resources.R4B.bundle import BundleEntry
 
 from app.models.fhir.types import HttpValidVerbs
+from app.models.fhir.raw_entry import RawBundleEntry
 from app.models.resource_map.dto import ResourceMapDto, ResourceMapUpdateDto
 
 
@@ -17,6 +18,8 @@ class NodeUpdateData(BaseModel):
 
 
 class Node(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     resource_id: str
     resource_type: str
     references: List[NodeReference] = []
@@ -24,13 +27,15 @@ class Node(BaseModel):
     updated: bool = False
     method: HttpValidVerbs
     status: Literal["ignore", "equal", "delete", "update", "new", "unknown"] = "unknown"
-    directory_hash: int | None = None
-    update_client_hash: int | None = None
+    directory_hash: str | None = None
+    update_client_hash: str | None = None
     update_data: NodeUpdateData | None = None
-    directory_entry: BundleEntry | None = None
+    directory_entry: RawBundleEntry | None = None
+    directory_payload: Dict[str, Any] | None = None
 
     def clear_for_cache(self) -> None:
         self.references = []
         self.visited = False
         self.update_data = None
         self.directory_entry = None
+        self.directory_payload = None
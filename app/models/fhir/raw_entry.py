@@ -0,0 +1,82 @@
+from typing import Any, Dict, cast, get_args
+
+from fhir.resources.R4B.bundle import BundleEntry
+
+from app.models.fhir.types import HttpValidVerbs
+
+
+class RawBundleEntry:
+    """
+    Read-only view over the JSON of a Bundle entry. The resource type, id and request method are
+    read from the JSON directly, the entry is only validated into a BundleEntry model when its
+    resource is actually needed.
+    """
+
+    def __init__(self, data: Dict[str, Any], entry: BundleEntry | None = None) -> None:
+        self.data = data
+        self.__entry = entry
+
+    @classmethod
+    def from_bundle_entry(cls, entry: BundleEntry) -> "RawBundleEntry":
+        """
+        Wraps an already validated BundleEntry, so it is not validated again.
+        """
+        return cls(entry.model_dump(mode="json"), entry)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RawBundleEntry):
+            return NotImplemented
+        return self.data == other.data
+
+    def __repr__(self) -> str:
+        return f"RawBundleEntry({self.data!r})"
+
+    @property
+    def resource(self) -> Dict[str, Any] | None:
+        resource = self.data.get("resource")
+        return resource if isinstance(resource, dict) else None
+
+    def get_resource_type_and_id(self) -> tuple[str, str]:
+        """
+        Retrieves the resource type and id, falling back to the fullUrl and the request url
+        """
+        resource = self.resource
+        if resource is not None and resource.get("id") is not None:
+            return resource["resourceType"], resource["id"]
+
+        full_url = self.data.get("fullUrl")
+        if full_url is not None:
+            return full_url.split("/")[-2], full_url.split("/")[-1]
+
+        # On DELETE entries, there is no resource anymore. In that case we need to grab the resource type and id from the URL
+        request_url = (self.data.get("request") or {}).get("url")
+        if request_url is not None:
+            return request_url.split("/")[-2], request_url.split("/")[-1]
+
+        raise ValueError("resourceType and id are not available in Bundle")
+
+    def get_request_method(self) -> HttpValidVerbs:
+        """
+        Retrieves the request method if a request is present
+        """
+        request = self.data.get("request")
+        if request is None:
+            raise ValueError("Entry request cannot be None")
+
+        method = request.get("method")
+        if method is None:
+            raise ValueError("Entry request method cannot be None")
+
+        if method not in get_args(HttpValidVerbs):
+            raise ValueError("Unknown Http method}")
+
+        return cast(HttpValidVerbs, method)
+
+    def get_entry(self) -> BundleEntry:
+        """
+        Returns the validated BundleEntry, validating it on first use.
+        """
+        if self.__entry is None:
+            self.__entry = BundleEntry.model_validate(self.data)
+        return self.__entry
+
@@ -9,12 +9,16 @@ class ResourceMapBase(BaseModel):
 
 class ResourceMapDto(ResourceMapBase):
     resource_type: str
+    content_hash: str | None = None
+    directory_version_id: str | None = None
 
 
 class ResourceMapUpdateDto(BaseModel):
     directory_id: str
     resource_type: str
     directory_resource_id: str
+    content_hash: str | None = None
+    directory_version_id: str | None = None
 
 
 class ResourceMapDeleteDto(BaseModel):
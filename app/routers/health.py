@@ -3,8 +3,10 @@ from typing import Any
 
 from fastapi import APIRouter, Depends
 
-from app.container import get_database
+from app.container import get_cache_provider, get_database
 from app.db.db import Database
+from app.services.api.session_registry import get_session_registry
+from app.services.update.cache.provider import CacheProvider
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -24,3 +26,15 @@ def health(db: Database = Depends(get_database)) -> dict[str, Any]:
     healthy = ok_or_error(all(value == "ok" for value in components.values()))
 
     return {"status": healthy, "components": components}
+
+
+@router.get("/health/http_pools")
+def http_pools() -> list[dict[str, Any]]:
+    return get_session_registry().get_stats()
+
+
+@router.get("/health/cache_pool")
+def cache_pool(
+    cache_provider: CacheProvider = Depends(get_cache_provider),
+) -> dict[str, Any] | None:
+    return cache_provider.get_stats()
@@ -1,6 +1,9 @@
+import asyncio
 from datetime import datetime, timezone
+import logging
 from typing import Annotated, Any
 from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from fastapi.exceptions import HTTPException
 
@@ -10,18 +13,38 @@ from app.container import (
     get_update_client_service,
 )
 from app.services.entity.directory_info_service import DirectoryInfoService
-from app.services.update.filter_ura import create_ura_whitelist
+from app.models.directory.dto import DirectoryDto
+from app.services.update.filter_ura import UraWhitelist, create_ura_whitelist
 from app.services.update.update_client_service import UpdateClientService
 from app.services.directory_provider.directory_provider import DirectoryProvider
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/update_resources", tags=["Update update_client resources"])
 
 
 class UpdateQueryParams(BaseModel):
     since: datetime | None = Field(default=None)
 
+
+async def run_update(
+    service: UpdateClientService,
+    directory: DirectoryDto,
+    since: datetime | None,
+    ura_whitelist: UraWhitelist,
+) -> Any:
+    if service.use_async_client:
+        return await service.update_async(directory, since, ura_whitelist)
+    return await run_in_threadpool(service.update, directory, since, ura_whitelist)
+
+
+def failed_update(directory: DirectoryDto, error: Exception) -> dict[str, Any]:
+    logger.error(f"Failed to update directory {directory.id}: {error}")
+    return {"directory_id": directory.id, "message": f"update of {directory.id} failed: {error}"}
+
+
 @router.post("", response_model=None, summary="Update all directories")
-def update_all_directories(
+async def update_all_directories(
     override_ignore: Annotated[list[str] | None, Query()] = [],
     query_params: UpdateQueryParams = Depends(),
     service: UpdateClientService = Depends(get_update_client_service),
@@ -29,14 +52,34 @@ def update_all_directories(
 ) -> Any:
     since = query_params.since.astimezone(timezone.utc) if query_params.since else None
 
-    directories = directory_provider.get_all_directories_include_ignored_ids(include_ignored_ids=override_ignore if override_ignore else [])
+    directories = await run_in_threadpool(
+        directory_provider.get_all_directories_include_ignored_ids,
+        include_ignored_ids=override_ignore if override_ignore else [],
+    )
     ura_whitelist = create_ura_whitelist(directories)
 
-    return [service.update(directory, since, ura_whitelist) for directory in directories]
+    # A failing directory must not fail the update of the other directories
+    if service.use_async_client:
+        results = await asyncio.gather(
+            *(service.update_async(directory, since, ura_whitelist) for directory in directories),
+            return_exceptions=True,
+        )
+        return [
+            failed_update(directory, result) if isinstance(result, Exception) else result
+            for directory, result in zip(directories, results)
+        ]
+
+    results = []
+    for directory in directories:
+        try:
+            results.append(await run_update(service, directory, since, ura_whitelist))
+        except Exception as e:
+            results.append(failed_update(directory, e))
+    return results
 
 
 @router.post("/{directory_id}", response_model=None, summary="Update by directory ID")
-def update_single_directory(
+async def update_single_directory(
     directory_id: str,
     override_ignore: bool = False,
     query_params: UpdateQueryParams = Depends(),
@@ -46,16 +89,16 @@ def update_single_directory(
 ) -> Any:
 
     # Even though we update a single directory, we still need to build the URA whitelist from all directories
-    all_directories = directory_provider.get_all_directories()
+    all_directories = await run_in_threadpool(directory_provider.get_all_directories)
     ura_whitelist = create_ura_whitelist(all_directories)
 
     since = query_params.since.astimezone(timezone.utc) if query_params.since else None
-    directory = directory_provider.get_one_directory(directory_id)
+    directory = await run_in_threadpool(directory_provider.get_one_directory, directory_id)
     if directory is None:
         raise HTTPException(status_code=404, detail=f"Directory {directory_id} not found")
 
     if not override_ignore:
-        is_ignored = directory_service.get_one_by_id(directory_id).is_ignored
+        is_ignored = (await run_in_threadpool(directory_service.get_one_by_id, directory_id)).is_ignored
 
         if is_ignored:
             raise HTTPException(
@@ -63,5 +106,5 @@ def update_single_directory(
                 detail=f"Directory {directory_id} is ignored. Use override_ignore to update.",
             )
 
-    return service.update(directory, since, ura_whitelist)
+    return await run_update(service, directory, since, ura_whitelist)
 
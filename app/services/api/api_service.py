@@ -2,18 +2,21 @@ from abc import ABC
 import logging
 import time
 from typing import Dict, Any
-from requests import request, Response
+from requests import Response
 from requests.exceptions import Timeout, ConnectionError
 from yarl import URL
 
 from app.services.api.authenticators.authenticator import Authenticator
+from app.services.api.rate_limiter import RateLimiter
+from app.services.api.session_registry import get_session_registry
 
 logger = logging.getLogger(__name__)
 
 
 class HttpService(ABC):
     """
-    Base class for making HTTP requests with retry logic
+    Base class for making HTTP requests with retry logic. Requests go through the pooled session
+    of the base url's origin, so connections are kept alive between requests.
     """
 
     def __init__(
@@ -26,6 +29,7 @@ class HttpService(ABC):
         mtls_cert: str | None = None,
         mtls_key: str | None = None,
         verify_ca: str | bool = True,
+        rate_limiter: RateLimiter | None = None,
     ) -> None:
         self.base_url = base_url
         self.authenticator = authenticator
@@ -35,6 +39,7 @@ class HttpService(ABC):
         self.__timeout = timeout
         self.__retries = retries
         self.__backoff = backoff
+        self.__rate_limiter = rate_limiter
 
     def do_request(
         self,
@@ -42,22 +47,34 @@ class HttpService(ABC):
         sub_route: str | None = None,
         json: Dict[str, Any] | None = None,
         params: Dict[str, Any] | None = None,
+        content: bytes | None = None,
+        stream: bool = False,
+        headers: Dict[str, str] | None = None,
     ) -> Response:
         """
-        Perform an HTTP request.
+        Perform an HTTP request. The body is either given as `json`, or as already encoded
+        JSON bytes in `content`. With `stream` the response body is not read upfront, the caller
+        reads it through iter_content and closes the response. Extra `headers` are added to the
+        default headers.
         """
-        headers = self.make_headers()
+        headers = {**self.make_headers(), **(headers or {})}
         url = self.make_target_url(sub_route, params)
+        session = get_session_registry().get_session(self.base_url)
 
         for attempt in range(self.__retries):
+            if self.__rate_limiter is not None:
+                self.__rate_limiter.acquire()
+
             try:
                 logger.info(f"Making HTTP {method} request to {url}")
-                response = request(
+                response = session.request(
                     method=method,
                     url=str(url),
                     headers=headers,
                     timeout=self.__timeout,
                     json=json,
+                    data=content,
+                    stream=stream,
                     cert=(self.__mtls_cert, self.__mtls_key)
                         if self.__mtls_cert and self.__mtls_key
                         else None,
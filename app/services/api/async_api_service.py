@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import ssl
+from abc import ABC
+from types import TracebackType
+from typing import Any, Dict, Generator, Self
+
+import httpx
+from requests import Request
+from requests.exceptions import ConnectionError
+from yarl import URL
+
+from app.services.api.authenticators.authenticator import Authenticator
+from app.services.api.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class RequestsAuthAdapter(httpx.Auth):
+    """
+    Adapts a `requests` auth object (as returned by Authenticator.get_auth) to httpx, by letting it
+    sign an equivalent prepared `requests` request and copying the resulting headers.
+    """
+
+    requires_request_body = True
+
+    def __init__(self, auth: Any) -> None:
+        self.__auth = auth
+
+    def auth_flow(
+        self, request: httpx.Request
+    ) -> Generator[httpx.Request, httpx.Response, None]:
+        prepared = Request(
+            method=request.method,
+            url=str(request.url),
+            headers=dict(request.headers),
+            data=request.content or None,
+        ).prepare()
+        signed = self.__auth(prepared)
+        request.headers.update(signed.headers)
+        yield request
+
+
+class AsyncHttpService(ABC):
+    """
+    Asyncio counterpart of HttpService. Makes HTTP requests with the same retry, backoff and
+    authentication behaviour, using a single connection pool per service instance.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: int,
+        retries: int,
+        backoff: float,
+        authenticator: Authenticator | None = None,
+        mtls_cert: str | None = None,
+        mtls_key: str | None = None,
+        verify_ca: str | bool = True,
+        rate_limiter: RateLimiter | None = None,
+    ) -> None:
+        self.base_url = base_url
+        self.authenticator = authenticator
+        self.__mtls_cert = mtls_cert
+        self.__mtls_key = mtls_key
+        self.__verify_ca = verify_ca
+        self.__timeout = timeout
+        self.__retries = retries
+        self.__backoff = backoff
+        self.__rate_limiter = rate_limiter
+        self.__client: httpx.AsyncClient | None = None
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """
+        Closes the underlying connection pool.
+        """
+        if self.__client is not None:
+            await self.__client.aclose()
+            self.__client = None
+
+    async def do_request(
+        self,
+        method: str,
+        sub_route: str | None = None,
+        json: Dict[str, Any] | None = None,
+        params: Dict[str, Any] | None = None,
+        content: bytes | None = None,
+    ) -> httpx.Response:
+        """
+        Perform an HTTP request. The body is either given as `json`, or as already encoded
+        JSON bytes in `content`.
+        """
+        headers = self.make_headers()
+        url = self.make_target_url(sub_route, params)
+        client = self.get_client()
+        auth = self.authenticator.get_auth() if self.authenticator else None
+
+        for attempt in range(self.__retries):
+            if self.__rate_limiter is not None:
+                await self.__rate_limiter.acquire_async()
+
+            try:
+                logger.info(f"Making HTTP {method} request to {url}")
+                return await client.request(
+                    method=method,
+                    url=str(url),
+                    headers=headers,
+                    json=json,
+                    content=content,
+                    auth=RequestsAuthAdapter(auth) if auth is not None else httpx.USE_CLIENT_DEFAULT,
+                )
+            except (
+                httpx.NetworkError,
+                httpx.TimeoutException,
+            ):
+                logger.warning(f"Failed to make request to {url} on attempt {attempt}")
+
+                # Connection error or timeout, we can retry with an exponential backoff until
+                # we reach the max retries
+                if attempt < self.__retries - 1:
+                    logger.info(f"Retrying in {self.__backoff * (2**attempt)} seconds")
+                    await asyncio.sleep(self.__backoff * (2**attempt))
+
+        logger.error(f"Failed to make request to {url} after {self.__retries} attempts")
+        raise ConnectionError("Failed to make request after too many retries")
+
+    def get_client(self) -> httpx.AsyncClient:
+        if self.__client is None:
+            self.__client = httpx.AsyncClient(
+                timeout=self.__timeout, verify=self.make_ssl_context()
+            )
+        return self.__client
+
+    def make_ssl_context(self) -> ssl.SSLContext:
+        # Mirrors HttpService: either a custom CA bundle or the default trust store is used
+        cafile = self.__verify_ca if isinstance(self.__verify_ca, str) and self.__verify_ca else None
+        context = ssl.create_default_context(cafile=cafile)
+        if self.__mtls_cert and self.__mtls_key:
+            context.load_cert_chain(certfile=self.__mtls_cert, keyfile=self.__mtls_key)
+        return context
+
+    def make_headers(self) -> Dict[str, Any]:
+        # We always assume application/json as the content type
+        headers = {"Content-Type": "application/json"}
+        if self.authenticator:
+            headers["Authorization"] = self.authenticator.get_authentication_header()
+
+        return headers
+
+    def make_target_url(
+        self, sub_route: str | None = None, params: Dict[str, Any] | None = None
+    ) -> URL:
+        url = self.base_url
+        if sub_route:
+            url = f"{url}/{sub_route}"
+
+        target = URL(url)
+        if params:
+            return target.with_query(params)
+
+        return target
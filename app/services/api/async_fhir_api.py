@@ -0,0 +1,109 @@
+from datetime import datetime
+import json
+import logging
+from typing import Any, Dict, List
+
+from fastapi import HTTPException
+from fhir.resources.R4B.bundle import Bundle
+
+from app.models.fhir.types import BundleError
+from app.services.api.async_api_service import AsyncHttpService
+from app.services.api.fhir_api import ERR_MSG_FORMAT, HTTP_ERR_MSG, FhirApi, FhirApiConfig
+from app.services.api.rate_limiter import RateLimiter
+from app.models.fhir.raw_entry import RawBundleEntry
+from app.services.fhir.bundle.utils import filter_history_entries
+from app.services.fhir.fhir_service import FhirService
+from app.services.fhir.json_codec import dump_model, loads
+from app.services.fhir.utils import collect_errors
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncFhirApi(AsyncHttpService):
+    """
+    Asyncio counterpart of FhirApi for the requests made while updating a directory.
+    """
+
+    def __init__(
+        self,
+        config: FhirApiConfig,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        super().__init__(
+            base_url=config.base_url,
+            timeout=config.timeout,
+            backoff=config.backoff,
+            retries=config.retries,
+            authenticator=config.auth,
+            verify_ca=config.verify_ca,
+            mtls_cert=config.mtls_cert,
+            mtls_key=config.mtls_key,
+            rate_limiter=rate_limiter,
+        )
+        self.request_count = config.request_count
+        self.__fhir_service = FhirService(config.fill_required_fields)
+
+    async def post_bundle(self, bundle: Bundle) -> tuple[Bundle, list[BundleError]]:
+        """
+        Post a FHIR bundle to the server and return the response as a Bundle object.
+        Will return a tuple containing a parsed Bundle and BundleErrors if present
+        """
+        try:
+            response = await self.do_request("POST", content=dump_model(bundle))
+        except Exception as e:
+            logger.error(ERR_MSG_FORMAT.format(e))
+            raise HTTPException(status_code=500, detail=str(e))
+
+        if response.status_code >= 400:
+            try:
+                data = response.json()
+            except json.JSONDecodeError:
+                logger.error(ERR_MSG_FORMAT.format(response.text))
+                raise HTTPException(status_code=500, detail=HTTP_ERR_MSG)
+
+            logger.error(ERR_MSG_FORMAT.format(data))
+            raise HTTPException(status_code=response.status_code, detail=HTTP_ERR_MSG)
+
+        try:
+            bundle = self.__fhir_service.create_bundle_from_json(response.content)
+        except json.JSONDecodeError:
+            logger.error("Failed to decode JSON response: %s", response.text)
+            raise HTTPException(status_code=response.status_code, detail=HTTP_ERR_MSG)
+
+        bundle_errors = collect_errors(bundle)
+
+        return bundle, bundle_errors
+
+    def build_history_params(self, since: datetime | None = None) -> Dict[str, Any]:
+        """
+        Builds the params based on request_count and _since parameter.
+        """
+        params: Dict[str, int | str] = {"_count": str(self.request_count)}
+        if since:
+            params["_since"] = since.isoformat()
+
+        return params
+
+    async def get_history_batch(
+        self,
+        resource_type: str,
+        next_params: Dict[str, Any] | None = None,
+    ) -> tuple[Dict[str, Any] | None, List[RawBundleEntry]]:
+        """
+        Fetch a batch of resource history entries. Will return a tuple containing the next parameter (if available)
+        and a list of unvalidated entries. If the next params is empty, there are no more pages to fetch
+        """
+        response = await self.do_request(
+            "GET", sub_route=f"{resource_type}/_history", params=next_params
+        )
+        if response.status_code > 300:
+            logger.error(
+                f"An error with status code {response.status_code} has occurred from server. See response:\n{response.text}"
+            )
+            raise HTTPException(status_code=500, detail=response.text)
+
+        data = loads(response.content)
+        next_params = FhirApi.get_next_params(FhirApi.get_next_url_from_page_data(data))
+        entries = filter_history_entries(self.__fhir_service.create_raw_bundle_entries(data))
+
+        return next_params, entries
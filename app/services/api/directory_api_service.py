@@ -1,5 +1,6 @@
+from concurrent.futures import ThreadPoolExecutor
 import logging
-from typing import List
+from typing import Any, Dict, List
 from fastapi import HTTPException
 from yarl import URL
 
@@ -14,33 +15,92 @@ from app.services.fhir.utils import get_ura_from_organization
 
 logger = logging.getLogger(__name__)
 
+# Query parameters with which servers page through search results by offset (HAPI and generic FHIR)
+OFFSET_PARAMS = ("_getpagesoffset", "_offset")
+
 
 class DirectoryApiService:
     def __init__(
         self,
         fhir_api: FhirApi,
-        provider_url: str
+        provider_url: str,
+        max_parallel_pages: int = 1,
     ) -> None:
         """
         Service to manage directories from a FHIR-based API.
         """
         self.__fhir_api = fhir_api
         self.__provider_url = provider_url
+        self.__max_parallel_pages = max(1, max_parallel_pages)
 
     def fetch_directories(self) -> List[DirectoryDto]:
-        directories: List[DirectoryDto] = []
-        next_url: URL | None = URL("")
+        """
+        Fetches all directories by following the next links of the search. When the server pages
+        by offset, up to max_parallel_pages pages are fetched at the same time.
+        """
+        next_url, entries = self.__search_organizations({"_include": "Organization:endpoint"})
+        directories = self.__parse_bundle(entries)
+
         while next_url is not None:
-            params = {"_include": "Organization:endpoint"}
-            next_url, entries = self.__fhir_api.search_resource(
-                resource_type="Organization",
-                params=params,
-            )
-            page_directories = self.__parse_bundle(
-                entries
-            )
-            directories.extend(page_directories)
-        return directories
+            next_params = FhirApi.get_next_params(next_url) or {}
+            pages = self.__get_offset_pages(next_params)
+            if len(pages) <= 1:
+                next_url, entries = self.__search_organizations(next_params)
+                directories.extend(self.__parse_bundle(entries))
+                continue
+
+            with ThreadPoolExecutor(
+                max_workers=len(pages), thread_name_prefix="directory-pages"
+            ) as executor:
+                results = list(executor.map(self.__search_organizations, pages))
+
+            # Pages after the last one are empty, the search continues from the next link of the
+            # last page of this batch
+            for next_url, entries in results:
+                directories.extend(self.__parse_bundle(entries))
+                if next_url is None:
+                    break
+
+        return self.__unique_directories(directories)
+
+    @staticmethod
+    def __unique_directories(directories: List[DirectoryDto]) -> List[DirectoryDto]:
+        """
+        Drops directories that were already returned by an earlier page. A server that ignores the
+        offset of the concurrently fetched pages returns the same page more than once.
+        """
+        unique: Dict[str, DirectoryDto] = {}
+        for directory in directories:
+            if directory.id in unique:
+                logger.warning(f"Directory {directory.id} is returned more than once, skipping")
+                continue
+            unique[directory.id] = directory
+        return list(unique.values())
+
+    def __search_organizations(
+        self, params: Dict[str, Any]
+    ) -> tuple[URL | None, List[BundleEntry]]:
+        return self.__fhir_api.search_resource(resource_type="Organization", params=params)
+
+    def __get_offset_pages(self, next_params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Returns the params of the next pages that can be fetched concurrently, starting with the
+        page of the next link. Only servers that page by offset allow this, for other servers only
+        the next page itself is returned.
+        """
+        offset_param = next(
+            (param for param in OFFSET_PARAMS if str(next_params.get(param, "")).isdigit()),
+            None,
+        )
+        count = str(next_params.get("_count", ""))
+        if self.__max_parallel_pages == 1 or offset_param is None or not count.isdigit():
+            return [next_params]
+
+        offset = int(next_params[offset_param])
+        return [
+            {**next_params, offset_param: str(offset + page * int(count))}
+            for page in range(self.__max_parallel_pages)
+        ]
 
     def fetch_one_directory(self, directory_id: str) -> DirectoryDto:
         params = {
@@ -89,12 +149,18 @@ class DirectoryApiService:
     ) -> List[DirectoryDto]:
         orgs: List[DirectoryDto] = []
         try:
+            # Included Endpoints are indexed once, instead of searched for each Organization
+            endpoints: Dict[str, Endpoint] = {}
+            for entry in entries:
+                if isinstance(entry.resource, Endpoint) and entry.resource.id is not None:
+                    endpoints.setdefault(entry.resource.id, entry.resource)
+
             for entry in entries:
                 resource = entry.resource
                 if isinstance(resource, Organization) and resource.id is not None:
                     try:
                         endpoint_address = self.__get_endpoint_address(
-                            resource.id, resource.endpoint , entries
+                            resource.id, resource.endpoint, endpoints
                         )
                     except ValueError as e:
                         logger.error(f"Failed to get endpoint address for Organization {resource.id}: {e}")
@@ -115,7 +181,7 @@ class DirectoryApiService:
             )
 
     def __get_endpoint_address(
-        self, org_id: str, endpoint_refs: List[Reference] | None, entries: List[BundleEntry]
+        self, org_id: str, endpoint_refs: List[Reference] | None, endpoints: Dict[str, Endpoint]
     ) -> str:
         if not endpoint_refs or len(endpoint_refs) == 0 or len(endpoint_refs) > 1:
             logger.error(f"Organization {org_id} has no endpoints, skipping")
@@ -128,7 +194,7 @@ class DirectoryApiService:
         if not endpoint_ref_node or endpoint_ref_node.resource_type != "Endpoint":
             logger.error(f"Organization {org_id} has invalid endpoint reference {endpoint_ref_node}, skipping")
             raise ValueError("Invalid endpoint reference")
-        endpoint_res = next((e.resource for e in entries if isinstance(e.resource, Endpoint) and e.resource.id == endpoint_ref_node.id), None)
+        endpoint_res = endpoints.get(endpoint_ref_node.id)
         if not endpoint_res:
             logger.error(f"Endpoint {endpoint_ref_node.id} not found for Organization {org_id}, skipping")
             raise ValueError("Endpoint not found")
@@ -1,20 +1,22 @@
 from dataclasses import dataclass
 from datetime import datetime
 from fastapi import HTTPException
-from fastapi.encoders import jsonable_encoder
-from typing import Any, Dict, List
+from typing import Any, Dict, Generator, List
+import json
 import logging
 from fhir.resources.R4B.bundle import BundleEntry
 from fhir.resources.R4B.domainresource import DomainResource
-from requests import JSONDecodeError
 from yarl import URL
 
 from app.models.fhir.types import BundleError
-from app.services.fhir.bundle.utils import filter_history_entries
+from app.models.fhir.raw_entry import RawBundleEntry
+from app.services.fhir.bundle.utils import HistoryVersionIndex, filter_history_entries
 from app.services.api.api_service import HttpService
 from app.services.api.authenticators.authenticator import Authenticator
+from app.services.api.rate_limiter import RateLimiter
 from app.services.fhir.capability_statement_validator import is_capability_statement_valid
 from app.services.fhir.fhir_service import FhirService
+from app.services.fhir.json_codec import dump_model, loads
 
 from fhir.resources.R4B.bundle import Bundle
 
@@ -22,6 +24,8 @@ from app.services.fhir.utils import collect_errors
 
 ERR_MSG_FORMAT = "FHIR API error: %s"
 HTTP_ERR_MSG = "An error occurred while processing a FHIR request."
+# Size of the chunks in which a streamed response body is read
+STREAM_CHUNK_SIZE = 64 * 1024
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -37,10 +41,21 @@ class FhirApiConfig:
     request_count: int
     fill_required_fields: bool
 
+@dataclass
+class CapabilityStatementResult:
+    """
+    Outcome of fetching the CapabilityStatement of a server. `valid` is None when the server
+    reported that the statement has not been modified since it was last fetched.
+    """
+    valid: bool | None
+    etag: str | None = None
+    last_modified: str | None = None
+
 class FhirApi(HttpService):
     def __init__(
         self,
         config: FhirApiConfig,
+        rate_limiter: RateLimiter | None = None,
     ):
         super().__init__(
             base_url=config.base_url,
@@ -51,6 +66,7 @@ class FhirApi(HttpService):
             verify_ca=config.verify_ca,
             mtls_cert=config.mtls_cert,
             mtls_key=config.mtls_key,
+            rate_limiter=rate_limiter,
         )
         self.request_count = config.request_count
         self.__fhir_service = FhirService(config.fill_required_fields)
@@ -61,9 +77,7 @@ class FhirApi(HttpService):
         Will return a tuple containing a parsed Bundle and BundleErrors if present
         """
         try:
-            response = self.do_request(
-                "POST", json=jsonable_encoder(bundle.model_dump())
-            )
+            response = self.do_request("POST", content=dump_model(bundle))
         except Exception as e:
             logger.error(ERR_MSG_FORMAT.format(e))
             raise HTTPException(status_code=500, detail=str(e))
@@ -73,7 +87,7 @@ class FhirApi(HttpService):
             # See if we can get an Operation Outcome from the error response
             try:
                 data = response.json()
-            except JSONDecodeError:
+            except json.JSONDecodeError:
                 # No json data found, just return generic error
                 logger.error(ERR_MSG_FORMAT.format(response.text))
                 raise HTTPException(status_code=500, detail=HTTP_ERR_MSG)
@@ -82,14 +96,14 @@ class FhirApi(HttpService):
             logger.error(ERR_MSG_FORMAT.format(data))
             raise HTTPException(status_code=response.status_code, detail=HTTP_ERR_MSG)
 
-        # Successful HTTP status. Check if we have a JSON body
+        # Successful HTTP status. Check if we have a JSON body, the bundle is validated straight
+        # from the response bytes
         try:
-            data = response.json()
-        except JSONDecodeError:
+            bundle = self.__fhir_service.create_bundle_from_json(response.content)
+        except json.JSONDecodeError:
             logger.error("Failed to decode JSON response: %s", response.text)
             raise HTTPException(status_code=response.status_code, detail=HTTP_ERR_MSG)
 
-        bundle = self.__fhir_service.create_bundle(data)
         bundle_errors = collect_errors(bundle)
 
         return bundle, bundle_errors
@@ -110,7 +124,12 @@ class FhirApi(HttpService):
             )
             raise HTTPException(status_code=500, detail=response.json())
 
-        page_bundle = self.__fhir_service.create_bundle(response.json())
+        try:
+            page_bundle = self.__fhir_service.create_bundle_from_json(response.content)
+        except json.JSONDecodeError:
+            logger.error("Failed to decode JSON response: %s", response.text)
+            raise HTTPException(status_code=response.status_code, detail=HTTP_ERR_MSG)
+
         next_url = self.get_next_url_from_page_bundle(page_bundle)
         entries = page_bundle.entry if page_bundle.entry else []
 
@@ -134,7 +153,12 @@ class FhirApi(HttpService):
             )
             raise HTTPException(status_code=500, detail=response.json())
 
-        data = response.json()
+        try:
+            data = loads(response.content)
+        except json.JSONDecodeError:
+            logger.error("Failed to decode JSON response: %s", response.text)
+            raise HTTPException(status_code=response.status_code, detail=HTTP_ERR_MSG)
+
         return self.__fhir_service.create_resource(data)
 
     def build_history_params(self, since: datetime | None = None) -> Dict[str, Any]:
@@ -151,7 +175,26 @@ class FhirApi(HttpService):
         """
         Fetch the FHIR CapabilityStatement from the server.
         """
-        response = self.do_request("GET", sub_route="metadata")
+        return self.fetch_capability_statement().valid is True
+
+    def fetch_capability_statement(
+        self, etag: str | None = None, last_modified: str | None = None
+    ) -> CapabilityStatementResult:
+        """
+        Fetch and validate the FHIR CapabilityStatement from the server. When the etag or
+        last modified date of an earlier response is given, the request is made conditional,
+        so an unchanged statement is not downloaded again.
+        """
+        headers: Dict[str, str] = {}
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
+
+        response = self.do_request("GET", sub_route="metadata", headers=headers or None)
+        if response.status_code == 304:
+            return CapabilityStatementResult(valid=None, etag=etag, last_modified=last_modified)
+
         if response.status_code > 300:
             logger.error(
                 f"An error with status code {response.status_code} has occurred from server. See response:\n{response.json()}"
@@ -159,11 +202,16 @@ class FhirApi(HttpService):
             raise HTTPException(status_code=500, detail=response.json())
 
         try:
-            data = response.json()
-        except JSONDecodeError:
+            data = loads(response.content)
+        except json.JSONDecodeError:
             logger.error("Failed to decode JSON response: %s", response.text)
             raise HTTPException(status_code=response.status_code, detail=HTTP_ERR_MSG)
-        return is_capability_statement_valid(data)
+
+        return CapabilityStatementResult(
+            valid=is_capability_statement_valid(data),
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
 
     @staticmethod
     def get_next_params(url: URL | None) -> Dict[str, Any] | None:
@@ -191,14 +239,26 @@ class FhirApi(HttpService):
 
         return next_url
 
+    @staticmethod
+    def get_next_url_from_page_data(data: Dict[str, Any]) -> URL | None:
+        """
+        Helper function to extract the next url from the JSON of a page bundle
+        """
+        next_url = None
+        for link in data.get("link") or []:
+            if link.get("relation") == "next" and link.get("url") is not None:
+                next_url = URL(link["url"])
+
+        return next_url
+
     def get_history_batch(
         self,
         resource_type: str,
         next_params: Dict[str, Any] | None = None,
-    ) -> tuple[Dict[str, Any] | None, List[BundleEntry]]:
+    ) -> tuple[Dict[str, Any] | None, List[RawBundleEntry]]:
         """
         Fetch a batch of resource history entries from the given URL. Will return a tuple containing the next parameter (if available)
-        and a list of BundleEntry objects. If the next params is empty, there are no more pages to fetch
+        and a list of unvalidated entries. If the next params is empty, there are no more pages to fetch
         """
         response = self.do_request(
             "GET", sub_route=f"{resource_type}/_history", params=next_params
@@ -209,8 +269,50 @@ class FhirApi(HttpService):
             )
             raise HTTPException(status_code=500, detail=response.json())
 
-        page_bundle = self.__fhir_service.create_bundle(response.json())
-        next_params = self.get_next_params(self.get_next_url_from_page_bundle(page_bundle))
-        entries = filter_history_entries(page_bundle.entry) if page_bundle.entry else []
+        # Entries are validated later on, only when they are written to the update client
+        try:
+            data = loads(response.content)
+        except json.JSONDecodeError:
+            logger.error("Failed to decode JSON response: %s", response.text)
+            raise HTTPException(status_code=response.status_code, detail=HTTP_ERR_MSG)
+
+        next_params = self.get_next_params(self.get_next_url_from_page_data(data))
+        entries = filter_history_entries(self.__fhir_service.create_raw_bundle_entries(data))
 
         return next_params, entries
+
+    def stream_history_batch(
+        self,
+        resource_type: str,
+        next_params: Dict[str, Any] | None = None,
+    ) -> Generator[RawBundleEntry, None, Dict[str, Any] | None]:
+        """
+        Streaming counterpart of get_history_batch. Yields the unvalidated entries of a _history page
+        while the response body is read, so the page is never held in memory as a whole. Only the
+        latest version of each resource in the page is yielded. Returns the next params once the
+        page is exhausted, which are None when there are no more pages to fetch
+        """
+        response = self.do_request(
+            "GET", sub_route=f"{resource_type}/_history", params=next_params, stream=True
+        )
+        try:
+            if response.status_code > 300:
+                logger.error(
+                    f"An error with status code {response.status_code} has occurred from server. See response:\n{response.json()}"
+                )
+                raise HTTPException(status_code=500, detail=response.json())
+
+            entries = self.__fhir_service.iter_raw_bundle_entries(
+                response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+            )
+            page_index = HistoryVersionIndex()
+            while True:
+                try:
+                    entry = next(entries)
+                except StopIteration as stop:
+                    return self.get_next_params(self.get_next_url_from_page_data(stop.value))
+
+                if page_index.add(entry):
+                    yield entry
+        finally:
+            response.close()
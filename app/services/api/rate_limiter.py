@@ -0,0 +1,46 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Thread-safe rate limiter that spaces out calls so no more than `rate` calls per second
+    are made. A rate of 0 (or lower) disables rate limiting.
+    """
+
+    def __init__(self, rate: float) -> None:
+        self.__interval = 1.0 / rate if rate > 0 else 0.0
+        self.__next_slot = 0.0
+        self.__lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Blocks until the caller is allowed to make the next call.
+        """
+        wait = self.__reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """
+        Waits, without blocking the event loop, until the caller is allowed to make the next call.
+        """
+        wait = self.__reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def __reserve(self) -> float:
+        """
+        Reserves the next slot and returns the number of seconds to wait for it. The lock is only
+        held while reserving, so other callers can reserve the slots after ours while we wait.
+        """
+        if self.__interval == 0.0:
+            return 0.0
+
+        with self.__lock:
+            now = time.monotonic()
+            slot = max(now, self.__next_slot)
+            self.__next_slot = slot + self.__interval
+
+        return slot - now
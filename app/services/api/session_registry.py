@@ -0,0 +1,133 @@
+from http.cookiejar import Cookie, DefaultCookiePolicy
+import logging
+import threading
+from typing import Any, Dict, List
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+from yarl import URL
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 10
+
+# Connection pools kept per session. A session only talks to a single origin, but a pool is
+# created for each combination of client certificate and CA bundle used against it.
+POOL_CONNECTIONS = 4
+
+
+class RejectCookiesPolicy(DefaultCookiePolicy):
+    """
+    Cookie policy that neither stores nor sends cookies. Directories sharing an origin share a
+    session, so cookies set for one directory would otherwise be sent to the others.
+    """
+
+    def set_ok(self, cookie: Cookie, request: Any) -> bool:
+        return False
+
+    def return_ok(self, cookie: Cookie, request: Any) -> bool:
+        return False
+
+
+class SessionRegistry:
+    """
+    Keeps a keep-alive session per origin (scheme, host and port), so connections, TLS sessions
+    and loaded client certificates are reused across requests, resource types and update runs.
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE) -> None:
+        self.__pool_size = pool_size
+        self.__sessions: Dict[str, Session] = {}
+        self.__acquired_counts: Dict[str, int] = {}
+        self.__lock = threading.Lock()
+
+    def get_session(self, url: str) -> Session:
+        """
+        Returns the session for the origin of the given url, creating it on first use.
+        """
+        origin = self.get_origin(url)
+        with self.__lock:
+            session = self.__sessions.get(origin)
+            if session is None:
+                logger.debug(f"Creating HTTP session for {origin}")
+                session = self.__create_session()
+                self.__sessions[origin] = session
+                self.__acquired_counts[origin] = 0
+            self.__acquired_counts[origin] += 1
+
+        return session
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """
+        Returns how often the session was acquired and the connection pool usage per origin.
+        """
+        with self.__lock:
+            sessions = list(self.__sessions.items())
+            acquired_counts = dict(self.__acquired_counts)
+
+        stats = []
+        for origin, session in sessions:
+            connections = 0
+            idle = 0
+            adapter = session.get_adapter(origin)
+            if isinstance(adapter, HTTPAdapter):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools[key]
+                    connections += getattr(pool, "num_connections", 0)
+                    idle += pool.pool.qsize() if pool.pool is not None else 0
+
+            stats.append(
+                {
+                    "origin": origin,
+                    "sessions_acquired": acquired_counts.get(origin, 0),
+                    "connections_opened": connections,
+                    "connections_idle": idle,
+                }
+            )
+
+        return stats
+
+    def close(self) -> None:
+        """
+        Closes all sessions and their pooled connections.
+        """
+        with self.__lock:
+            sessions = list(self.__sessions.values())
+            self.__sessions.clear()
+            self.__acquired_counts.clear()
+
+        for session in sessions:
+            session.close()
+
+    @staticmethod
+    def get_origin(url: str) -> str:
+        target = URL(url)
+        return str(target.origin()) if target.is_absolute() else url
+
+    def __create_session(self) -> Session:
+        session = Session()
+        session.cookies.set_policy(RejectCookiesPolicy())
+        # Retries are handled by HttpService, so the adapter should not retry on its own
+        adapter = HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS,
+            pool_maxsize=self.__pool_size,
+            max_retries=0,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        return session
+
+
+_SESSION_REGISTRY = SessionRegistry()
+
+
+def setup_session_registry(pool_size: int = DEFAULT_POOL_SIZE) -> None:
+    global _SESSION_REGISTRY
+    _SESSION_REGISTRY.close()
+    _SESSION_REGISTRY = SessionRegistry(pool_size=pool_size)
+
+
+def get_session_registry() -> SessionRegistry:
+    return _SESSION_REGISTRY
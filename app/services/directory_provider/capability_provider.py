@@ -1,25 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 import logging
-from typing import List
+import threading
+import time
+from typing import Dict, List
 
 from app.models.directory.dto import DirectoryDto
 from app.services.api.authenticators.null_authenticator import NullAuthenticator
-from app.services.api.fhir_api import FhirApi, FhirApiConfig
+from app.services.api.fhir_api import CapabilityStatementResult, FhirApi, FhirApiConfig
 from app.services.directory_provider.directory_provider import DirectoryProvider
 
 logger = logging.getLogger(__name__)
 
+# A capability check should fail fast, an unreachable directory must not hold up the update cycle
+CAPABILITY_CHECK_TIMEOUT = 5
+CAPABILITY_CHECK_RETRIES = 1
+
+
+@dataclass
+class CapabilityCacheEntry:
+    valid: bool
+    checked_at: float
+    etag: str | None = None
+    last_modified: str | None = None
+
+
 class CapabilityProvider(DirectoryProvider):
     """
     Filters out directories that do not meet certain capability statement criteria.
+
+    When a cache TTL is set, the outcome of a check is cached per endpoint address. Once the TTL
+    has passed, the statement is revalidated with a conditional request when the server returned
+    an ETag or Last-Modified header, so an unchanged statement is not downloaded again.
     """
 
     def __init__(
         self,
         inner: DirectoryProvider,
         validate_capability_statement: bool = True,
+        cache_ttl: int = 0,
+        timeout: int = CAPABILITY_CHECK_TIMEOUT,
+        max_parallel_checks: int = 1,
     ) -> None:
         self.__inner = inner
         self.__validate_capability_statement = validate_capability_statement
+        self.__cache_ttl = cache_ttl
+        self.__timeout = timeout
+        self.__max_parallel_checks = max(1, max_parallel_checks)
+        self.__cache: Dict[str, CapabilityCacheEntry] = {}
+        self.__cache_lock = threading.Lock()
 
 
     def get_all_directories(self, include_ignored: bool = False) -> List[DirectoryDto]:
@@ -49,40 +78,100 @@ class CapabilityProvider(DirectoryProvider):
         return dirs[0]
 
     def filter_on_capability(self, dirs: List[DirectoryDto]) -> List[DirectoryDto]:
-        if self.__validate_capability_statement:
-            dirs = [d for d in dirs if self.check_capability_statement(d)]
+        if not self.__validate_capability_statement:
+            return dirs
+
+        if self.__max_parallel_checks == 1 or len(dirs) <= 1:
+            results = [self.__is_capable(d) for d in dirs]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(self.__max_parallel_checks, len(dirs)),
+                thread_name_prefix="capability-check",
+            ) as executor:
+                results = list(executor.map(self.__is_capable, dirs))
+
+        return [d for d, capable in zip(dirs, results) if capable]
+
+    def __is_capable(self, dir_dto: DirectoryDto) -> bool:
+        if self.__cache_ttl <= 0:
+            return self.check_capability_statement(dir_dto, self.__timeout)
+
+        with self.__cache_lock:
+            cached = self.__cache.get(dir_dto.endpoint_address)
+
+        now = time.monotonic()
+        if cached is not None and now - cached.checked_at < self.__cache_ttl:
+            return cached.valid
+
+        result = self.fetch_capability_statement(dir_dto, cached, self.__timeout)
+        if result is None:
+            # Errors are not cached, the directory is checked again on the next call
+            return False
 
-        return dirs
+        # Not modified since the cached check, so the cached outcome still holds
+        valid = result.valid if result.valid is not None else cached is not None and cached.valid
+        with self.__cache_lock:
+            self.__cache[dir_dto.endpoint_address] = CapabilityCacheEntry(
+                valid=valid,
+                checked_at=now,
+                etag=result.etag,
+                last_modified=result.last_modified,
+            )
+
+        return valid
+
+    @staticmethod
+    def create_fhir_api(dir_dto: DirectoryDto, timeout: int = CAPABILITY_CHECK_TIMEOUT) -> FhirApi:
+        config = FhirApiConfig(
+            timeout=timeout,
+            backoff=0,
+            auth=NullAuthenticator(),
+            base_url=dir_dto.endpoint_address,
+            request_count=5,
+            fill_required_fields=False,
+            retries=CAPABILITY_CHECK_RETRIES,
+            # We assume no MTLS is needed for capability check. Otherwise we need to add this info to the dir_dto
+            mtls_cert=None,
+            mtls_key=None,
+            verify_ca=True,
+        )
+        return FhirApi(config)
 
     @staticmethod
-    def check_capability_statement(dir_dto: DirectoryDto) -> bool:
+    def fetch_capability_statement(
+        dir_dto: DirectoryDto,
+        cached: CapabilityCacheEntry | None = None,
+        timeout: int = CAPABILITY_CHECK_TIMEOUT,
+    ) -> CapabilityStatementResult | None:
         """
-        Validates the capability statement of a directory to ensure it meets mCSD requirements.
-        Logs the process and returns True if valid, False otherwise.
+        Fetches and validates the capability statement of a directory, conditionally when a
+        cached entry is given. Returns None when the statement could not be retrieved.
         """
         logger.info(f"Checking capability statement for {dir_dto.id}")
         try:
-            config = FhirApiConfig(
-                timeout=5,
-                backoff=5,
-                auth=NullAuthenticator(),
-                base_url=dir_dto.endpoint_address,
-                request_count=5,
-                fill_required_fields=False,
-                retries=5,
-                # We assume no MTLS is needed for capability check. Otherwise we need to add this info to the dir_dto
-                mtls_cert=None,
-                mtls_key=None,
-                verify_ca=True,
+            fhir_api = CapabilityProvider.create_fhir_api(dir_dto, timeout)
+            result = fhir_api.fetch_capability_statement(
+                etag=cached.etag if cached is not None else None,
+                last_modified=cached.last_modified if cached is not None else None,
             )
-            fhir_api=FhirApi(config)
-            if not fhir_api.validate_capability_statement():
-                logger.warning(
-                    f"Directory {dir_dto.id} at {dir_dto.endpoint_address} does not support mCSD requirements"
-                )
-                return False
         except Exception as e:
             logger.error(f"Error checking capability statement for {dir_dto.id}: {e}")
-            return False
+            return None
+
+        if result.valid is False:
+            logger.warning(
+                f"Directory {dir_dto.id} at {dir_dto.endpoint_address} does not support mCSD requirements"
+            )
+
+        return result
 
-        return True
+    @staticmethod
+    def check_capability_statement(
+        dir_dto: DirectoryDto, timeout: int = CAPABILITY_CHECK_TIMEOUT
+    ) -> bool:
+        """
+        Validates the capability statement of a directory to ensure it meets mCSD requirements.
+        Logs the process and returns True if valid, False otherwise.
+        """
+        result = CapabilityProvider.fetch_capability_statement(dir_dto, timeout=timeout)
+        return result is not None and result.valid is True
@@ -53,6 +53,7 @@ class DirectoryProviderFactory:
             api_service = DirectoryApiService(
                 fhir_api=FhirApi(config),
                 provider_url=self.__directory_config.directories_provider_url,
+                max_parallel_pages=self.__directory_config.directories_provider_max_parallel_pages,
             )
 
             provider = FhirDirectoryProvider(
@@ -71,6 +72,9 @@ class DirectoryProviderFactory:
         capability_provider = CapabilityProvider(
             inner=provider,
             validate_capability_statement=self.__mcsd_config.check_capability_statement,
+            cache_ttl=self.__mcsd_config.capability_statement_cache_ttl_in_sec,
+            timeout=self.__mcsd_config.capability_statement_timeout_in_sec,
+            max_parallel_checks=self.__mcsd_config.max_parallel_capability_checks,
         )
 
         db_provider = DbProvider(
@@ -1,14 +1,22 @@
 from collections.abc import Sequence
+import logging
+from typing import Any, Dict
+
 from fastapi.exceptions import HTTPException
 from app.db.db import Database
 from app.db.entities.resource_map import ResourceMap
-from app.db.repositories.resource_map_repository import ResourceMapRepository
+from app.db.repositories.resource_map_repository import (
+    ResourceMapKey,
+    ResourceMapRepository,
+)
 from app.models.resource_map.dto import (
     ResourceMapDto,
     ResourceMapUpdateDto,
     ResourceMapDeleteDto,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class ResourceMapService:
     """
@@ -61,6 +69,23 @@ class ResourceMapService:
 
         return resource_map
 
+    def get_many(
+        self, keys: Sequence[ResourceMapKey]
+    ) -> Dict[ResourceMapKey, ResourceMap]:
+        """
+        Retrieves the resource maps for the given (directory_id, resource_type, directory_resource_id)
+        keys in a single query. Keys without a resource map are left out.
+        """
+        if not keys:
+            return {}
+
+        with self.__database.get_db_session() as session:
+            repository = session.get_repository(ResourceMapRepository)
+            return {
+                (m.directory_id, m.resource_type, m.directory_resource_id): m
+                for m in repository.get_many(list(dict.fromkeys(keys)))
+            }
+
     def find(
         self,
         directory_id: str | None = None,
@@ -112,6 +137,44 @@ class ResourceMapService:
 
             return repository.update(target)
 
+    def upsert_many(
+        self, dtos: Sequence[ResourceMapDto | ResourceMapUpdateDto]
+    ) -> None:
+        """
+        Adds and updates the resource maps of a batch of updates in a single transaction.
+        """
+        rows: Dict[ResourceMapKey, Dict[str, Any]] = {}
+        updates: Dict[ResourceMapKey, Dict[str, Any]] = {}
+        for dto in dtos:
+            key = (dto.directory_id, dto.resource_type, dto.directory_resource_id)
+            if isinstance(dto, ResourceMapDto):
+                # A key can only be upserted once per statement, the last one wins
+                rows[key] = dto.model_dump()
+                updates.pop(key, None)
+            elif key in rows:
+                rows[key]["content_hash"] = dto.content_hash
+                rows[key]["directory_version_id"] = dto.directory_version_id
+            else:
+                updates[key] = dto.model_dump()
+
+        if not rows and not updates:
+            return
+
+        with self.__database.get_db_session() as session:
+            repository = session.get_repository(ResourceMapRepository)
+            try:
+                repository.upsert_many(list(rows.values()))
+                found = repository.update_many(list(updates.values()))
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+
+        if found != len(updates):
+            logger.warning(
+                f"{len(updates) - found} of {len(updates)} updated resource maps were not found"
+            )
+
     def delete_one(self, dto: ResourceMapDeleteDto) -> None:
         """
         Deletes a resource map from the database.
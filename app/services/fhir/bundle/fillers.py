@@ -57,8 +57,14 @@ def fill_entry(data: Dict[str, Any]) -> Dict[str, Any]:
         return data
 
     for entry in data["entry"]:
-        if "resource" in entry:
-            _fill_entry_resource(entry["resource"])
+        fill_bundle_entry(entry)
+
+    return data
+
+
+def fill_bundle_entry(data: Dict[str, Any]) -> Dict[str, Any]:
+    if "resource" in data:
+        _fill_entry_resource(data["resource"])
 
     return data
 
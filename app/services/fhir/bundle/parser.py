@@ -1,8 +1,11 @@
-from typing import Any, Dict
+from typing import Any, Dict, Generator, Iterable, List
 
 from fhir.resources.R4B.bundle import Bundle, BundleEntry, BundleEntryRequest
 from app.models.fhir.types import BundleRequestParams
-from app.services.fhir.bundle.fillers import fill_bundle, fill_entry
+from app.services.fhir.bundle.fillers import fill_bundle, fill_bundle_entry, fill_entry
+from app.models.fhir.raw_entry import RawBundleEntry
+from app.services.fhir.bundle.stream_parser import iter_bundle_entries
+from app.services.fhir.json_codec import loads, validate_json
 
 
 def create_bundle_entry(
@@ -31,6 +34,50 @@ def create_bundle(data: Dict[str, Any], fill_required_fields: bool = False) -> B
     return Bundle.model_validate(data)
 
 
+def create_bundle_from_json(content: bytes, fill_required_fields: bool = False) -> Bundle:
+    """
+    Creates a Fhir Bundle model directly from the JSON bytes of a response. Filling required
+    fields works on the decoded JSON, so in that case the content is decoded first.
+    """
+    if fill_required_fields:
+        return create_bundle(loads(content), fill_required_fields)
+
+    return validate_json(Bundle, content)
+
+
+def create_raw_bundle_entries(
+    data: Dict[str, Any], fill_required_fields: bool = False
+) -> List[RawBundleEntry]:
+    """
+    Creates lightweight views over the entries of a Bundle without validating them. When
+    'fill_required_fields' is set to True all required fields are filled with placeholder data
+    first, so the entries can be validated later on.
+    """
+    if fill_required_fields:
+        data = fill_bundle(data)
+
+    return [RawBundleEntry(entry) for entry in data.get("entry") or []]
+
+
+def iter_raw_bundle_entries(
+    chunks: Iterable[bytes], fill_required_fields: bool = False
+) -> Generator[RawBundleEntry, None, Dict[str, Any]]:
+    """
+    Streaming counterpart of create_raw_bundle_entries. Yields the entries of a Bundle while its
+    JSON is read from a stream of byte chunks and returns the other elements of the Bundle once
+    the stream is exhausted.
+    """
+    entries = iter_bundle_entries(chunks)
+    while True:
+        try:
+            entry = next(entries)
+        except StopIteration as stop:
+            bundle: Dict[str, Any] = stop.value
+            return bundle
+
+        yield RawBundleEntry(fill_bundle_entry(entry) if fill_required_fields else entry)
+
+
 def create_request_bundle(data: list[BundleRequestParams]) -> Bundle:
     """
     Creates a Bundle with Requests in the entries. Used typically to
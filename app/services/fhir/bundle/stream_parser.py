@@ -0,0 +1,120 @@
+import codecs
+import json
+from typing import Any, Dict, Generator, Iterable, Iterator
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class _JsonStreamReader:
+    """
+    Reads JSON tokens and values from a stream of byte chunks. Only the part of the stream that
+    has not been consumed yet is kept in memory.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self.__chunks: Iterator[bytes] = iter(chunks)
+        self.__decoder = codecs.getincrementaldecoder("utf-8")()
+        self.__buffer = ""
+        self.__pos = 0
+        self.__eof = False
+
+    def __fill(self) -> bool:
+        """
+        Appends the next chunk to the buffer, dropping what has been consumed already. Returns
+        False when the stream is exhausted.
+        """
+        if self.__eof:
+            return False
+
+        try:
+            text = self.__decoder.decode(next(self.__chunks))
+        except StopIteration:
+            text = self.__decoder.decode(b"", final=True)
+            self.__eof = True
+
+        self.__buffer = self.__buffer[self.__pos :] + text
+        self.__pos = 0
+        return not self.__eof or text != ""
+
+    def __skip_whitespace(self) -> None:
+        while True:
+            while self.__pos < len(self.__buffer) and self.__buffer[self.__pos] in _WHITESPACE:
+                self.__pos += 1
+            if self.__pos < len(self.__buffer) or not self.__fill():
+                return
+
+    def __error(self, msg: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(msg, self.__buffer, self.__pos)
+
+    def peek(self) -> str:
+        self.__skip_whitespace()
+        if self.__pos >= len(self.__buffer):
+            raise self.__error("Unexpected end of JSON")
+        return self.__buffer[self.__pos]
+
+    def consume(self, char: str) -> bool:
+        if self.peek() != char:
+            return False
+        self.__pos += 1
+        return True
+
+    def expect(self, char: str) -> None:
+        if not self.consume(char):
+            raise self.__error(f"Expecting {char!r}")
+
+    def read_value(self) -> Any:
+        """
+        Reads the next complete JSON value, reading more chunks until the value is complete.
+        """
+        self.__skip_whitespace()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.__buffer, self.__pos)
+                # A value that ends at the end of the buffer, like a number, can continue in the
+                # next chunk
+                if end < len(self.__buffer) or self.__eof:
+                    self.__pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.__eof:
+                    raise
+            self.__fill()
+
+
+def iter_bundle_entries(
+    chunks: Iterable[bytes],
+) -> Generator[Dict[str, Any], None, Dict[str, Any]]:
+    """
+    Incrementally parses a Bundle from a stream of byte chunks and yields the JSON of each entry
+    as soon as it is complete, so only a single entry is parsed in memory at a time. Returns the
+    other elements of the Bundle, like `link`, once the stream is exhausted.
+    """
+    reader = _JsonStreamReader(chunks)
+    bundle: Dict[str, Any] = {}
+
+    reader.expect("{")
+    if reader.consume("}"):
+        return bundle
+
+    while True:
+        key = reader.read_value()
+        if not isinstance(key, str):
+            raise json.JSONDecodeError("Expecting property name", str(key), 0)
+        reader.expect(":")
+
+        if key == "entry" and reader.consume("["):
+            if not reader.consume("]"):
+                while True:
+                    entry = reader.read_value()
+                    if isinstance(entry, dict):
+                        yield entry
+                    if reader.consume("]"):
+                        break
+                    reader.expect(",")
+        else:
+            bundle[key] = reader.read_value()
+
+        if reader.consume("}"):
+            return bundle
+        reader.expect(",")
@@ -1,7 +1,13 @@
-from typing import List, cast, get_args
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import threading
+from typing import Any, Dict, List, TypeVar, cast, get_args
 from fhir.resources.R4B.bundle import Bundle, BundleEntry
 
 from app.models.fhir.types import HttpValidVerbs
+from app.models.fhir.raw_entry import RawBundleEntry
+
+_E = TypeVar("_E", BundleEntry, RawBundleEntry)
 
 def get_resource_from_reference(reference: str) -> tuple[str | None, str | None]:
     """
@@ -14,10 +20,15 @@ def get_resource_from_reference(reference: str) -> tuple[str | None, str | None]
     return parts[-2], parts[-1]
 
 
-def get_resource_type_and_id_from_entry(entry: BundleEntry) -> tuple[str, str]:
+def get_resource_type_and_id_from_entry(
+    entry: BundleEntry | RawBundleEntry,
+) -> tuple[str, str]:
     """
     Retrieves the resource type and id from a Bundle entry
     """
+    if isinstance(entry, RawBundleEntry):
+        return entry.get_resource_type_and_id()
+
     if entry.resource is not None and entry.resource.id is not None:
         return entry.resource.get_resource_type(), entry.resource.id
 
@@ -31,10 +42,15 @@ def get_resource_type_and_id_from_entry(entry: BundleEntry) -> tuple[str, str]:
     raise ValueError("resourceType and id are not available in Bundle")
 
 
-def get_request_method_from_entry(entry: BundleEntry) -> HttpValidVerbs:
+def get_request_method_from_entry(
+    entry: BundleEntry | RawBundleEntry,
+) -> HttpValidVerbs:
     """
     Retrieves the request method from a Bundle entry if a request is present
     """
+    if isinstance(entry, RawBundleEntry):
+        return entry.get_request_method()
+
     entry_request = entry.request
     if entry_request is None:
         raise ValueError("Entry request cannot be None")
@@ -49,24 +65,122 @@ def get_request_method_from_entry(entry: BundleEntry) -> HttpValidVerbs:
     return cast(HttpValidVerbs, method)
 
 
-def filter_history_entries(entries: List[BundleEntry]) -> List[BundleEntry]:
+@dataclass(frozen=True)
+class EntryVersion:
     """
-    Filters BundleEntries in a history Bundle and returns the latest for each ResourceType
+    Version of a resource in a history entry, taken from meta.versionId and meta.lastUpdated of
+    the resource, or from the etag and lastModified of the entry response for DELETE entries.
     """
-    results = []
-    ids = []
-    for entry in entries:
-        _, res_id = get_resource_type_and_id_from_entry(entry)
-        if res_id is None:
-            continue
 
-        if res_id in ids:
-            continue
+    version_id: str | None = None
+    last_updated: datetime | None = None
 
-        ids.append(res_id)
-        results.append(entry)
+    def is_newer_than(self, other: "EntryVersion") -> bool:
+        if self.version_id is not None and other.version_id is not None:
+            if self.version_id == other.version_id:
+                return False
+            if self.version_id.isdigit() and other.version_id.isdigit():
+                return int(self.version_id) > int(other.version_id)
 
-    return results
+        if self.last_updated is not None and other.last_updated is not None:
+            return self.last_updated > other.last_updated
+
+        # Without comparable versions the first entry wins, as history is sorted newest first
+        return False
+
+
+def _parse_version_id(value: Any) -> str | None:
+    if not isinstance(value, str) or value == "":
+        return None
+    # Etags are formatted as W/"<versionId>"
+    return value.removeprefix("W/").strip('"')
+
+
+def _parse_instant(value: Any) -> datetime | None:
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def get_entry_version(entry: BundleEntry | RawBundleEntry) -> EntryVersion:
+    """
+    Retrieves the version of the resource in a history entry
+    """
+    if isinstance(entry, RawBundleEntry):
+        meta = (entry.resource or {}).get("meta") or {}
+        response = entry.data.get("response") or {}
+        version_id, last_updated = meta.get("versionId"), meta.get("lastUpdated")
+        etag, last_modified = response.get("etag"), response.get("lastModified")
+    else:
+        meta_model = entry.resource.meta if entry.resource is not None else None
+        version_id = meta_model.versionId if meta_model is not None else None
+        last_updated = meta_model.lastUpdated if meta_model is not None else None
+        etag = entry.response.etag if entry.response is not None else None
+        last_modified = entry.response.lastModified if entry.response is not None else None
+
+    return EntryVersion(
+        version_id=_parse_version_id(version_id) or _parse_version_id(etag),
+        last_updated=_parse_instant(last_updated) or _parse_instant(last_modified),
+    )
+
+
+class HistoryVersionIndex:
+    """
+    Index of the newest version seen for each resource type and id. A single index is shared by
+    all _history pages of a directory sync, so older versions of a resource are dropped in
+    constant time, also when its versions are spread over several pages.
+    """
+
+    def __init__(self) -> None:
+        self.__versions: Dict[tuple[str, str], EntryVersion] = {}
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__versions)
+
+    def get(self, resource_type: str, resource_id: str) -> EntryVersion | None:
+        """
+        Returns the newest version seen of a resource, or None when it has not been seen.
+        """
+        with self.__lock:
+            return self.__versions.get((resource_type, resource_id))
+
+    def add(self, entry: BundleEntry | RawBundleEntry) -> bool:
+        """
+        Records the version of an entry. Returns False when a version of the resource that is
+        the same or newer has been seen already, in which case the entry can be dropped.
+        """
+        key = get_resource_type_and_id_from_entry(entry)
+        version = get_entry_version(entry)
+        with self.__lock:
+            current = self.__versions.get(key)
+            if current is not None and not version.is_newer_than(current):
+                return False
+            self.__versions[key] = version
+            return True
+
+
+def filter_history_entries(
+    entries: List[_E], index: HistoryVersionIndex | None = None
+) -> List[_E]:
+    """
+    Filters BundleEntries in a history Bundle and returns the latest version of each resource.
+    When an index is given, entries that are not newer than a version seen earlier in the same
+    sync are left out as well.
+    """
+    index = index if index is not None else HistoryVersionIndex()
+    latest: Dict[tuple[str, str], _E] = {}
+    for entry in entries:
+        if index.add(entry):
+            latest[get_resource_type_and_id_from_entry(entry)] = entry
+
+    return list(latest.values())
 
 
 def get_entries_from_bundle_of_bundles(data: Bundle) -> List[BundleEntry]:
@@ -1,4 +1,4 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, Generator, Iterable, List
 from fhir.resources.R4B.bundle import BundleEntry, Bundle
 from fhir.resources.R4B.domainresource import DomainResource
 from fhir.resources.R4B.reference import Reference
@@ -14,14 +14,20 @@ from app.services.fhir.bundle.utils import (
 
 from app.services.fhir.bundle.parser import (
     create_bundle,
+    create_bundle_from_json,
+    create_raw_bundle_entries,
     create_request_bundle,
+    iter_raw_bundle_entries,
 )
+from app.models.fhir.raw_entry import RawBundleEntry
 from app.services.fhir.resources.factory import create_resource
 from app.services.fhir.references.reference_extractor import (
+    from_resource_data,
     get_references,
 )
 from app.services.fhir.references.reference_misc import build_node_reference
 from app.services.fhir.references.reference_namespacer import (
+    namespace_data_references,
     namespace_resource_reference,
 )
 
@@ -45,6 +51,26 @@ class FhirService:
         """
         return create_bundle(data, self.fill_required_fields)
 
+    def create_bundle_from_json(self, content: bytes) -> Bundle:
+        """
+        Returns a Bundle instance from the JSON bytes of a response
+        """
+        return create_bundle_from_json(content, self.fill_required_fields)
+
+    def create_raw_bundle_entries(self, data: Dict[str, Any]) -> List[RawBundleEntry]:
+        """
+        Returns unvalidated views over the entries of a Bundle in a Dict object
+        """
+        return create_raw_bundle_entries(data, self.fill_required_fields)
+
+    def iter_raw_bundle_entries(
+        self, chunks: Iterable[bytes]
+    ) -> Generator[RawBundleEntry, None, Dict[str, Any]]:
+        """
+        Yields unvalidated views over the entries of a Bundle that is read from a stream of bytes
+        """
+        return iter_raw_bundle_entries(chunks, self.fill_required_fields)
+
     @staticmethod
     def get_references(data: DomainResource) -> List[Reference]:
         """
@@ -53,6 +79,14 @@ class FhirService:
         """
         return get_references(data)
 
+    @staticmethod
+    def get_data_references(data: Dict[str, Any]) -> List[str]:
+        """
+        Same as get_references, on the JSON of a resource. References to contained resources
+        are left out.
+        """
+        return from_resource_data(data)
+
     @staticmethod
     def namespace_resource_references(
         data: DomainResource, namespace: str
@@ -62,6 +96,15 @@ class FhirService:
         """
         return namespace_resource_reference(data, namespace)
 
+    @staticmethod
+    def namespace_data_references(
+        data: Dict[str, Any], namespace: str
+    ) -> Dict[str, Any]:
+        """
+        Returns a copy of the JSON of a FHIR mCSD Resource with namespaced References.
+        """
+        return namespace_data_references(data, namespace)
+
     @staticmethod
     def make_reference_node(data: Reference, base_url: str) -> NodeReference:
         """
@@ -70,14 +113,18 @@ class FhirService:
         return build_node_reference(data, base_url)
 
     @staticmethod
-    def get_resource_type_and_id_from_entry(entry: BundleEntry) -> tuple[str, str]:
+    def get_resource_type_and_id_from_entry(
+        entry: BundleEntry | RawBundleEntry,
+    ) -> tuple[str, str]:
         """
         Retrieves the resource type and id from a Bundle entry
         """
         return get_resource_type_and_id_from_entry(entry)
 
     @staticmethod
-    def get_request_method_from_entry(entry: BundleEntry) -> HttpValidVerbs:
+    def get_request_method_from_entry(
+        entry: BundleEntry | RawBundleEntry,
+    ) -> HttpValidVerbs:
         """
         Retrieves the request method from a Bundle entry if a request is present
         """
@@ -0,0 +1,46 @@
+import json
+from typing import Any, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:  # pragma: no cover
+    HAS_ORJSON = False
+
+_M = TypeVar("_M", bound=BaseModel)
+
+
+def loads(content: bytes) -> Any:
+    """
+    Decodes the JSON bytes of a request or response body. Uses orjson when it is installed,
+    and the standard library otherwise. Raises a JSONDecodeError on invalid JSON.
+    """
+    if HAS_ORJSON:
+        return orjson.loads(content)
+
+    return json.loads(content)
+
+
+def dump_model(model: BaseModel) -> bytes:
+    """
+    Serializes a FHIR model straight to JSON bytes, without building an intermediate dict.
+    """
+    return model.model_dump_json(exclude_none=True).encode()
+
+
+def validate_json(model_class: Type[_M], content: bytes) -> _M:
+    """
+    Validates a FHIR model directly from JSON bytes. Raises a JSONDecodeError when the content
+    is not valid JSON, so callers can handle it the same way as a decoded body.
+    """
+    try:
+        return model_class.model_validate_json(content)
+    except ValidationError as e:
+        if any(error["type"] == "json_invalid" for error in e.errors()):
+            raise json.JSONDecodeError(
+                "Invalid JSON", content.decode(errors="replace"), 0
+            ) from e
+        raise
@@ -0,0 +1,142 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Type, get_args
+
+from fhir.resources.R4B import get_fhir_model_class
+from fhir.resources.R4B.reference import Reference
+from fhir.resources.R4B.resource import Resource
+from pydantic import BaseModel
+
+from app.models.fhir.types import McsdResources
+
+# References in extensions are profile specific and can point anywhere, so they are not followed.
+# Leaving them out also keeps the index small, as every element can carry extensions.
+SKIPPED_ELEMENTS = ("extension", "modifierExtension", "contained")
+
+
+@dataclass
+class ReferencePathNode:
+    """
+    Element in the tree of paths at which a Reference can occur. `attribute` is the name of the
+    element on the model, the tree itself is keyed by the name of the element in JSON.
+    """
+
+    attribute: str
+    is_reference: bool = False
+    children: Dict[str, "ReferencePathNode"] = field(default_factory=dict)
+
+
+ReferenceIndex = Dict[str, ReferencePathNode]
+
+
+def _get_model_class(annotation: Any) -> Type[BaseModel] | None:
+    """
+    Returns the model class of an element annotation, unwrapping Optional and List.
+    """
+    for arg in get_args(annotation):
+        model_class = _get_model_class(arg)
+        if model_class is not None:
+            return model_class
+
+    get_model_klass = getattr(annotation, "get_model_klass", None)
+    if get_model_klass is None:
+        return None
+
+    model_class = get_model_klass()
+    return model_class if isinstance(model_class, type) else None
+
+
+def build_reference_index(
+    model: Type[BaseModel], seen: FrozenSet[Type[BaseModel]] = frozenset()
+) -> ReferenceIndex:
+    """
+    Builds the tree of element paths of a model at which a Reference can occur, at any depth.
+    """
+    index: ReferenceIndex = {}
+    for name, field_info in model.model_fields.items():
+        extra = field_info.json_schema_extra
+        if not isinstance(extra, dict) or not extra.get("element_property"):
+            continue
+        if name in SKIPPED_ELEMENTS:
+            continue
+
+        model_class = _get_model_class(field_info.annotation)
+        if model_class is None:
+            # Primitive element
+            continue
+
+        key = field_info.alias or name
+        if issubclass(model_class, Reference):
+            index[key] = ReferencePathNode(attribute=name, is_reference=True)
+        elif not issubclass(model_class, Resource) and model_class not in seen:
+            children = build_reference_index(model_class, seen | {model_class})
+            if children:
+                index[key] = ReferencePathNode(attribute=name, children=children)
+
+    return index
+
+
+REFERENCE_INDEXES: Dict[str, ReferenceIndex] = {
+    resource_type.value: build_reference_index(get_fhir_model_class(resource_type.value))
+    for resource_type in McsdResources
+}
+
+
+def get_reference_index(resource_type: str) -> ReferenceIndex:
+    """
+    Returns the precomputed reference paths of an mCSD resource type.
+    """
+    index = REFERENCE_INDEXES.get(resource_type)
+    if index is None:
+        raise ValueError(f"{resource_type} is not a valid mCSD Resource")
+
+    return index
+
+
+def _as_list(value: Any) -> list[Any]:
+    return value if isinstance(value, list) else [value]
+
+
+def collect_data_references(
+    data: Dict[str, Any], index: ReferenceIndex, refs: Dict[str, None]
+) -> None:
+    """
+    Collects the references in the JSON of a resource by walking the paths of the index. Each
+    reference is only collected once, references to contained resources are left out.
+    """
+    for key, node in index.items():
+        value = data.get(key)
+        if value is None:
+            continue
+
+        for item in _as_list(value):
+            if not isinstance(item, dict):
+                continue
+            if node.is_reference:
+                reference = item.get("reference")
+                if isinstance(reference, str) and not reference.startswith("#"):
+                    refs.setdefault(reference, None)
+            else:
+                collect_data_references(item, node.children, refs)
+
+
+def collect_model_references(
+    model: BaseModel, index: ReferenceIndex, refs: Dict[str, Reference]
+) -> None:
+    """
+    Same as collect_data_references, on a model. Keeps the first Reference for each reference.
+    """
+    for node in index.values():
+        value = getattr(model, node.attribute, None)
+        if value is None:
+            continue
+
+        for item in _as_list(value):
+            if node.is_reference:
+                if (
+                    isinstance(item, Reference)
+                    and item.reference is not None
+                    and not item.reference.startswith("#")
+                ):
+                    refs.setdefault(item.reference, item)
+            elif isinstance(item, BaseModel):
+                collect_model_references(item, node.children, refs)
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Dict
 from fhir.resources.R4B.domainresource import DomainResource
 from fhir.resources.R4B.reference import Reference
 
@@ -50,3 +50,31 @@ def namespace_resource_reference(
     if isinstance(res, DomainResource):
         return res
     raise ValueError("Expected DomainResource after namespacing")
+
+
+def _namespace_in_data(value: Any, namespace: str) -> Any:
+    """Recursively namespacing references in JSON data, copying only what contains them"""
+    if isinstance(value, list):
+        return [_namespace_in_data(v, namespace) for v in value]
+
+    if not isinstance(value, dict):
+        return value
+
+    reference = value.get("reference")
+    if isinstance(reference, str):
+        if reference.startswith("#"):
+            return value
+        res_type, _id = get_resource_from_reference(reference)
+        return {**value, "reference": f"{res_type}/{namespace}-{_id}"}
+
+    return {k: _namespace_in_data(v, namespace) for k, v in value.items()}
+
+
+def namespace_data_references(data: Dict[str, Any], namespace: str) -> Dict[str, Any]:
+    """
+    Returns a copy of the JSON of a resource with namespaced references, leaving the original as is.
+    """
+    res = _namespace_in_data(data, namespace)
+    if isinstance(res, dict):
+        return res
+    raise ValueError("Expected a resource after namespacing")
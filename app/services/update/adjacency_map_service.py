@@ -1,14 +1,13 @@
-import copy
 import logging
-from typing import List
+from typing import Dict, List, Sequence
 
-from fhir.resources.R4B.domainresource import DomainResource
-from fhir.resources.R4B.organization import Organization
 
 from app.db.entities.resource_map import ResourceMap
+from app.db.repositories.resource_map_repository import ResourceMapKey
 from app.models.fhir.types import BundleRequestParams
 from app.services.update.cache.caching_service import CachingService
 from fhir.resources.R4B.bundle import Bundle, BundleEntry, BundleEntryRequest
+from fhir.resources.R4B.reference import Reference
 
 from app.models.adjacency.adjacency_map import AdjacencyMap
 from app.models.adjacency.node import (
@@ -18,10 +17,16 @@ from app.models.adjacency.node import (
 )
 from app.models.resource_map.dto import ResourceMapDto, ResourceMapUpdateDto
 from app.services.entity.resource_map_service import ResourceMapService
+from app.models.fhir.raw_entry import RawBundleEntry
+from app.services.fhir.bundle.utils import get_entry_version
 from app.services.fhir.fhir_service import FhirService
+from app.services.fhir.resources.factory import create_resource
 from app.services.api.fhir_api import FhirApi
-from app.services.update.computation_service import ComputationService
-from app.services.update.filter_ura import filter_ura
+from app.services.update.computation_service import (
+    DELETED_CONTENT_HASH,
+    ComputationService,
+)
+from app.services.update.node_state import NodeStateStore
 
 logger = logging.getLogger(__name__)
 
@@ -53,6 +58,8 @@ class AdjacencyMapService:
         resource_map_service: ResourceMapService,
         cache_service: CachingService,
         uras_allowed: list[str],
+        verify_update_client: bool = False,
+        node_state: NodeStateStore | None = None,
     ) -> None:
         self.directory_id = directory_id
         self.__directory_api = directory_api
@@ -61,17 +68,24 @@ class AdjacencyMapService:
         self.__cache_service = cache_service
         self.__computation_service = ComputationService(
             directory_id=directory_id,
+            uras_allowed=uras_allowed,
+            verify_update_client=verify_update_client,
         )
         self.__uras_allowed = uras_allowed
+        self.__verify_update_client = verify_update_client
+        self.__node_state = node_state
 
-    def build_adjacency_map(self, entries: List[BundleEntry]) -> AdjacencyMap:
+    def build_adjacency_map(
+        self, entries: Sequence[BundleEntry | RawBundleEntry]
+    ) -> AdjacencyMap:
         nodes = [self.create_node(entry) for entry in entries]
         adj_map = AdjacencyMap(nodes)
 
         attempted_keys: set[tuple[str, str]] = set()
         self._resolve_all_references(adj_map, attempted_keys)
-        self._update_client_hashes(adj_map)
-        self._finalize_nodes(adj_map)
+        resource_maps = self._get_resource_maps(adj_map)
+        self._update_client_hashes(adj_map, resource_maps)
+        self._finalize_nodes(adj_map, resource_maps)
         return adj_map
 
     def _resolve_all_references(
@@ -99,6 +113,10 @@ class AdjacencyMapService:
 
             # Find references that are not resolved from the cache
             still_missing = adj_map.get_missing_refs()
+            if still_missing and self.__node_state is not None:
+                # Resources that did not change since the previous sync do not have to be fetched
+                adj_map.add_nodes(self.__node_state.resolve(still_missing))
+                still_missing = adj_map.get_missing_refs()
             if not still_missing:
                 # All resolved this pass
                 continue
@@ -119,10 +137,10 @@ class AdjacencyMapService:
         adj_map: AdjacencyMap,
         missing_refs: list[NodeReference],
     ) -> None:
-        for ref in missing_refs:
-            node = self.__cache_service.get_node(ref.id)  # Find regular reference in cache
-            if node:
-                adj_map.add_node(node)
+        # Look up all missing references in the cache at once
+        nodes = self.__cache_service.get_nodes([ref.id for ref in missing_refs])
+        for node in nodes.values():
+            adj_map.add_node(node)
 
     def _fetch_and_add_missing(
         self,
@@ -143,8 +161,26 @@ class AdjacencyMapService:
             attempted_keys.update(ref_key(r) for r in to_fetch)  # Update our list with elements we have fetched
 
 
-    def _update_client_hashes(self, adj_map: AdjacencyMap) -> None:
-        update_client_targets = self.__get_update_client_missing_targets(adj_map)
+    def _get_resource_maps(
+        self, adj_map: AdjacencyMap
+    ) -> Dict[ResourceMapKey, ResourceMap]:
+        # Load the resource maps of all nodes of this page at once
+        return self.__resource_map_service.get_many(
+            [
+                (self.directory_id, node.resource_type, node.resource_id)
+                for node in adj_map.data.values()
+                if not node.updated
+            ]
+        )
+
+    def _update_client_hashes(
+        self,
+        adj_map: AdjacencyMap,
+        resource_maps: Dict[ResourceMapKey, ResourceMap],
+    ) -> None:
+        update_client_targets = self.__get_update_client_missing_targets(
+            adj_map, resource_maps
+        )
         if len(update_client_targets) > 0:
             update_client_entries = self.get_update_client_data(update_client_targets)
             for entry in update_client_entries:
@@ -155,14 +191,17 @@ class AdjacencyMapService:
                     self.__computation_service.hash_update_client_entry(entry)
                 )
 
-    def _finalize_nodes(self, adj_map: AdjacencyMap) -> None:
+    def _finalize_nodes(
+        self,
+        adj_map: AdjacencyMap,
+        resource_maps: Dict[ResourceMapKey, ResourceMap],
+    ) -> None:
         for node in adj_map.data.values():
             if node.updated:
                 continue
-            resource_map = self.__resource_map_service.get(
-                directory_id=self.directory_id,
-                resource_type=node.resource_type,
-                directory_resource_id=node.resource_id,
+
+            resource_map = resource_maps.get(
+                (self.directory_id, node.resource_type, node.resource_id)
             )
             node.status = self.__computation_service.get_update_status(
                 method=node.method,
@@ -202,10 +241,17 @@ class AdjacencyMapService:
             raise AdjacencyMapException("Errors occurred when fetching entries")
         return self.__filter_entries(entries)
 
-    def create_node(self, entry: BundleEntry) -> Node:
-        res_type, _id = FhirService.get_resource_type_and_id_from_entry(entry)
-        method = FhirService.get_request_method_from_entry(entry)
-        directory_hash = self.__computation_service.hash_directory_entry(entry)
+    def create_node(self, entry: BundleEntry | RawBundleEntry) -> Node:
+        if isinstance(entry, BundleEntry):
+            entry = RawBundleEntry.from_bundle_entry(entry)
+
+        res_type, _id = entry.get_resource_type_and_id()
+        method = entry.get_request_method()
+        # The payload for the update client is created once, and used for both hashing and writing
+        payload = self.__computation_service.create_payload(entry)
+        directory_hash = (
+            self.__computation_service.hash_data(payload) if payload is not None else None
+        )
         references = self.create_node_references(entry)
 
         return Node(
@@ -214,22 +260,29 @@ class AdjacencyMapService:
             directory_hash=directory_hash,
             method=method,
             directory_entry=entry,
+            directory_payload=payload,
             references=references,
         )
 
-    def create_node_references(self, entry: BundleEntry) -> List[NodeReference]:
+    def create_node_references(
+        self, entry: BundleEntry | RawBundleEntry
+    ) -> List[NodeReference]:
         """
         Convert the references found in the bundle entry to a list of NodeReferences
         This supports both absolute and relative references.
         """
-        if entry.resource is None or not isinstance(entry.resource, DomainResource):
+        if isinstance(entry, BundleEntry):
+            entry = RawBundleEntry.from_bundle_entry(entry)
+
+        resource = entry.resource
+        if resource is None or resource.get("resourceType") in (None, "Bundle"):
             return []
 
         ret = []
 
-        for ref in FhirService.get_references(entry.resource):
+        for ref in FhirService.get_data_references(resource):
             reference_node = FhirService.make_reference_node(
-                ref, self.__directory_api.base_url
+                Reference.model_construct(reference=ref), self.__directory_api.base_url
             )
             ret.append(reference_node)
 
@@ -243,10 +296,42 @@ class AdjacencyMapService:
 
         match node.status:
             case "ignore":
+                # A deletion that was already applied, of a resource map that was written before
+                # deletions were marked. It is marked now, so it is not read again.
+                if (
+                    node.method == "DELETE"
+                    and resource_map is not None
+                    and resource_map.content_hash is None
+                ):
+                    return NodeUpdateData(
+                        resource_map_dto=ResourceMapUpdateDto(
+                            directory_id=self.directory_id,
+                            resource_type=node.resource_type,
+                            directory_resource_id=node.resource_id,
+                            content_hash=DELETED_CONTENT_HASH,
+                        )
+                    )
                 return None
 
             case "equal":
-                return None
+                # Nothing is written to the update client, but a newer directory version is still
+                # stored, so the persisted node state does not go stale
+                if node.directory_entry is None or resource_map is None:
+                    return None
+
+                version_id = get_entry_version(node.directory_entry).version_id
+                if version_id is None or version_id == resource_map.directory_version_id:
+                    return None
+
+                resource_map_update_dto = ResourceMapUpdateDto(
+                    directory_id=self.directory_id,
+                    resource_type=node.resource_type,
+                    directory_resource_id=node.resource_id,
+                    content_hash=node.directory_hash,
+                    directory_version_id=version_id,
+                )
+
+                return NodeUpdateData(resource_map_dto=resource_map_update_dto)
 
             case "delete":
                 entry = BundleEntry.model_construct()
@@ -260,10 +345,13 @@ class AdjacencyMapService:
                         f"Resource map for {node.resource_id} {node.resource_type} cannot be None and node marked as delete "
                     )
 
+                # The resource no longer exists in the update client, which is marked so it is
+                # not read from the update client again
                 resource_map_update_dto = ResourceMapUpdateDto(
                     directory_id=self.directory_id,
                     resource_type=node.resource_type,
                     directory_resource_id=node.resource_id,
+                    content_hash=DELETED_CONTENT_HASH,
                 )
 
                 return NodeUpdateData(bundle_entry=entry, resource_map_dto=resource_map_update_dto)
@@ -278,18 +366,15 @@ class AdjacencyMapService:
                         f"Directory entry for {node.resource_id} {node.resource_type} cannot be None and node marked as `new`"
                     )
 
-                resource = copy.deepcopy(node.directory_entry.resource)
-                if not isinstance(resource, DomainResource):
+                if node.directory_payload is None:
                     raise InvalidNodeStateException(
                         f"Resource {node.resource_id} {node.resource_type} must be a DomainResource when a node is marked `new`"
                     )
 
-                # Filter URAs only for Organizations
-                if isinstance(resource, Organization):
-                    resource = filter_ura(resource, self.__uras_allowed)
-
-                FhirService.namespace_resource_references(resource, self.directory_id)
-                resource.id = update_client_resource_id
+                # The payload is already namespaced and filtered, only the id has to be set
+                resource = create_resource(
+                    {**node.directory_payload, "id": update_client_resource_id}
+                )
                 entry.resource = resource
                 entry.request = entry_request
 
@@ -298,6 +383,8 @@ class AdjacencyMapService:
                     directory_resource_id=node.resource_id,
                     update_client_resource_id=update_client_resource_id,
                     resource_type=node.resource_type,
+                    content_hash=node.directory_hash,
+                    directory_version_id=get_entry_version(node.directory_entry).version_id,
                 )
 
                 return NodeUpdateData(bundle_entry=entry, resource_map_dto=resource_map_dto)
@@ -312,18 +399,15 @@ class AdjacencyMapService:
                         f"Directory entry for {node.resource_id} {node.resource_type} cannot be None and node marked as `update`"
                     )
 
-                resource = copy.deepcopy(node.directory_entry.resource)
-                if not isinstance(resource, DomainResource):
+                if node.directory_payload is None:
                     raise InvalidNodeStateException(
                         f"Resource {node.resource_id} {node.resource_type} must be a DomainResource when a node is marked `update`"
                     )
 
-                # Filter URAs only for Organizations
-                if isinstance(resource, Organization):
-                    resource = filter_ura(resource, self.__uras_allowed)
-
-                FhirService.namespace_resource_references(resource, self.directory_id)
-                resource.id = update_client_resource_id
+                # The payload is already namespaced and filtered, only the id has to be set
+                resource = create_resource(
+                    {**node.directory_payload, "id": update_client_resource_id}
+                )
                 entry.request = entry_request
                 entry.resource = resource
 
@@ -336,6 +420,8 @@ class AdjacencyMapService:
                     directory_id=self.directory_id,
                     directory_resource_id=node.resource_id,
                     resource_type=node.resource_type,
+                    content_hash=node.directory_hash,
+                    directory_version_id=get_entry_version(node.directory_entry).version_id,
                 )
 
                 return NodeUpdateData(bundle_entry=entry, resource_map_dto=resource_map_update_dto)
@@ -346,16 +432,34 @@ class AdjacencyMapService:
                 )
 
     def __get_update_client_missing_targets(
-        self, adj_map: AdjacencyMap
+        self,
+        adj_map: AdjacencyMap,
+        resource_maps: Dict[ResourceMapKey, ResourceMap],
     ) -> List[BundleRequestParams]:
+        """
+        Returns the nodes whose content in the update client has to be read. Without verification
+        this is only needed for resource maps that were written before content hashes were stored.
+        Nodes without a resource map have never been written, and deleted resources are marked
+        with DELETED_CONTENT_HASH, so those are not read either.
+        """
         update_client_targets = []
         for node_id, node in adj_map.data.items():
-            if not self.__cache_service.key_exists(node_id):
-                update_client_targets.append(
-                    BundleRequestParams(
-                        id=f"{self.directory_id}-{node_id}",
-                        resource_type=node.resource_type,
-                    )
+            if node.updated or self.__cache_service.key_exists(node_id):
+                continue
+
+            resource_map = resource_maps.get(
+                (self.directory_id, node.resource_type, node.resource_id)
+            )
+            if not self.__verify_update_client and (
+                resource_map is None or resource_map.content_hash is not None
+            ):
+                continue
+
+            update_client_targets.append(
+                BundleRequestParams(
+                    id=f"{self.directory_id}-{node_id}",
+                    resource_type=node.resource_type,
                 )
+            )
 
         return update_client_targets
@@ -0,0 +1,101 @@
+from dataclasses import dataclass, field
+from typing import List
+
+from fhir.resources.R4B.bundle import BundleEntry
+
+from app.models.adjacency.node import Node
+from app.models.resource_map.dto import ResourceMapDto, ResourceMapUpdateDto
+
+
+@dataclass
+class BundleBatch:
+    """
+    A number of adjacency groups that are sent to the update client in a single transaction.
+    Groups are never split, so a group is always written or rolled back as a whole.
+    """
+
+    groups: List[List[Node]] = field(default_factory=list)
+
+    @property
+    def nodes(self) -> List[Node]:
+        return [node for group in self.groups for node in group]
+
+    def entries(self) -> List[BundleEntry]:
+        return [
+            node.update_data.bundle_entry
+            for node in self.nodes
+            if node.update_data is not None and node.update_data.bundle_entry is not None
+        ]
+
+    def resource_map_dtos(self) -> List[ResourceMapDto | ResourceMapUpdateDto]:
+        return [
+            node.update_data.resource_map_dto
+            for node in self.nodes
+            if node.update_data is not None and node.update_data.resource_map_dto is not None
+        ]
+
+    def group_of_entry(self, index: int) -> List[Node] | None:
+        """
+        Returns the group that the bundle entry at the given index originates from.
+        """
+        offset = 0
+        for group in self.groups:
+            offset += sum(1 for node in group if get_bundle_entry(node) is not None)
+            if index < offset:
+                return group
+
+        return None
+
+
+def get_bundle_entry(node: Node) -> BundleEntry | None:
+    return node.update_data.bundle_entry if node.update_data is not None else None
+
+
+def get_entry_size(node: Node) -> int:
+    """
+    Returns the approximate size in bytes of the bundle entry of a node.
+    """
+    entry = get_bundle_entry(node)
+    if entry is None:
+        return 0
+    return len(entry.model_dump_json(exclude_none=True))
+
+
+class BundlePacker:
+    """
+    Packs independent adjacency groups into batches, bounded by the number of bundle entries and
+    optionally by their size in bytes. A group that exceeds a limit on its own gets its own batch.
+    """
+
+    def __init__(self, max_entries: int = 1, max_bytes: int = 0) -> None:
+        self.__max_entries = max(1, max_entries)
+        self.__max_bytes = max_bytes
+
+    def pack(self, groups: List[List[Node]]) -> List[BundleBatch]:
+        batches: List[BundleBatch] = []
+        current = BundleBatch()
+        entry_count = 0
+        byte_count = 0
+
+        for group in groups:
+            group_entries = sum(1 for node in group if get_bundle_entry(node) is not None)
+            group_bytes = (
+                sum(get_entry_size(node) for node in group) if self.__max_bytes > 0 else 0
+            )
+
+            exceeds_entries = entry_count + group_entries > self.__max_entries
+            exceeds_bytes = self.__max_bytes > 0 and byte_count + group_bytes > self.__max_bytes
+            if current.groups and (exceeds_entries or exceeds_bytes):
+                batches.append(current)
+                current = BundleBatch()
+                entry_count = 0
+                byte_count = 0
+
+            current.groups.append(group)
+            entry_count += group_entries
+            byte_count += group_bytes
+
+        if current.groups:
+            batches.append(current)
+
+        return batches
@@ -15,6 +15,14 @@ class CachingService(ABC):
     @abstractmethod
     def get_node(self, id: str) -> Node | None: ...
 
+    @abstractmethod
+    def get_nodes(self, ids: List[str]) -> Dict[str, Node]:
+        """
+        Returns the cached nodes of the given ids in a single lookup, keyed by id. Ids that are
+        not cached are left out.
+        """
+        ...
+
     @abstractmethod
     def add_node(self, node: Node) -> None: ...
 
@@ -30,5 +38,12 @@ class CachingService(ABC):
     @abstractmethod
     def keys(self) -> List[str]: ...
 
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns counters of the cache usage of the run, like hits and misses, when the cache
+        keeps them.
+        """
+        return {}
+
     def make_target_id(self, id: str) -> str:
         return f"{str(self.run_id)}-{id}"
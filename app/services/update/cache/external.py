@@ -1,55 +1,75 @@
-from typing import List
-from redis import Redis, ConnectionError
+from typing import Dict, List
+from redis import ConnectionError, ConnectionPool, Redis
 from uuid import UUID
 from app.models.adjacency.node import Node
 from app.services.update.cache.caching_service import CachingService
+from app.services.update.cache.node_codec import decode_node, encode_node
+
+# Number of keys per HMGET command, so a large lookup does not block Redis with a single command
+HMGET_BATCH_SIZE = 500
 
 
 class ExternalCachingService(CachingService):
     """
     Caching service that uses an external Redis instance to store nodes.
+
+    The nodes of a run are stored as fields of a single Redis hash under the cache namespace, so
+    several runs can share a Redis database. The hash expires object_ttl seconds after the last
+    write, which cleans up the data of runs that never cleared their cache. Nodes are stored in
+    the compact binary encoding of node_codec.
     """
     def __init__(
         self,
         run_id: UUID,
-        host: str,
-        port: int,
-        ssl: bool = False,
-        ssl_keyfile: str | None = None,
-        ssl_ca_certs: str | None = None,
-        ssl_certfile: str | None = None,
-        ssl_check_hostname: bool = True,
+        connection_pool: ConnectionPool,
+        namespace: str = "mcsd",
+        object_ttl: int = 600,
+        compress: bool = False,
     ) -> None:
         self.run_id = run_id
-        self.__redis = Redis(
-            host=host,
-            port=port,
-            db=0,
-            ssl=ssl,
-            ssl_keyfile=ssl_keyfile,
-            ssl_certfile=ssl_certfile,
-            ssl_ca_certs=ssl_ca_certs,
-            ssl_check_hostname=ssl_check_hostname,
-        )
+        self.__run_key = f"{namespace}:{run_id}"
+        self.__object_ttl = object_ttl
+        self.__compress = compress
+        # The pool is shared between runs, so connections are reused instead of opened per run
+        self.__redis = Redis(connection_pool=connection_pool)
 
     def get_node(self, id: str) -> Node | None:
-        target_id = self.make_target_id(id)
-        if self.key_exists(target_id) is False:
+        serialized_data = self.__redis.hget(self.__run_key, id)
+        if serialized_data is None:
             return None
 
-        serialized_data = self.__redis.get(target_id)
-        return Node.model_validate_json(serialized_data)    # type: ignore[arg-type]
+        return decode_node(serialized_data)  # type: ignore[arg-type]
+
+    def get_nodes(self, ids: List[str]) -> Dict[str, Node]:
+        unique_ids = list(dict.fromkeys(ids))
+        if not unique_ids:
+            return {}
+
+        # All HMGET commands are sent in one pipeline, so the lookup takes a single round trip
+        pipeline = self.__redis.pipeline(transaction=False)
+        for i in range(0, len(unique_ids), HMGET_BATCH_SIZE):
+            pipeline.hmget(self.__run_key, unique_ids[i : i + HMGET_BATCH_SIZE])
+        values = [value for batch_values in pipeline.execute() for value in batch_values]
+
+        return {
+            id: decode_node(value)
+            for id, value in zip(unique_ids, values)
+            if value is not None
+        }
 
     def add_node(self, node: Node) -> None:
-        target_id = self.make_target_id(node.resource_id)
-        serialized_data = node.model_dump_json()
-        self.__redis.set(target_id, serialized_data)
+        serialized_data = encode_node(node, self.__compress)
+        pipeline = self.__redis.pipeline(transaction=False)
+        pipeline.hset(self.__run_key, node.resource_id, serialized_data)
+        if self.__object_ttl > 0:
+            pipeline.expire(self.__run_key, self.__object_ttl)
+        pipeline.execute()
 
     def key_exists(self, id: str) -> bool:
-        return bool(self.__redis.exists(id))
+        return bool(self.__redis.hexists(self.__run_key, id))
 
     def clear(self) -> None:
-        self.__redis.flushdb()
+        self.__redis.delete(self.__run_key)
 
     def is_healthy(self) -> bool:
         try:
@@ -61,6 +81,6 @@ class ExternalCachingService(CachingService):
 
     def keys(self) -> List[str]:
         return [
-            key.decode("utf-8").replace(f"{self.run_id}-", "")
-            for key in self.__redis.scan_iter()
+            key.decode("utf-8") if isinstance(key, bytes) else key
+            for key in self.__redis.hkeys(self.__run_key)
         ]
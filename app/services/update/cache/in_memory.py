@@ -1,38 +1,196 @@
+from collections import OrderedDict
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
 from typing import Dict, List
 from uuid import UUID
 from app.models.adjacency.node import Node
 from app.services.update.cache.caching_service import CachingService
+from app.services.update.cache.node_codec import decode_node, encode_node
+
+logger = logging.getLogger(__name__)
+
+# Approximate memory used by a cached node apart from its strings: the model, its field dict and
+# fields set, and the slot in the LRU dict
+NODE_BASE_SIZE = 900
+
+
+def estimate_node_size(target_id: str, node: Node) -> int:
+    strings = (
+        target_id,
+        node.resource_id,
+        node.resource_type,
+        node.directory_hash,
+        node.update_client_hash,
+    )
+    return NODE_BASE_SIZE + sum(sys.getsizeof(s) for s in strings if s is not None)
+
+
+class _SpillStore:
+    """
+    Local SQLite file with the nodes that were evicted from memory, in the node_codec encoding.
+    """
+
+    def __init__(self, spill_dir: str, run_id: UUID) -> None:
+        os.makedirs(spill_dir, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix=f"cache-{run_id}-", suffix=".db", dir=spill_dir)
+        os.close(fd)
+        # Access is serialized by the lock of the caching service
+        self.__conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.__conn.execute("PRAGMA journal_mode=OFF")
+        self.__conn.execute("PRAGMA synchronous=OFF")
+        self.__conn.execute("CREATE TABLE nodes (id TEXT PRIMARY KEY, data BLOB NOT NULL)")
+
+    def put(self, target_id: str, node: Node) -> None:
+        self.__conn.execute(
+            "INSERT OR REPLACE INTO nodes (id, data) VALUES (?, ?)",
+            (target_id, encode_node(node)),
+        )
+
+    def pop(self, target_id: str) -> Node | None:
+        row = self.__conn.execute("SELECT data FROM nodes WHERE id = ?", (target_id,)).fetchone()
+        if row is None:
+            return None
+
+        self.__conn.execute("DELETE FROM nodes WHERE id = ?", (target_id,))
+        return decode_node(row[0])
+
+    def contains(self, target_id: str) -> bool:
+        row = self.__conn.execute("SELECT 1 FROM nodes WHERE id = ?", (target_id,)).fetchone()
+        return row is not None
+
+    def keys(self) -> List[str]:
+        return [row[0] for row in self.__conn.execute("SELECT id FROM nodes")]
+
+    def close(self) -> None:
+        self.__conn.close()
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            logger.warning(f"Could not remove cache spill file {self.path}: {e}")
 
 
 class InMemoryCachingService(CachingService):
     """
     Caching service that uses in-memory storage to store nodes.
+
+    The cache can be bounded by a number of nodes and/or an approximate number of bytes. When a
+    bound is exceeded, the least recently used nodes are evicted, to a local spill file when a
+    spill directory is set. Evicted nodes that were not spilled are processed again when they are
+    seen again in the run, which is slower but does not change the outcome of the update.
     """
 
-    def __init__(self, run_id: UUID) -> None:
-        self.__data: Dict[str, Node] = {}
+    def __init__(
+        self,
+        run_id: UUID,
+        max_nodes: int = 0,
+        max_bytes: int = 0,
+        spill_dir: str | None = None,
+    ) -> None:
+        self.__data: OrderedDict[str, Node] = OrderedDict()
+        self.__sizes: Dict[str, int] = {}
+        self.__bytes = 0
+        self.__max_nodes = max_nodes
+        self.__max_bytes = max_bytes
+        self.__spill_dir = spill_dir
+        self.__spill: _SpillStore | None = None
+        self.__stats = {"hits": 0, "misses": 0, "evictions": 0, "spilled": 0}
+        self.__lock = threading.Lock()
         self.run_id = run_id
 
     def get_node(self, id: str) -> Node | None:
-        if not self.key_exists(id):
-            return None
+        with self.__lock:
+            return self.__lookup(self.make_target_id(id))
 
-        target_id = self.make_target_id(id)
-        return self.__data[target_id]
+    def get_nodes(self, ids: List[str]) -> Dict[str, Node]:
+        nodes: Dict[str, Node] = {}
+        with self.__lock:
+            for id in ids:
+                node = self.__lookup(self.make_target_id(id))
+                if node is not None:
+                    nodes[id] = node
+        return nodes
 
     def add_node(self, node: Node) -> None:
         target_id = self.make_target_id(node.resource_id)
-        self.__data[target_id] = node
+        with self.__lock:
+            self.__store(target_id, node)
 
     def key_exists(self, id: str) -> bool:
         target_id = self.make_target_id(id)
-        return target_id in self.__data.keys()
+        with self.__lock:
+            if target_id in self.__data:
+                self.__data.move_to_end(target_id)
+                self.__stats["hits"] += 1
+                return True
+
+            exists = self.__spill is not None and self.__spill.contains(target_id)
+            self.__stats["hits" if exists else "misses"] += 1
+            return exists
 
     def is_healthy(self) -> bool:
         return True
 
     def clear(self) -> None:
-        self.__data = {}
+        with self.__lock:
+            self.__data = OrderedDict()
+            self.__sizes = {}
+            self.__bytes = 0
+            if self.__spill is not None:
+                self.__spill.close()
+                self.__spill = None
 
     def keys(self) -> List[str]:
-        return [key.replace(f"{self.run_id}-", "") for key in self.__data.keys()]
+        with self.__lock:
+            keys = list(self.__data.keys())
+            if self.__spill is not None:
+                keys.extend(self.__spill.keys())
+        return [key.replace(f"{self.run_id}-", "") for key in keys]
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return {**self.__stats, "nodes": len(self.__data), "bytes": self.__bytes}
+
+    def __lookup(self, target_id: str) -> Node | None:
+        node = self.__data.get(target_id)
+        if node is not None:
+            self.__data.move_to_end(target_id)
+            self.__stats["hits"] += 1
+            return node
+
+        node = self.__spill.pop(target_id) if self.__spill is not None else None
+        if node is None:
+            self.__stats["misses"] += 1
+            return None
+
+        # A spilled node that is used again is moved back into memory
+        self.__stats["hits"] += 1
+        self.__store(target_id, node)
+        return node
+
+    def __store(self, target_id: str, node: Node) -> None:
+        size = estimate_node_size(target_id, node)
+        self.__bytes += size - self.__sizes.get(target_id, 0)
+        self.__sizes[target_id] = size
+        self.__data[target_id] = node
+        self.__data.move_to_end(target_id)
+        self.__evict()
+
+    def __evict(self) -> None:
+        while len(self.__data) > 1 and (
+            (self.__max_nodes > 0 and len(self.__data) > self.__max_nodes)
+            or (self.__max_bytes > 0 and self.__bytes > self.__max_bytes)
+        ):
+            target_id, node = self.__data.popitem(last=False)
+            self.__bytes -= self.__sizes.pop(target_id)
+            self.__stats["evictions"] += 1
+
+            if self.__spill_dir is not None:
+                if self.__spill is None:
+                    self.__spill = _SpillStore(self.__spill_dir, self.run_id)
+                    logger.info(f"Spilling in memory cache of run {self.run_id} to {self.__spill.path}")
+                self.__spill.put(target_id, node)
+                self.__stats["spilled"] += 1
@@ -0,0 +1,138 @@
+import struct
+import zlib
+from typing import Tuple
+
+from app.models.adjacency.node import Node
+
+# Binary encoding of a Node that has been cleared for the cache. Only the fields that are kept by
+# clear_for_cache are stored:
+#
+#   header  version (1 byte), flags (1 byte), method index (1 byte), status index (1 byte)
+#   body    resource_id, resource_type, directory_hash, update_client_hash
+#
+# The body is zlib compressed when FLAG_COMPRESSED is set. The index tables below are part of the
+# format, new values must be appended and a change in layout needs a new version.
+CODEC_VERSION = 1
+
+FLAG_COMPRESSED = 0x01
+FLAG_UPDATED = 0x02
+FLAG_VISITED = 0x04
+
+METHODS = ("GET", "POST", "PATCH", "PUT", "HEAD", "DELETE")
+STATUSES = ("ignore", "equal", "delete", "update", "new", "unknown")
+
+# Tags of an optional string field. Hex digests are stored as their raw bytes, at half the size.
+_TAG_NONE = 0
+_TAG_STR = 1
+_TAG_HEX = 2
+
+# Smaller bodies do not get smaller by compressing them
+COMPRESS_MIN_SIZE = 128
+
+_HEADER = struct.Struct(">BBBB")
+_LENGTH = struct.Struct(">H")
+
+
+def _encode_str(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return _LENGTH.pack(len(data)) + data
+
+
+def _encode_optional_str(value: str | None) -> bytes:
+    if value is None:
+        return bytes([_TAG_NONE])
+
+    if len(value) % 2 == 0:
+        try:
+            digest = bytes.fromhex(value)
+            if digest.hex() == value:
+                return bytes([_TAG_HEX]) + _LENGTH.pack(len(digest)) + digest
+        except ValueError:
+            pass
+
+    return bytes([_TAG_STR]) + _encode_str(value)
+
+
+def _decode_str(data: bytes, offset: int) -> Tuple[str, int]:
+    (length,) = _LENGTH.unpack_from(data, offset)
+    start = offset + _LENGTH.size
+    return data[start : start + length].decode("utf-8"), start + length
+
+
+def _decode_optional_str(data: bytes, offset: int) -> Tuple[str | None, int]:
+    tag = data[offset]
+    if tag == _TAG_NONE:
+        return None, offset + 1
+    if tag == _TAG_STR:
+        return _decode_str(data, offset + 1)
+    if tag == _TAG_HEX:
+        (length,) = _LENGTH.unpack_from(data, offset + 1)
+        start = offset + 1 + _LENGTH.size
+        return data[start : start + length].hex(), start + length
+
+    raise ValueError(f"Unknown field tag {tag} in cached node")
+
+
+def encode_node(node: Node, compress: bool = False) -> bytes:
+    """
+    Encodes the cached fields of a node. References, entries and update data are not stored,
+    so the node should be cleared for the cache first.
+    """
+    body = b"".join(
+        (
+            _encode_str(node.resource_id),
+            _encode_str(node.resource_type),
+            _encode_optional_str(node.directory_hash),
+            _encode_optional_str(node.update_client_hash),
+        )
+    )
+
+    flags = 0
+    if node.updated:
+        flags |= FLAG_UPDATED
+    if node.visited:
+        flags |= FLAG_VISITED
+    if compress and len(body) >= COMPRESS_MIN_SIZE:
+        compressed = zlib.compress(body, 1)
+        if len(compressed) < len(body):
+            body = compressed
+            flags |= FLAG_COMPRESSED
+
+    header = _HEADER.pack(
+        CODEC_VERSION, flags, METHODS.index(node.method), STATUSES.index(node.status)
+    )
+    return header + body
+
+
+def decode_node(data: bytes) -> Node:
+    """
+    Decodes a node encoded with encode_node. The node is constructed without validation, as it
+    was valid when it was encoded.
+    """
+    version, flags, method, status = _HEADER.unpack_from(data)
+    if version != CODEC_VERSION:
+        raise ValueError(f"Unsupported cached node version {version}")
+
+    body = data[_HEADER.size :]
+    if flags & FLAG_COMPRESSED:
+        body = zlib.decompress(body)
+
+    resource_id, offset = _decode_str(body, 0)
+    resource_type, offset = _decode_str(body, offset)
+    directory_hash, offset = _decode_optional_str(body, offset)
+    update_client_hash, _ = _decode_optional_str(body, offset)
+
+    return Node.model_construct(
+        resource_id=resource_id,
+        resource_type=resource_type,
+        references=[],
+        visited=bool(flags & FLAG_VISITED),
+        updated=bool(flags & FLAG_UPDATED),
+        method=METHODS[method],
+        status=STATUSES[status],
+        directory_hash=directory_hash,
+        update_client_hash=update_client_hash,
+        update_data=None,
+        directory_entry=None,
+        directory_payload=None,
+    )
@@ -1,43 +1,64 @@
 import logging
+from typing import Any, Dict
 from uuid import uuid4
 
 from app.config import ConfigExternalCache
 from app.services.update.cache.caching_service import CachingService
 from app.services.update.cache.external import ExternalCachingService
 from app.services.update.cache.in_memory import InMemoryCachingService
+from app.services.update.cache.redis_pool import RedisPool
+from app.services.update.cache.tiered import TieredCachingService
 
 logger = logging.getLogger(__name__)
 
 
 class CacheProvider:
     """
-    Factory class to create a caching service based on the provided configuration.
+    Factory class to create a caching service based on the provided configuration. All external
+    caching services share the connection pool of the provider.
     """
     def __init__(self, config: ConfigExternalCache) -> None:
         self.__config = config
+        self.__pool: RedisPool | None = None
+        if self.__config.host is not None and self.__config.port is not None:
+            self.__pool = RedisPool(config)
 
     def create(self) -> CachingService:
         run_id = uuid4()
 
-        if self.__config.host is not None and self.__config.port is not None:
+        if self.__pool is not None and self.__pool.is_healthy():
+            logger.info(f"creating external cache instance with runner id {run_id}")
             external_cache_instance = ExternalCachingService(
                 run_id=run_id,
-                host=self.__config.host,
-                port=self.__config.port,
-                ssl=self.__config.ssl,
-                ssl_keyfile=self.__config.key,
-                ssl_certfile=self.__config.cert,
-                ssl_ca_certs=self.__config.cafile,
-                ssl_check_hostname=self.__config.check_hostname,
+                connection_pool=self.__pool.connection_pool,
+                namespace=self.__config.default_cache_namespace,
+                object_ttl=self.__config.object_ttl,
+                compress=self.__config.compress_nodes,
             )
-            healthy_external_cache = external_cache_instance.is_healthy()
-
-            if healthy_external_cache:
-                logger.info(f"creating external cache instance with runner id {run_id}")
-                return external_cache_instance
+            if self.__config.l1_max_nodes > 0:
+                return TieredCachingService(
+                    external_cache_instance, max_nodes=self.__config.l1_max_nodes
+                )
+            return external_cache_instance
 
         logger.info(
             f"Unable to create external cache instance, defaulting to in memory with run id {run_id}"
         )
 
-        return InMemoryCachingService(run_id)
+        return InMemoryCachingService(
+            run_id,
+            max_nodes=self.__config.in_memory_max_nodes,
+            max_bytes=self.__config.in_memory_max_bytes,
+            spill_dir=self.__config.in_memory_spill_dir,
+        )
+
+    def get_stats(self) -> Dict[str, Any] | None:
+        """
+        Returns the health and connection usage of the external cache pool, or None when no
+        external cache is configured.
+        """
+        return self.__pool.get_stats() if self.__pool is not None else None
+
+    def close(self) -> None:
+        if self.__pool is not None:
+            self.__pool.close()
@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from typing import Any, Dict
+
+from redis import BlockingConnectionPool, ConnectionError, Redis, SSLConnection
+
+from app.config import ConfigExternalCache
+
+logger = logging.getLogger(__name__)
+
+# Seconds a caller waits for a free connection when all pooled connections are in use
+POOL_TIMEOUT = 10
+
+
+class RedisPool:
+    """
+    Process-wide connection pool to the external cache, shared by all ExternalCachingService
+    instances. The health of Redis is checked in a background thread, so creating a cache for an
+    update run does not need a round trip to Redis.
+    """
+
+    def __init__(self, config: ConfigExternalCache) -> None:
+        connection_kwargs: Dict[str, Any] = {}
+        if config.ssl:
+            connection_kwargs = {
+                "connection_class": SSLConnection,
+                "ssl_keyfile": config.key,
+                "ssl_certfile": config.cert,
+                "ssl_ca_certs": config.cafile,
+                "ssl_check_hostname": config.check_hostname,
+            }
+
+        self.__pool = BlockingConnectionPool(  # type: ignore[no-untyped-call]
+            host=config.host,
+            port=config.port,
+            db=0,
+            max_connections=config.max_connections,
+            timeout=POOL_TIMEOUT,
+            # Idle connections are checked before reuse, so a dropped connection is replaced
+            health_check_interval=config.health_check_interval,
+            **connection_kwargs,
+        )
+        self.__health_check_interval = config.health_check_interval
+        self.__healthy: bool | None = None
+        self.__checked_at: float | None = None
+        self.__lock = threading.Lock()
+        self.__thread: threading.Thread | None = None
+        self.__stop_event = threading.Event()
+
+    @property
+    def connection_pool(self) -> BlockingConnectionPool:
+        return self.__pool
+
+    def is_healthy(self) -> bool:
+        """
+        Returns the last known health of Redis. The first call checks it directly and starts
+        refreshing it in the background.
+        """
+        with self.__lock:
+            healthy = self.__healthy
+            if self.__thread is None:
+                self.__thread = threading.Thread(
+                    target=self.__run, name="redis-health-check", daemon=True
+                )
+                self.__thread.start()
+
+        if healthy is None:
+            healthy = self.check_health()
+
+        return healthy
+
+    def check_health(self) -> bool:
+        try:
+            healthy = bool(Redis(connection_pool=self.__pool).ping())
+        except ConnectionError as e:
+            logger.warning(f"External cache is not reachable: {e}")
+            healthy = False
+
+        with self.__lock:
+            self.__healthy = healthy
+            self.__checked_at = time.time()
+
+        return healthy
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns the health and connection usage of the pool.
+        """
+        # Free slots of the blocking pool are kept as None in its queue
+        connections = len(self.__pool._connections)
+        idle = sum(1 for connection in list(self.__pool.pool.queue) if connection is not None)
+
+        with self.__lock:
+            healthy = self.__healthy
+            checked_at = self.__checked_at
+
+        return {
+            "healthy": healthy,
+            "checked_at": checked_at,
+            "max_connections": self.__pool.max_connections,
+            "connections_opened": connections,
+            "connections_in_use": connections - idle,
+            "connections_idle": idle,
+        }
+
+    def close(self) -> None:
+        """
+        Stops the health check and disconnects all pooled connections.
+        """
+        self.__stop_event.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        self.__pool.disconnect()
+
+    def __run(self) -> None:
+        while not self.__stop_event.wait(self.__health_check_interval):
+            self.check_health()
@@ -0,0 +1,71 @@
+from typing import Dict, List
+from app.models.adjacency.node import Node
+from app.services.update.cache.caching_service import CachingService
+from app.services.update.cache.in_memory import InMemoryCachingService
+
+DEFAULT_L1_MAX_NODES = 10000
+
+
+class TieredCachingService(CachingService):
+    """
+    Caching service that keeps a small in-process LRU cache (L1) in front of another caching
+    service (L2), usually the external cache. Writes go to both levels, lookups only go to L2
+    when the node is not in L1. Nodes found in L2 are kept in L1, so references that are looked
+    up over and over, like parent organizations and shared endpoints, take a single round trip.
+    """
+
+    def __init__(self, l2: CachingService, max_nodes: int = DEFAULT_L1_MAX_NODES) -> None:
+        self.run_id = l2.run_id
+        self.__l1 = InMemoryCachingService(l2.run_id, max_nodes=max_nodes)
+        self.__l2 = l2
+
+    @property
+    def l2(self) -> CachingService:
+        return self.__l2
+
+    def get_node(self, id: str) -> Node | None:
+        node = self.__l1.get_node(id)
+        if node is not None:
+            return node
+
+        node = self.__l2.get_node(id)
+        if node is not None:
+            self.__l1.add_node(node)
+        return node
+
+    def get_nodes(self, ids: List[str]) -> Dict[str, Node]:
+        nodes = self.__l1.get_nodes(ids)
+        missing = [id for id in ids if id not in nodes]
+        if missing:
+            for id, node in self.__l2.get_nodes(missing).items():
+                self.__l1.add_node(node)
+                nodes[id] = node
+        return nodes
+
+    def add_node(self, node: Node) -> None:
+        # Written to L2 first, so L1 never holds a node that is missing from L2
+        self.__l2.add_node(node)
+        self.__l1.add_node(node)
+
+    def key_exists(self, id: str) -> bool:
+        if self.__l1.key_exists(id):
+            return True
+
+        # Fetching the node costs the same round trip as checking its key, and keeps it in L1
+        return self.get_node(id) is not None
+
+    def is_healthy(self) -> bool:
+        return self.__l2.is_healthy()
+
+    def clear(self) -> None:
+        self.__l1.clear()
+        self.__l2.clear()
+
+    def keys(self) -> List[str]:
+        return self.__l2.keys()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            **{f"l1_{key}": value for key, value in self.__l1.get_stats().items()},
+            **self.__l2.get_stats(),
+        }
@@ -1,34 +1,110 @@
-import copy
-from typing import Literal
+from datetime import datetime, time, timezone
+from hashlib import blake2b
+import json
+import re
+from typing import Any, Dict, Literal
 from fhir.resources.R4B.bundle import BundleEntry
 from fhir.resources.R4B.domainresource import DomainResource
 
 from app.db.entities.resource_map import ResourceMap
+from app.models.fhir.raw_entry import RawBundleEntry
 from app.services.fhir.fhir_service import FhirService
+from app.services.update.filter_ura import filter_ura_data
+
+# Fields that differ between the directory and the update client for the same content
+IGNORED_HASH_FIELDS = ("id", "meta")
+DIGEST_SIZE = 16
+# Content hash stored for resources that were deleted from the update client, so they are known
+# to be absent without reading them again
+DELETED_CONTENT_HASH = "deleted"
+
+# dateTime and instant values with a time, and time values, which can be written in more than one
+# way for the same moment
+DATE_TIME_PATTERN = re.compile(
+    r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:\d{2})?$"
+)
+TIME_PATTERN = re.compile(r"^\d{2}:\d{2}:\d{2}(\.\d+)?$")
+
+
+def canonicalize(value: Any) -> Any:
+    """
+    Returns the JSON of a resource in a single canonical form, so the raw JSON of a directory
+    and the dump of a validated model hash the same. Null, empty lists and empty objects are
+    left out, and dates with a time and times are written the same way.
+    """
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            item = canonicalize(item)
+            if item is None or item == [] or item == {}:
+                continue
+            result[key] = item
+        return result
+
+    if isinstance(value, list):
+        return [canonicalize(item) for item in value]
+
+    if isinstance(value, str):
+        return canonicalize_temporal(value)
+
+    return value
+
+
+def canonicalize_temporal(value: str) -> str:
+    try:
+        if DATE_TIME_PATTERN.match(value):
+            moment = datetime.fromisoformat(value)
+            if moment.tzinfo is not None:
+                moment = moment.astimezone(timezone.utc)
+            return moment.isoformat()
+
+        if TIME_PATTERN.match(value):
+            return time.fromisoformat(value).isoformat()
+    except ValueError:
+        pass
+
+    return value
 
 
 class ComputationService:
     def __init__(
         self,
         directory_id: str,
+        uras_allowed: list[str] | None = None,
+        verify_update_client: bool = False,
     ) -> None:
         self.__directory_id = directory_id
+        self.__uras_allowed = uras_allowed
+        self.__verify_update_client = verify_update_client
 
     def get_update_status(
         self,
         method: str,
-        directory_hash: int | None = None,
-        update_client_hash: int | None = None,
+        directory_hash: str | None = None,
+        update_client_hash: str | None = None,
         resource_map: ResourceMap | None = None,
     ) -> Literal["ignore", "equal", "delete", "update", "new"]:
+        # Unless the update client is verified, the hash of the content we last wrote to it is
+        # used when its current content was not read
+        if (
+            update_client_hash is None
+            and resource_map is not None
+            and not self.__verify_update_client
+        ):
+            update_client_hash = (
+                None
+                if resource_map.content_hash == DELETED_CONTENT_HASH
+                else resource_map.content_hash
+            )
+
         return self._determine_update_status(
             directory_hash, update_client_hash, resource_map, method
         )
 
     def _determine_update_status(
         self,
-        directory_hash: int | None,
-        update_client_hash: int | None,
+        directory_hash: str | None,
+        update_client_hash: str | None,
         resource_map: ResourceMap | None,
         method: str,
     ) -> Literal["ignore", "equal", "delete", "update", "new"]:
@@ -56,23 +132,49 @@ class ComputationService:
 
         return "update"
 
-    def hash_directory_entry(self, entry: BundleEntry) -> int | None:
-        if entry.resource is None or not isinstance(entry.resource, DomainResource):
+    def create_payload(self, entry: BundleEntry | RawBundleEntry) -> Dict[str, Any] | None:
+        """
+        Returns the JSON of the resource as it is written to the update client: with namespaced
+        references and, for Organizations, only the allowed URAs. The entry itself is left as is.
+        """
+        if isinstance(entry, BundleEntry):
+            entry = RawBundleEntry.from_bundle_entry(entry)
+
+        # Only domain resources are written, not nested Bundles
+        resource = entry.resource
+        if resource is None or resource.get("resourceType") in (None, "Bundle"):
             return None
 
-        resource = copy.deepcopy(entry.resource)
-        FhirService.namespace_resource_references(resource, self.__directory_id)
+        if resource["resourceType"] == "Organization" and self.__uras_allowed is not None:
+            resource = filter_ura_data(resource, self.__uras_allowed)
+
+        return FhirService.namespace_data_references(resource, self.__directory_id)
 
-        return self.hash_resource(resource)
+    def hash_directory_entry(self, entry: BundleEntry | RawBundleEntry) -> str | None:
+        payload = self.create_payload(entry)
+        if payload is None:
+            return None
 
-    def hash_update_client_entry(self, entry: BundleEntry) -> int | None:
+        return self.hash_data(payload)
+
+    def hash_update_client_entry(self, entry: BundleEntry) -> str | None:
         if entry.resource is None or not isinstance(entry.resource, DomainResource):
             return None
 
-        resource = copy.deepcopy(entry.resource)
-        return self.hash_resource(resource)
+        return self.hash_resource(entry.resource)
+
+    def hash_resource(self, resource: DomainResource) -> str:
+        """
+        Returns a digest of the content of the resource, without its id and meta. The digest only
+        depends on the content, so it is the same across processes and hosts.
+        """
+        return self.hash_data(resource.model_dump(mode="json"))
 
-    def hash_resource(self, resource: DomainResource) -> int:
-        resource.meta = None
-        resource.id = None
-        return hash(resource.model_dump().__repr__())
+    def hash_data(self, data: Dict[str, Any]) -> str:
+        """
+        Same as hash_resource, on the JSON of a resource. Raises a TypeError for values that are
+        not JSON, like datetimes, as those have no single representation.
+        """
+        content = canonicalize({k: v for k, v in data.items() if k not in IGNORED_HASH_FIELDS})
+        canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return blake2b(canonical.encode("utf-8"), digest_size=DIGEST_SIZE).hexdigest()
@@ -0,0 +1,59 @@
+from typing import Dict, List, Set
+
+from app.models.fhir.types import McsdResources
+
+# Resource types that each mCSD resource type can reference. Self references (e.g. Organization.partOf)
+# are left out, and so is Organization.endpoint: Endpoint.managingOrganization points back to Organization,
+# which would otherwise create a cycle. References that still point "forward" are resolved by the
+# adjacency map as usual; the ordering only makes sure that most references are already cached.
+MCSD_RESOURCE_DEPENDENCIES: Dict[McsdResources, Set[McsdResources]] = {
+    McsdResources.ORGANIZATION: set(),
+    McsdResources.ENDPOINT: {McsdResources.ORGANIZATION},
+    McsdResources.PRACTITIONER: {McsdResources.ORGANIZATION},
+    McsdResources.LOCATION: {McsdResources.ORGANIZATION, McsdResources.ENDPOINT},
+    McsdResources.HEALTHCARE_SERVICE: {
+        McsdResources.ORGANIZATION,
+        McsdResources.LOCATION,
+        McsdResources.ENDPOINT,
+    },
+    McsdResources.PRACTITIONER_ROLE: {
+        McsdResources.PRACTITIONER,
+        McsdResources.ORGANIZATION,
+        McsdResources.LOCATION,
+        McsdResources.HEALTHCARE_SERVICE,
+        McsdResources.ENDPOINT,
+    },
+    McsdResources.ORGANIZATION_AFFILIATION: {
+        McsdResources.ORGANIZATION,
+        McsdResources.LOCATION,
+        McsdResources.HEALTHCARE_SERVICE,
+        McsdResources.ENDPOINT,
+    },
+}
+
+
+def create_stages(
+    dependencies: Dict[McsdResources, Set[McsdResources]] = MCSD_RESOURCE_DEPENDENCIES,
+) -> List[List[McsdResources]]:
+    """
+    Groups resource types into stages. Every type only depends on types of earlier stages,
+    so all types within a single stage can be synced in parallel.
+    """
+    remaining = {res: set(deps) for res, deps in dependencies.items()}
+    stages: List[List[McsdResources]] = []
+
+    while remaining:
+        # Keep the McsdResources declaration order within a stage to have a deterministic schedule
+        stage = [res for res in McsdResources if res in remaining and not remaining[res]]
+        if not stage:
+            raise ValueError(
+                f"Circular dependency between resource types: {[r.value for r in remaining]}"
+            )
+
+        stages.append(stage)
+        for res in stage:
+            del remaining[res]
+        for deps in remaining.values():
+            deps.difference_update(stage)
+
+    return stages
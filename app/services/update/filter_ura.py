@@ -1,5 +1,5 @@
 import copy
-from typing import Dict, List
+from typing import Any, Dict, List
 
 from fhir.resources.R4B.organization import Organization
 
@@ -27,6 +27,24 @@ def filter_ura(org: Organization, uras_allowed: list[str]) -> Organization:
     return new_org
 
 
+def filter_ura_data(data: Dict[str, Any], uras_allowed: list[str]) -> Dict[str, Any]:
+    """
+    Same as filter_ura, on the JSON of an organization. Returns a copy, the original is left as is.
+    """
+    if "identifier" not in data:
+        return data
+
+    filtered_identifiers = [
+        identifier
+        for identifier in data["identifier"] or []
+        if not (
+            str(identifier.get("system", "")).lower() == ID_SYSTEM_URA
+            and identifier.get("value") not in uras_allowed
+        )
+    ]
+    return {**data, "identifier": filtered_identifiers}
+
+
 def create_ura_whitelist(directories: list[DirectoryDto]) -> UraWhitelist:
     """
     Creates a URA whitelist dictionary from the provided directories.
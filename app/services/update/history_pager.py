@@ -0,0 +1,130 @@
+import logging
+import threading
+from queue import Full, Queue
+from typing import Any, Dict, Generator, List
+
+from app.services.api.fhir_api import FhirApi
+from app.models.fhir.raw_entry import RawBundleEntry
+
+logger = logging.getLogger(__name__)
+
+# Page, error raised by the producer, or None when all pages have been fetched
+_QueueItem = List[RawBundleEntry] | Exception | None
+
+PUT_POLL_INTERVAL = 0.1
+
+
+def iter_history_pages(
+    api: FhirApi,
+    resource_type: str,
+    params: Dict[str, Any] | None,
+    prefetch_depth: int = 0,
+    stream_window: int = 0,
+) -> Generator[List[RawBundleEntry], None, None]:
+    """
+    Yields the entries of each _history page of a resource type. When prefetch_depth is set, the
+    next pages are fetched in a background thread while the current page is processed. At most
+    prefetch_depth pages are kept in memory; the producer blocks until the consumer catches up.
+
+    When stream_window is set, pages are streamed instead and yielded in windows of at most
+    stream_window entries, so memory is bounded by the window instead of the page size.
+    """
+    if prefetch_depth <= 0:
+        yield from _iter_pages(api, resource_type, params, stream_window)
+        return
+
+    yield from _iter_prefetched_pages(
+        api, resource_type, params, prefetch_depth, stream_window
+    )
+
+
+def _iter_pages(
+    api: FhirApi,
+    resource_type: str,
+    params: Dict[str, Any] | None,
+    stream_window: int = 0,
+) -> Generator[List[RawBundleEntry], None, None]:
+    if stream_window > 0:
+        yield from _iter_streamed_windows(api, resource_type, params, stream_window)
+        return
+
+    next_params = params
+    while next_params is not None:
+        next_params, entries = api.get_history_batch(resource_type, next_params)
+        yield entries
+
+
+def _iter_streamed_windows(
+    api: FhirApi,
+    resource_type: str,
+    params: Dict[str, Any] | None,
+    stream_window: int,
+) -> Generator[List[RawBundleEntry], None, None]:
+    next_params = params
+    while next_params is not None:
+        entries = api.stream_history_batch(resource_type, next_params)
+        window: List[RawBundleEntry] = []
+        try:
+            while True:
+                try:
+                    window.append(next(entries))
+                except StopIteration as stop:
+                    next_params = stop.value
+                    break
+
+                if len(window) >= stream_window:
+                    yield window
+                    window = []
+        finally:
+            # Releases the connection when the consumer stops halfway through a page
+            entries.close()
+
+        if window:
+            yield window
+
+
+def _iter_prefetched_pages(
+    api: FhirApi,
+    resource_type: str,
+    params: Dict[str, Any] | None,
+    prefetch_depth: int,
+    stream_window: int = 0,
+) -> Generator[List[RawBundleEntry], None, None]:
+    pages: Queue[_QueueItem] = Queue(maxsize=prefetch_depth)
+    stop = threading.Event()
+
+    def put(item: _QueueItem) -> bool:
+        # Wait for room in the queue, but give up when the consumer has stopped
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=PUT_POLL_INTERVAL)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for entries in _iter_pages(api, resource_type, params, stream_window):
+                if not put(entries):
+                    return
+            put(None)
+        except Exception as e:
+            logger.error(f"Failed to prefetch {resource_type} history page: {e}")
+            put(e)
+
+    producer = threading.Thread(
+        target=produce, name=f"history-prefetch-{resource_type}", daemon=True
+    )
+    producer.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join()
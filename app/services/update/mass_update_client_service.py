@@ -1,11 +1,12 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
 from app.models.directory.dto import DirectoryDto
 from app.services.entity.directory_info_service import DirectoryInfoService
 from app.services.directory_provider.directory_provider import DirectoryProvider
-from app.services.update.filter_ura import create_ura_whitelist
+from app.services.update.filter_ura import UraWhitelist, create_ura_whitelist
 from app.services.update.update_client_service import UpdateClientService
 from app.stats import Stats
 
@@ -23,6 +24,7 @@ class MassUpdateClientService:
         mark_client_directory_as_deleted_after_lrza_delete: bool,
         ignore_client_directory_after_success_timeout_seconds: int,
         ignore_client_directory_after_failed_attempts_threshold: int,
+        max_parallel_directories: int = 1,
     ) -> None:
         self.__directory_provider = directory_provider
         self.__update_client_service = update_client_service
@@ -32,7 +34,7 @@ class MassUpdateClientService:
         self.__mark_client_directory_as_deleted_after_lrza_delete = mark_client_directory_as_deleted_after_lrza_delete
         self.__ignore_client_directory_after_success_timeout_seconds = ignore_client_directory_after_success_timeout_seconds
         self.__ignore_client_directory_after_failed_attempts_threshold = ignore_client_directory_after_failed_attempts_threshold
-
+        self.__max_parallel_directories = max(1, max_parallel_directories)
 
     def update_all(self) -> list[dict[str, Any]]:
         with self.__stats.timer("update_all_directories"):
@@ -43,31 +45,69 @@ class MassUpdateClientService:
                 return []
 
             ura_whitelist = create_ura_whitelist(all_directories)
+            if not all_directories:
+                return []
 
-            data: list[dict[str, Any]] = []
-            for directory in all_directories:
-                info = self.__directory_info_service.get_one_by_id(directory.id)
-                new_updated = datetime.now() - timedelta(seconds=60)
-                try:
-                    data.append(
-                        self.__update_client_service.update(
-                            directory,
-                            info.last_success_sync,
-                            ura_whitelist
-                        )
-                    )
-
-                    info.last_success_sync = new_updated # Update last success time
-                    info.failed_attempts = 0 # Reset on success
-                    self.__directory_info_service.update(directory_id=info.id, last_success_sync=info.last_success_sync, failed_attempts=info.failed_attempts)
-                except Exception as e:
-                    logging.error(f"Failed to update directory {directory.id}: {e}")
-                    info.failed_attempts += 1 # Increment failed attempts
-                    info.failed_sync_count += 1 # Increment total failed sync count
-                    self.__directory_info_service.update(directory_id=info.id, failed_attempts=info.failed_attempts, failed_sync_count=info.failed_sync_count)
-
+            # Each directory is synced in its own worker. The per-directory lock in the
+            # UpdateClientService still prevents the same directory from being synced twice.
+            max_workers = min(self.__max_parallel_directories, len(all_directories))
+            data = []
+            with ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="directory-update"
+            ) as executor:
+                futures = {
+                    executor.submit(self.__update_directory, directory, ura_whitelist): directory
+                    for directory in all_directories
+                }
+                for future, directory in futures.items():
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logging.error(f"Unexpected error while updating directory {directory.id}: {e}")
+                        continue
+                    if result is not None:
+                        data.append(result)
+
+            logging.info(
+                f"Updated {len(data)} of {len(all_directories)} directories with {max_workers} worker(s)"
+            )
             return data
 
+    def __update_directory(
+        self, directory: DirectoryDto, ura_whitelist: UraWhitelist
+    ) -> dict[str, Any] | None:
+        """
+        Update a single directory. Failures are recorded on the directory info and never propagate,
+        so a failing directory cannot affect the other directories in the same cycle.
+        """
+        try:
+            info = self.__directory_info_service.get_one_by_id(directory.id)
+        except Exception as e:
+            logging.error(f"Failed to retrieve directory info for {directory.id}: {e}")
+            return None
+
+        new_updated = datetime.now() - timedelta(seconds=60)
+        try:
+            result: dict[str, Any] = self.__update_client_service.update(
+                directory.model_copy(update={"last_success_sync": info.last_success_sync}),
+                info.last_success_sync,
+                ura_whitelist
+            )
+
+            info.last_success_sync = new_updated # Update last success time
+            info.failed_attempts = 0 # Reset on success
+            self.__directory_info_service.update(directory_id=info.id, last_success_sync=info.last_success_sync, failed_attempts=info.failed_attempts)
+            return result
+        except Exception as e:
+            logging.error(f"Failed to update directory {directory.id}: {e}")
+            info.failed_attempts += 1 # Increment failed attempts
+            info.failed_sync_count += 1 # Increment total failed sync count
+            try:
+                self.__directory_info_service.update(directory_id=info.id, failed_attempts=info.failed_attempts, failed_sync_count=info.failed_sync_count)
+            except Exception as e:
+                logging.error(f"Failed to record failed update of directory {directory.id}: {e}")
+            return None
+
     def cleanup_old_directories(self) -> None:
         with self.__stats.timer("cleanup_old_directories"):
             directories = self.__directory_info_service.get_all(include_ignored=True, include_deleted=True)
@@ -0,0 +1,89 @@
+import logging
+import threading
+from typing import List, Set
+
+from app.models.adjacency.node import Node, NodeReference
+from app.services.entity.resource_map_service import ResourceMapService
+from app.services.fhir.bundle.utils import HistoryVersionIndex
+from app.services.update.computation_service import DELETED_CONTENT_HASH
+
+logger = logging.getLogger(__name__)
+
+
+class NodeStateStore:
+    """
+    Resolves references to resources that are known to be unchanged since the previous sync,
+    from the state persisted in the resource maps, without requesting them from the directory or
+    the update client.
+
+    A resource is only known to be unchanged once the _history of its resource type has been
+    processed completely in the current sync. When it was not seen in that history, it did not
+    change since the previous sync. When it was seen, the version stored in its resource map has
+    to be the version seen in the history.
+    """
+
+    def __init__(
+        self,
+        directory_id: str,
+        resource_map_service: ResourceMapService,
+        version_index: HistoryVersionIndex,
+    ) -> None:
+        self.__directory_id = directory_id
+        self.__resource_map_service = resource_map_service
+        self.__version_index = version_index
+        self.__completed_types: Set[str] = set()
+        self.__lock = threading.Lock()
+
+    def complete_resource_type(self, resource_type: str) -> None:
+        """
+        Marks the _history of a resource type as processed completely in the current sync.
+        """
+        with self.__lock:
+            self.__completed_types.add(resource_type)
+
+    def resolve(self, refs: List[NodeReference]) -> List[Node]:
+        """
+        Returns nodes for the references whose resource is known to be unchanged and present in
+        the update client. Other references are left out and have to be fetched.
+        """
+        with self.__lock:
+            completed_types = set(self.__completed_types)
+
+        candidates = {
+            (ref.resource_type, ref.id): ref for ref in refs if ref.resource_type in completed_types
+        }
+        if not candidates:
+            return []
+
+        resource_maps = self.__resource_map_service.get_many(
+            [(self.__directory_id, res_type, res_id) for res_type, res_id in candidates]
+        )
+
+        nodes = []
+        for (res_type, res_id), ref in candidates.items():
+            resource_map = resource_maps.get((self.__directory_id, res_type, res_id))
+            if resource_map is None or resource_map.content_hash in (None, DELETED_CONTENT_HASH):
+                continue
+
+            seen = self.__version_index.get(res_type, res_id)
+            if seen is not None and (
+                seen.version_id is None or seen.version_id != resource_map.directory_version_id
+            ):
+                continue
+
+            nodes.append(
+                Node(
+                    resource_id=ref.id,
+                    resource_type=ref.resource_type,
+                    method="PUT",
+                    status="equal",
+                    updated=True,
+                    directory_hash=resource_map.content_hash,
+                    update_client_hash=resource_map.content_hash,
+                )
+            )
+
+        if nodes:
+            logger.debug(f"Resolved {len(nodes)} unchanged references of {self.__directory_id}")
+
+        return nodes
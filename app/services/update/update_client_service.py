@@ -1,5 +1,7 @@
-import copy
-from datetime import datetime
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from datetime import datetime, timezone
 import threading
 import time
 import logging
@@ -27,12 +29,23 @@ from app.services.update.adjacency_map_service import (
 from app.services.entity.resource_map_service import (
     ResourceMapService,
 )
+from app.models.fhir.raw_entry import RawBundleEntry
+from app.services.fhir.bundle.utils import HistoryVersionIndex
+from app.services.update.node_state import NodeStateStore
 from app.services.fhir.fhir_service import FhirService
+from app.services.api.async_fhir_api import AsyncFhirApi
 from app.services.api.fhir_api import FhirApi, FhirApiConfig
+from app.services.api.rate_limiter import RateLimiter
+from app.services.update.bundle_packer import BundleBatch, BundlePacker
+from app.services.update.dependency_scheduler import create_stages
 from app.services.update.filter_ura import UraWhitelist
+from app.services.update.history_pager import iter_history_pages
 
 logger = logging.getLogger(__name__)
 
+# Pause after every resource type of a directory when no request rate limit is configured
+RESOURCE_TYPE_DELAY = 0.5
+
 
 class UpdateClientException(Exception):
     pass
@@ -51,12 +64,36 @@ class UpdateClientService:
         api_config: FhirApiConfig,
         resource_map_service: ResourceMapService,
         cache_provider: CacheProvider,
+        max_parallel_resource_types: int = 1,
+        directory_requests_per_second: float = 0,
+        history_prefetch_depth: int = 0,
+        use_async_client: bool = False,
+        max_bundle_entries: int = 1,
+        max_bundle_bytes: int = 0,
+        verify_update_client: bool = False,
+        history_stream_window: int = 0,
+        persistent_node_state: bool = False,
+        resource_type_delay: float = RESOURCE_TYPE_DELAY,
     ) -> None:
         self.api_config = api_config
         self.__resource_map_service = resource_map_service
         self.__update_client_fhir_api = FhirApi(api_config)
         self.__cache_provider = cache_provider
+        self.__max_parallel_resource_types = max(1, max_parallel_resource_types)
+        self.__directory_requests_per_second = directory_requests_per_second
+        # The fixed pause only paces directories that are not rate limited per request
+        self.__resource_type_delay = (
+            resource_type_delay if directory_requests_per_second <= 0 else 0
+        )
+        self.__history_prefetch_depth = history_prefetch_depth
+        self.__history_stream_window = history_stream_window
+        self.__persistent_node_state = persistent_node_state
+        self.__stages = create_stages()
+        self.__bundle_packer = BundlePacker(max_bundle_entries, max_bundle_bytes)
+        self.use_async_client = use_async_client
+        self.__verify_update_client = verify_update_client
         self.mutex: Dict[str, threading.Lock] = {}
+        self.rate_limiters: Dict[str, RateLimiter] = {}
         self.directory_lock = threading.Lock()
 
     def cleanup(self, directory_id: str) -> None:
@@ -150,23 +187,30 @@ class UpdateClientService:
         current_thread = threading.current_thread()
         logger.debug(f"starting update for {directory.id} from {current_thread.name}")
 
-        ## make sure no thread can mutate directory locks
-        with self.directory_lock:
-            if directory.id not in self.mutex:
-                self.mutex[directory.id] = threading.Lock()
-
-        lock = self.mutex[directory.id]
+        lock = self.__get_directory_lock(directory)
 
         if lock.acquire(blocking=False):
             try:
                 cache_service = self.__create_cache_run()
+                version_index = HistoryVersionIndex()
+                node_state = self.__create_node_state(directory, since, version_index)
                 start_time = time.time()
 
-                for res in McsdResources:
-                    self.update_resource(directory, res.value, cache_service, since, ura_whitelist)
-                    time.sleep(0.5)
+                # Types are synced in dependency order, so referenced resources are mostly cached
+                # by the time the resources referring to them are processed.
+                for stage in self.__stages:
+                    self.__update_stage(
+                        directory,
+                        stage,
+                        cache_service,
+                        since,
+                        ura_whitelist,
+                        version_index,
+                        node_state,
+                    )
                 results = cache_service.keys()
                 end_time = time.time()
+                self.__log_cache_stats(directory, cache_service)
                 cache_service.clear()
             finally:
                 lock.release()
@@ -181,6 +225,174 @@ class UpdateClientService:
             "time": end_time - start_time,
         }
 
+    async def update_async(
+        self,
+        directory: DirectoryDto,
+        since: datetime | None = None,
+        ura_whitelist: UraWhitelist | None = None,
+    ) -> Any:
+        """
+        Asyncio counterpart of update. Directory requests are made on the event loop, so many
+        directories and pages can be in flight at once without occupying a thread each. Processing
+        a page still happens in a worker thread, as the database and cache layers are synchronous.
+        """
+        logger.debug(f"starting async update for {directory.id}")
+
+        lock = self.__get_directory_lock(directory)
+
+        if lock.acquire(blocking=False):
+            try:
+                cache_service = await asyncio.to_thread(self.__create_cache_run)
+                version_index = HistoryVersionIndex()
+                node_state = self.__create_node_state(directory, since, version_index)
+                start_time = time.time()
+
+                config = replace(self.api_config, base_url=directory.endpoint_address)
+                async with AsyncFhirApi(
+                    config, rate_limiter=self.rate_limiters.get(directory.id)
+                ) as directory_api:
+                    for stage in self.__stages:
+                        await self.__update_stage_async(
+                            directory,
+                            stage,
+                            directory_api,
+                            cache_service,
+                            since,
+                            ura_whitelist,
+                            version_index,
+                            node_state,
+                        )
+                results = await asyncio.to_thread(cache_service.keys)
+                end_time = time.time()
+                self.__log_cache_stats(directory, cache_service)
+                await asyncio.to_thread(cache_service.clear)
+            finally:
+                lock.release()
+        else:
+            return {
+                "message": f"cannot perform update, {directory.id} currently in the background"
+            }
+
+        return {
+            "directory_id": directory.id,
+            "log": f"updated {len(results)}",
+            "time": end_time - start_time,
+        }
+
+    def __get_directory_lock(self, directory: DirectoryDto) -> threading.Lock:
+        ## make sure no thread can mutate directory locks
+        with self.directory_lock:
+            if directory.id not in self.mutex:
+                self.mutex[directory.id] = threading.Lock()
+            if directory.id not in self.rate_limiters:
+                self.rate_limiters[directory.id] = RateLimiter(self.__directory_requests_per_second)
+
+        return self.mutex[directory.id]
+
+    async def __update_stage_async(
+        self,
+        directory: DirectoryDto,
+        stage: List[McsdResources],
+        directory_api: AsyncFhirApi,
+        cache_service: CachingService,
+        since: datetime | None = None,
+        ura_whitelist: UraWhitelist | None = None,
+        version_index: HistoryVersionIndex | None = None,
+        node_state: NodeStateStore | None = None,
+    ) -> None:
+        semaphore = asyncio.Semaphore(self.__max_parallel_resource_types)
+
+        async def run(res: McsdResources) -> None:
+            async with semaphore:
+                await self.update_resource_async(
+                    directory,
+                    res.value,
+                    directory_api,
+                    cache_service,
+                    since,
+                    ura_whitelist,
+                    version_index,
+                    node_state,
+                )
+                if self.__resource_type_delay > 0:
+                    await asyncio.sleep(self.__resource_type_delay)
+
+        results = await asyncio.gather(*(run(res) for res in stage), return_exceptions=True)
+        # Raises the first error that occurred, after all types in the stage are finished
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    def __update_stage(
+        self,
+        directory: DirectoryDto,
+        stage: List[McsdResources],
+        cache_service: CachingService,
+        since: datetime | None = None,
+        ura_whitelist: UraWhitelist | None = None,
+        version_index: HistoryVersionIndex | None = None,
+        node_state: NodeStateStore | None = None,
+    ) -> None:
+        """
+        Updates the resource types of a single stage. These do not depend on each other and can run
+        in parallel, sharing the same cache run so common references are only processed once.
+        """
+        if self.__max_parallel_resource_types == 1 or len(stage) == 1:
+            for res in stage:
+                self.__update_resource_paced(
+                    directory,
+                    res.value,
+                    cache_service,
+                    since,
+                    ura_whitelist,
+                    version_index,
+                    node_state,
+                )
+            return
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.__max_parallel_resource_types, len(stage)),
+            thread_name_prefix=f"update-{directory.id}",
+        ) as executor:
+            futures = [
+                executor.submit(
+                    self.__update_resource_paced,
+                    directory,
+                    res.value,
+                    cache_service,
+                    since,
+                    ura_whitelist,
+                    version_index,
+                    node_state,
+                )
+                for res in stage
+            ]
+            # Raises the first error that occurred, after all types in the stage are finished
+            for future in futures:
+                future.result()
+
+    def __update_resource_paced(
+        self,
+        directory: DirectoryDto,
+        resource_type: str,
+        cache_service: CachingService,
+        since: datetime | None = None,
+        ura_whitelist: UraWhitelist | None = None,
+        version_index: HistoryVersionIndex | None = None,
+        node_state: NodeStateStore | None = None,
+    ) -> None:
+        self.update_resource(
+            directory,
+            resource_type,
+            cache_service,
+            since,
+            ura_whitelist,
+            version_index,
+            node_state,
+        )
+        if self.__resource_type_delay > 0:
+            time.sleep(self.__resource_type_delay)
+
     def update_resource(
         self,
         directory: DirectoryDto,
@@ -188,45 +400,133 @@ class UpdateClientService:
         cache_service: CachingService,
         since: datetime | None = None,
         ura_whitelist: UraWhitelist | None = None,
+        version_index: HistoryVersionIndex | None = None,
+        node_state: NodeStateStore | None = None,
     ) -> None:
-        config = copy.deepcopy(self.api_config)
-        config.base_url = directory.endpoint_address
-        directory_fhir_api = FhirApi(config)
+        directory_fhir_api = self.__create_directory_fhir_api(directory)
+        adjacency_map_service = self.__create_adjacency_map_service(
+            directory, directory_fhir_api, cache_service, ura_whitelist, node_state
+        )
+
+        next_params: Dict[str, Any] | None = directory_fhir_api.build_history_params(
+            since=since
+        )
+        for history in iter_history_pages(
+            directory_fhir_api,
+            resource_type,
+            next_params,
+            self.__history_prefetch_depth,
+            self.__history_stream_window,
+        ):
+            self.__process_history_page(
+                history, resource_type, adjacency_map_service, cache_service, version_index
+            )
 
-        adjacency_map_service = AdjacencyMapService(
+        if node_state is not None:
+            node_state.complete_resource_type(resource_type)
+
+    async def update_resource_async(
+        self,
+        directory: DirectoryDto,
+        resource_type: str,
+        directory_api: AsyncFhirApi,
+        cache_service: CachingService,
+        since: datetime | None = None,
+        ura_whitelist: UraWhitelist | None = None,
+        version_index: HistoryVersionIndex | None = None,
+        node_state: NodeStateStore | None = None,
+    ) -> None:
+        # Resolving references of a page happens in a worker thread, so it keeps using the sync client
+        adjacency_map_service = self.__create_adjacency_map_service(
+            directory,
+            self.__create_directory_fhir_api(directory),
+            cache_service,
+            ura_whitelist,
+            node_state,
+        )
+
+        next_params: Dict[str, Any] | None = directory_api.build_history_params(since=since)
+        next_page: asyncio.Task[tuple[Dict[str, Any] | None, List[RawBundleEntry]]] | None = (
+            asyncio.create_task(directory_api.get_history_batch(resource_type, next_params))
+        )
+        try:
+            while next_page is not None:
+                next_params, history = await next_page
+                # The next page is requested before processing the current one, so fetching
+                # and processing overlap
+                next_page = (
+                    asyncio.create_task(directory_api.get_history_batch(resource_type, next_params))
+                    if next_params is not None
+                    else None
+                )
+                await asyncio.to_thread(
+                    self.__process_history_page,
+                    history,
+                    resource_type,
+                    adjacency_map_service,
+                    cache_service,
+                    version_index,
+                )
+        finally:
+            if next_page is not None and not next_page.done():
+                next_page.cancel()
+
+        if node_state is not None:
+            node_state.complete_resource_type(resource_type)
+
+    def __create_directory_fhir_api(self, directory: DirectoryDto) -> FhirApi:
+        config = replace(self.api_config, base_url=directory.endpoint_address)
+        return FhirApi(config, rate_limiter=self.rate_limiters.get(directory.id))
+
+    def __create_adjacency_map_service(
+        self,
+        directory: DirectoryDto,
+        directory_fhir_api: FhirApi,
+        cache_service: CachingService,
+        ura_whitelist: UraWhitelist | None = None,
+        node_state: NodeStateStore | None = None,
+    ) -> AdjacencyMapService:
+        return AdjacencyMapService(
             directory_id=directory.id,
             directory_api=directory_fhir_api,
             update_client_api=self.__update_client_fhir_api,
             resource_map_service=self.__resource_map_service,
             cache_service=cache_service,
             uras_allowed=ura_whitelist[directory.endpoint_address] if ura_whitelist and directory.endpoint_address in ura_whitelist else [],
+            verify_update_client=self.__verify_update_client,
+            node_state=node_state,
         )
 
-        next_params: Dict[str, Any] | None = directory_fhir_api.build_history_params(
-            since=since
-        )
-        while next_params is not None:
-            next_params, history = directory_fhir_api.get_history_batch(
-                resource_type, next_params
-            )
-            targets = []
-            for e in history:
-                _, _id = FhirService.get_resource_type_and_id_from_entry(e)
-                if _id is not None:
-                    if cache_service.key_exists(_id):
-                        logger.info(
-                            f"{_id} {resource_type} already processed.. skipping.. "
-                        )
-                        continue
-                    targets.append(e)
-
-            if (
-                not targets
-            ):  # if no targets are found then there is no need to carry on with the flow
+    def __process_history_page(
+        self,
+        history: List[RawBundleEntry],
+        resource_type: str,
+        adjacency_map_service: AdjacencyMapService,
+        cache_service: CachingService,
+        version_index: HistoryVersionIndex | None = None,
+    ) -> None:
+        targets = []
+        for e in history:
+            # Drops older versions of resources of which a newer version was seen earlier in the sync
+            if version_index is not None and not version_index.add(e):
                 continue
 
-            nodes = self.update_page(targets, adjacency_map_service)
-            self.__clear_and_add_nodes(nodes, cache_service)
+            _, _id = FhirService.get_resource_type_and_id_from_entry(e)
+            if _id is not None:
+                if cache_service.key_exists(_id):
+                    logger.info(
+                        f"{_id} {resource_type} already processed.. skipping.. "
+                    )
+                    continue
+                targets.append(e)
+
+        if (
+            not targets
+        ):  # if no targets are found then there is no need to carry on with the flow
+            return
+
+        nodes = self.update_page(targets, adjacency_map_service)
+        self.__clear_and_add_nodes(nodes, cache_service)
 
     def __clear_and_add_nodes(
         self, updated_nodes: List[Node], cache_service: CachingService
@@ -237,10 +537,13 @@ class UpdateClientService:
                 cache_service.add_node(node)
 
     def update_page(
-        self, entries: List[BundleEntry], adjacency_map_service: AdjacencyMapService
+        self,
+        entries: List[BundleEntry] | List[RawBundleEntry],
+        adjacency_map_service: AdjacencyMapService,
     ) -> List[Node]:
         updated = []
         adj_map = adjacency_map_service.build_adjacency_map(entries)
+        groups = []
         for node in adj_map.data.values():
             if node.updated:
                 logger.info(
@@ -248,17 +551,23 @@ class UpdateClientService:
                 )
                 continue
 
-            group = adj_map.get_group(node)
-            results = self.update_with_bundle(group)
+            if node.visited:
+                # Already part of the group of an earlier node
+                continue
+
+            groups.append(adj_map.get_group(node))
+
+        for batch in self.__bundle_packer.pack(groups):
+            results = self.update_with_batch(batch)
             updated.extend(results)
 
         return updated
 
     def update_with_bundle(self, nodes: List[Node]) -> List[Node]:
-        bundle = Bundle.model_construct(id=uuid4(), type="transaction")
-        bundle.entry = []
-        dtos = []
+        return self.update_with_batch(BundleBatch(groups=[nodes]))
 
+    def update_with_batch(self, batch: BundleBatch) -> List[Node]:
+        nodes = batch.nodes
         for node in nodes:
             if node.status == "equal":
                 logger.info(
@@ -270,21 +579,24 @@ class UpdateClientService:
                     f"{node.resource_id} {node.resource_type} is not needed, ignoring..."
                 )
 
-            if node.update_data is not None:
-                if node.update_data.bundle_entry is not None:
-                    bundle.entry.append(node.update_data.bundle_entry)
+        bundle = Bundle.model_construct(id=str(uuid4()), type="transaction")
+        bundle.entry = batch.entries()
 
-                if node.update_data.resource_map_dto is not None:
-                    dtos.append(node.update_data.resource_map_dto)
-
-        _, errors = self.__update_client_fhir_api.post_bundle(bundle)
-        if len(errors) > 0:
-            logger.error(f"Errors occurred when updating bundle: {errors}")
-            raise UpdateClientException(
-                f"Errors occurred when updating bundle: {errors}"
-            )
+        if bundle.entry:
+            _, errors = self.__update_client_fhir_api.post_bundle(bundle)
+            if len(errors) > 0:
+                logger.error(f"Errors occurred when updating bundle: {errors}")
+                for error in errors:
+                    group = batch.group_of_entry(error.entry)
+                    if group is not None:
+                        logger.error(
+                            f"Entry {error.entry} belongs to group {[(n.resource_type, n.resource_id) for n in group]}"
+                        )
+                raise UpdateClientException(
+                    f"Errors occurred when updating bundle: {errors}"
+                )
 
-        self.__handle_dtos(dtos)
+        self.__handle_dtos(batch.resource_map_dtos())
 
         for node in nodes:
             node.updated = True
@@ -292,12 +604,36 @@ class UpdateClientService:
         return nodes
 
     def __handle_dtos(self, dtos: List[ResourceMapDto | ResourceMapUpdateDto]) -> None:
-        for dto in dtos:
-            if isinstance(dto, ResourceMapDto):
-                self.__resource_map_service.add_one(dto)
+        self.__resource_map_service.upsert_many(dtos)
+
+    def __create_node_state(
+        self,
+        directory: DirectoryDto,
+        since: datetime | None,
+        version_index: HistoryVersionIndex,
+    ) -> NodeStateStore | None:
+        if not self.__persistent_node_state:
+            return None
+
+        # Resources that changed between the last successful sync and a later since are missing
+        # from the history, so their persisted state cannot be trusted
+        if since is not None and (
+            directory.last_success_sync is None
+            or since.astimezone(timezone.utc)
+            > directory.last_success_sync.astimezone(timezone.utc)
+        ):
+            logger.info(
+                f"Not using persisted node state for {directory.id}, since {since} is later than the last successful sync"
+            )
+            return None
+
+        return NodeStateStore(directory.id, self.__resource_map_service, version_index)
 
-            if isinstance(dto, ResourceMapUpdateDto):
-                self.__resource_map_service.update_one(dto)
+    @staticmethod
+    def __log_cache_stats(directory: DirectoryDto, cache_service: CachingService) -> None:
+        stats = cache_service.get_stats()
+        if stats:
+            logger.info(f"Cache usage for directory {directory.id}: {stats}")
 
     def __create_cache_run(self) -> CachingService:
         cache_service = self.__cache_provider.create()
@@ -0,0 +1 @@
+ALTER TABLE resource_maps ADD COLUMN IF NOT EXISTS content_hash VARCHAR NULL;
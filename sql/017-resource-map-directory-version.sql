@@ -0,0 +1 @@
+ALTER TABLE resource_maps ADD COLUMN IF NOT EXISTS directory_version_id VARCHAR NULL;
@@ -0,0 +1,48 @@
+from typing import Any, Dict
+from unittest.mock import patch
+
+from fhir.resources.R4B.bundle import BundleEntry
+import pytest
+
+from app.models.fhir.raw_entry import RawBundleEntry
+from app.services.fhir.bundle.parser import create_bundle_entry
+
+
+def test_get_resource_type_and_id_should_fall_back_to_request_url() -> None:
+    entry = RawBundleEntry(
+        {"request": {"method": "DELETE", "url": "Organization/org-id"}}
+    )
+
+    assert entry.get_resource_type_and_id() == ("Organization", "org-id")
+    assert entry.get_request_method() == "DELETE"
+
+
+def test_get_request_method_should_raise_exception_on_unknown_method() -> None:
+    entry = RawBundleEntry({"request": {"method": "PATCHES", "url": "Organization/1"}})
+
+    with pytest.raises(ValueError):
+        entry.get_request_method()
+
+
+def test_get_entry_should_validate_once(mock_org_bundle_entry: Dict[str, Any]) -> None:
+    entry = RawBundleEntry(mock_org_bundle_entry)
+    expected = create_bundle_entry(mock_org_bundle_entry)
+
+    with patch.object(
+        BundleEntry, "model_validate", wraps=BundleEntry.model_validate
+    ) as validate:
+        assert entry.get_entry() == expected
+        assert entry.get_entry() is entry.get_entry()
+
+    validate.assert_called_once()
+
+
+def test_from_bundle_entry_should_not_validate_again(
+    mock_org_bundle_entry: Dict[str, Any],
+) -> None:
+    bundle_entry = create_bundle_entry(mock_org_bundle_entry)
+
+    entry = RawBundleEntry.from_bundle_entry(bundle_entry)
+
+    assert entry.get_entry() is bundle_entry
+    assert entry == RawBundleEntry(mock_org_bundle_entry)
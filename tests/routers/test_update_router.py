@@ -0,0 +1,41 @@
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from app.container import get_directory_provider, get_update_client_service
+from app.models.directory.dto import DirectoryDto
+
+
+@pytest.mark.parametrize("use_async_client", [False, True])
+def test_update_all_directories_isolates_failing_directories(
+    fastapi_app: FastAPI, use_async_client: bool
+) -> None:
+    directories = [
+        DirectoryDto(id=directory_id, ura="12345678", endpoint_address="https://example.com")
+        for directory_id in ["failing_directory", "ok_directory"]
+    ]
+    directory_provider = MagicMock()
+    directory_provider.get_all_directories_include_ignored_ids.return_value = directories
+
+    def update(directory: DirectoryDto, *_args: Any) -> dict[str, Any]:
+        if directory.id == "failing_directory":
+            raise Exception("directory unavailable")
+        return {"directory_id": directory.id}
+
+    service = MagicMock()
+    service.use_async_client = use_async_client
+    service.update.side_effect = update
+    service.update_async = AsyncMock(side_effect=update)
+    fastapi_app.dependency_overrides[get_directory_provider] = lambda: directory_provider
+    fastapi_app.dependency_overrides[get_update_client_service] = lambda: service
+
+    response = TestClient(fastapi_app).post("/update_resources")
+
+    assert response.status_code == 200
+    failed, ok = response.json()
+    assert failed["directory_id"] == "failing_directory"
+    assert "directory unavailable" in failed["message"]
+    assert ok == {"directory_id": "ok_directory"}
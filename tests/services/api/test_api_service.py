@@ -7,7 +7,7 @@ from yarl import URL
 from app.services.api.api_service import HttpService
 from tests.services.api.conftest import MockAuthenticator
 
-PATCHED_MODULE = "app.services.api.api_service.request"
+PATCHED_MODULE = "requests.Session.request"
 PATCHED_AUTH = "app.services.api.api_service.Authenticator"
 
 
@@ -91,6 +91,8 @@ def test_do_request_with_authenticator_should_succeed(
         headers=mock_authentication_headers,
         timeout=1,
         json=None,
+        data=None,
+        stream=False,
         cert=None,
         verify=True,
         auth=mock_auth,
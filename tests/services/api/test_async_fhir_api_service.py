@@ -0,0 +1,149 @@
+import asyncio
+from typing import Any, Dict
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi.exceptions import HTTPException
+from fhir.resources.R4B.bundle import Bundle
+import httpx
+import pytest
+from requests import PreparedRequest
+from requests.exceptions import ConnectionError
+from yarl import URL
+
+from app.config import Config
+from app.services.api.async_api_service import RequestsAuthAdapter
+from app.services.api.async_fhir_api import AsyncFhirApi
+from app.services.api.authenticators.null_authenticator import NullAuthenticator
+from app.services.api.fhir_api import FhirApiConfig
+from app.models.fhir.raw_entry import RawBundleEntry
+
+PATCHED_MODULE = "app.services.api.async_api_service.AsyncHttpService.do_request"
+
+
+@pytest.fixture()
+def async_fhir_api(config: Config, null_authenticator: NullAuthenticator) -> AsyncFhirApi:
+    api_config = FhirApiConfig(
+        timeout=config.client_directory.timeout,
+        backoff=0,
+        retries=3,
+        auth=null_authenticator,
+        base_url="http://example.com/fhir",
+        request_count=10,
+        fill_required_fields=False,
+        mtls_cert=None,
+        mtls_key=None,
+        verify_ca=True,
+    )
+    return AsyncFhirApi(api_config)
+
+
+def _response(status_code: int, data: Dict[str, Any]) -> httpx.Response:
+    return httpx.Response(status_code, json=data)
+
+
+@patch(PATCHED_MODULE, new_callable=AsyncMock)
+def test_post_bundle_should_succeed(
+    mock_response: AsyncMock,
+    async_fhir_api: AsyncFhirApi,
+    mock_bundle_request: Bundle,
+    mock_bundle_response: Bundle,
+) -> None:
+    mock_response.return_value = _response(200, mock_bundle_response.model_dump())
+
+    actual, errs = asyncio.run(async_fhir_api.post_bundle(mock_bundle_request))
+
+    assert actual == mock_bundle_response
+    assert errs == []
+
+
+@patch(PATCHED_MODULE, new_callable=AsyncMock)
+def test_post_bundle_should_fail_on_status_code(
+    mock_response: AsyncMock,
+    async_fhir_api: AsyncFhirApi,
+    mock_bundle_request: Bundle,
+) -> None:
+    mock_response.return_value = _response(401, {"resourceType": "OperationOutcome"})
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(async_fhir_api.post_bundle(mock_bundle_request))
+
+    assert e.value.status_code == 401
+
+
+@patch(PATCHED_MODULE, new_callable=AsyncMock)
+def test_get_history_batch_should_succeed_and_return_next_params(
+    mock_response: AsyncMock,
+    async_fhir_api: AsyncFhirApi,
+    mock_org_history_bundle: Dict[str, Any],
+    org_history_entry_1: Dict[str, Any],
+) -> None:
+    params = {"_count": "10"}
+    next_url = URL("http://example.com/fhir").with_query(params)
+    mock_org_history_bundle["link"] = [{"relation": "next", "url": str(next_url)}]
+    mock_response.return_value = _response(200, mock_org_history_bundle)
+
+    actual_next_params, actual_entries = asyncio.run(
+        async_fhir_api.get_history_batch("Organization", params)
+    )
+
+    assert actual_next_params == params
+    assert actual_entries == [RawBundleEntry(org_history_entry_1)]
+    mock_response.assert_awaited_once_with(
+        "GET", sub_route="Organization/_history", params=params
+    )
+
+
+@patch(PATCHED_MODULE, new_callable=AsyncMock)
+def test_get_history_should_fail_on_error_status_code(
+    mock_response: AsyncMock,
+    async_fhir_api: AsyncFhirApi,
+) -> None:
+    mock_response.return_value = _response(400, {})
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(async_fhir_api.get_history_batch("Organization"))
+
+    assert e.value.status_code == 500
+
+
+@patch.object(httpx.AsyncClient, "request", new_callable=AsyncMock)
+def test_do_request_retries_and_raises_after_too_many_attempts(
+    mock_request: AsyncMock,
+    async_fhir_api: AsyncFhirApi,
+) -> None:
+    mock_request.side_effect = httpx.ConnectError("connection refused")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(async_fhir_api.do_request("GET", sub_route="Organization"))
+
+    assert mock_request.await_count == 3
+
+
+@patch.object(httpx.AsyncClient, "request", new_callable=AsyncMock)
+def test_do_request_returns_response_after_retry(
+    mock_request: AsyncMock,
+    async_fhir_api: AsyncFhirApi,
+) -> None:
+    mock_request.side_effect = [httpx.ReadTimeout("timeout"), _response(200, {})]
+
+    response = asyncio.run(
+        async_fhir_api.do_request("GET", sub_route="Organization", params={"_count": "10"})
+    )
+
+    assert response.status_code == 200
+    assert mock_request.await_count == 2
+    assert mock_request.await_args is not None
+    assert mock_request.await_args.kwargs["url"] == "http://example.com/fhir/Organization?_count=10"
+
+
+def test_requests_auth_adapter_copies_signed_headers() -> None:
+    def sign(prepared: PreparedRequest) -> PreparedRequest:
+        prepared.headers["X-Signature"] = f"{prepared.method} {prepared.url} {prepared.body!r}"
+        return prepared
+
+    auth = MagicMock(side_effect=sign)
+    request = httpx.Request("POST", "http://example.com/fhir", content=b"{}")
+
+    signed = next(RequestsAuthAdapter(auth).auth_flow(request))
+
+    assert signed.headers["X-Signature"] == "POST http://example.com/fhir b'{}'"
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Any, Dict, List
 import pytest
 from unittest.mock import MagicMock
 from fhir.resources.R4B.bundle import BundleEntry
@@ -285,6 +285,78 @@ def test_get_all_directories_should_handle_pagination(
     ]
     api_service.fetch_directories()
     assert mock_fhir_api.search_resource.call_count == 3
+    assert [c.kwargs["params"] for c in mock_fhir_api.search_resource.call_args_list] == [
+        {"_include": "Organization:endpoint"},
+        {"page": "2"},
+        {"page": "3"},
+    ]
+
+
+def test_get_all_directories_should_fetch_offset_pages_concurrently(
+    mock_fhir_api: MagicMock, provider_url: str
+) -> None:
+    api_service = DirectoryApiService(mock_fhir_api, provider_url, max_parallel_pages=3)
+
+    def search_resource(resource_type: str, params: Dict[str, Any]) -> Any:
+        offset = int(params.get("_getpagesoffset", 0))
+        if offset >= 40:
+            return None, []
+        next_url = URL(
+            f"http://example.com/fhir?_getpages=abc&_getpagesoffset={offset + 10}&_count=10"
+        )
+        entries = __mock_bundle_entry() if offset == 20 else []
+        return next_url, entries
+
+    mock_fhir_api.search_resource.side_effect = search_resource
+
+    result = api_service.fetch_directories()
+
+    offsets = sorted(
+        int(c.kwargs["params"].get("_getpagesoffset", 0))
+        for c in mock_fhir_api.search_resource.call_args_list
+    )
+    # First page, then a batch of 3 pages (10, 20, 30) and a batch that ends the search (40, ...)
+    assert offsets == [0, 10, 20, 30, 40, 50, 60]
+    assert [d.id for d in result] == ["test-org-12345"]
+
+
+def test_get_all_directories_should_skip_duplicates_when_server_ignores_offset(
+    mock_fhir_api: MagicMock, provider_url: str
+) -> None:
+    api_service = DirectoryApiService(mock_fhir_api, provider_url, max_parallel_pages=3)
+    next_url = URL("http://example.com/fhir?_getpages=abc&_getpagesoffset=10&_count=10")
+    # Every offset returns the first page again, the last batch ends the search
+    mock_fhir_api.search_resource.side_effect = [
+        (next_url, __mock_bundle_entry()),
+        (next_url, __mock_bundle_entry()),
+        (next_url, __mock_bundle_entry()),
+        (next_url, __mock_bundle_entry()),
+        (None, __mock_bundle_entry()),
+        (None, __mock_bundle_entry()),
+        (None, __mock_bundle_entry()),
+    ]
+
+    result = api_service.fetch_directories()
+
+    assert mock_fhir_api.search_resource.call_count == 7
+    assert [d.id for d in result] == ["test-org-12345"]
+
+
+def test_get_all_directories_should_resolve_shared_endpoint_for_each_organization(
+    api_service: DirectoryApiService, mock_fhir_api: MagicMock
+) -> None:
+    entries = __mock_bundle_entry()
+    other_org = entries[0].model_copy(deep=True)
+    assert isinstance(other_org.resource, Organization)
+    other_org.resource.id = "test-org-67890"
+    mock_fhir_api.search_resource.return_value = (None, [entries[0], entries[1], other_org])
+
+    result = api_service.fetch_directories()
+
+    assert [(d.id, d.endpoint_address) for d in result] == [
+        ("test-org-12345", "http://example.com/fhir"),
+        ("test-org-67890", "http://example.com/fhir"),
+    ]
 
 
 def test_get_one_directory_should_return_directory(
@@ -1,4 +1,5 @@
 from datetime import datetime
+import json
 from typing import Any, Dict
 from urllib.parse import urlencode
 from requests.exceptions import ConnectionError
@@ -9,8 +10,9 @@ from fhir.resources.R4B.bundle import Bundle
 import pytest
 from yarl import URL
 
-from app.services.api.fhir_api import FhirApi
+from app.services.api.fhir_api import CapabilityStatementResult, FhirApi
 from app.services.fhir.bundle.parser import create_bundle_entry
+from app.models.fhir.raw_entry import RawBundleEntry
 from app.services.fhir.fhir_service import FhirService
 
 PATCHED_MODULE = "app.services.api.api_service.HttpService.do_request"
@@ -25,7 +27,7 @@ def test_post_bundle_should_succeed(
 ) -> None:
     mock_request = MagicMock()
     mock_request.status_code = 200
-    mock_request.json.return_value = mock_bundle_response.model_dump()
+    mock_request.content = mock_bundle_response.model_dump_json().encode()
     mock_response.return_value = mock_request
 
     actual, errs = fhir_api.post_bundle(mock_bundle_request)
@@ -59,7 +61,7 @@ def test_post_bundle_with_failed_elements(
 ) -> None:
     mock_request = MagicMock()
     mock_request.status_code = 200
-    mock_request.json.return_value = mock_bundle_with_errors_response.model_dump()
+    mock_request.content = mock_bundle_with_errors_response.model_dump_json().encode()
     mock_response.return_value = mock_request
 
     actual, errs = fhir_api.post_bundle(mock_bundle_with_errors_request)
@@ -129,10 +131,10 @@ def test_get_history_batch_should_succeed(
 ) -> None:
     mock_request = MagicMock()
     mock_request.status_code = 200
-    mock_request.json.return_value = mock_org_history_bundle
+    mock_request.content = json.dumps(mock_org_history_bundle).encode()
     mock_response.return_value = mock_request
     expected_next_url, expected_entries = None, [
-        create_bundle_entry(org_history_entry_1),
+        RawBundleEntry(org_history_entry_1),
     ]
 
     actual_next_url, actual_entries = fhir_api.get_history_batch("Organizaton")
@@ -152,13 +154,13 @@ def test_get_history_batch_should_succeed_and_return_next_params(
 ) -> None:
     next_url = URL(base_url).with_query(mock_history_params)
     expected_entries = [
-        create_bundle_entry(org_history_entry_1),
+        RawBundleEntry(org_history_entry_1),
     ]
     mock_org_history_bundle["link"] = [{"relation": "next", "url": str(next_url)}]
 
     mock_request = MagicMock()
     mock_request.status_code = 200
-    mock_request.json.return_value = mock_org_history_bundle
+    mock_request.content = json.dumps(mock_org_history_bundle).encode()
     mock_response.return_value = mock_request
 
     actual_next_params, actual_entries = fhir_api.get_history_batch(
@@ -169,6 +171,59 @@ def test_get_history_batch_should_succeed_and_return_next_params(
     assert expected_entries == actual_entries
 
 
+@patch(PATCHED_MODULE)
+def test_stream_history_batch_should_yield_latest_entries_and_return_next_params(
+    mock_response: MagicMock,
+    fhir_api: FhirApi,
+    mock_org_history_bundle: Dict[str, Any],
+    org_history_entry_1: Dict[str, Any],
+    base_url: str,
+    mock_history_params: Dict[str, Any],
+) -> None:
+    next_url = URL(base_url).with_query(mock_history_params)
+    mock_org_history_bundle["link"] = [{"relation": "next", "url": str(next_url)}]
+    content = json.dumps(mock_org_history_bundle).encode()
+
+    mock_request = MagicMock()
+    mock_request.status_code = 200
+    mock_request.iter_content.return_value = [
+        content[i : i + 16] for i in range(0, len(content), 16)
+    ]
+    mock_response.return_value = mock_request
+
+    entries = fhir_api.stream_history_batch("Organization", mock_history_params)
+    actual_entries = []
+    while True:
+        try:
+            actual_entries.append(next(entries))
+        except StopIteration as stop:
+            actual_next_params = stop.value
+            break
+
+    assert actual_entries == [RawBundleEntry(org_history_entry_1)]
+    assert actual_next_params == mock_history_params
+    mock_response.assert_called_once_with(
+        "GET", sub_route="Organization/_history", params=mock_history_params, stream=True
+    )
+    mock_request.close.assert_called_once()
+
+
+@patch(PATCHED_MODULE)
+def test_stream_history_batch_should_fail_on_error_status_code(
+    mock_response: MagicMock,
+    fhir_api: FhirApi,
+) -> None:
+    mock_request = MagicMock()
+    mock_request.status_code = 400
+    mock_response.return_value = mock_request
+
+    with pytest.raises(HTTPException) as e:
+        next(fhir_api.stream_history_batch("Organization"))
+
+    assert e.value.status_code == 500
+    mock_request.close.assert_called_once()
+
+
 @patch(PATCHED_MODULE)
 def test_get_history_should_fail_on_error_status_code(
     mock_response: MagicMock,
@@ -201,7 +256,7 @@ def test_get_resource_by_id_should_succeed(
 ) -> None:
     mock_request = MagicMock()
     mock_request.status_code = 200
-    mock_request.json.return_value = mock_org
+    mock_request.content = json.dumps(mock_org).encode()
     mock_response.return_value = mock_request
     expected = fhir_service.create_resource(mock_org)
 
@@ -260,7 +315,7 @@ def test_search_resource_should_succeed(
     ]
     mock_request = MagicMock()
     mock_request.status_code = 200
-    mock_request.json.return_value = mock_org_history_bundle
+    mock_request.content = json.dumps(mock_org_history_bundle).encode()
     mock_response.return_value = mock_request
     expected_entries = [
         create_bundle_entry(org_history_entry_1),
@@ -285,7 +340,7 @@ def test_search_resource_should_succeed_with_no_next_url(
 ) -> None:
     mock_request = MagicMock()
     mock_request.status_code = 200
-    mock_request.json.return_value = mock_org_history_bundle
+    mock_request.content = json.dumps(mock_org_history_bundle).encode()
     mock_response.return_value = mock_request
     expected_entries = [
         create_bundle_entry(org_history_entry_1),
@@ -350,6 +405,32 @@ def test_post_bundle_should_raise_exception_when_json_invalid_and_http_success(
         fhir_api.post_bundle(mock_bundle_request)
     assert e.value.status_code == 200
 
+@pytest.mark.parametrize(
+    "request_fn",
+    [
+        lambda api: api.fetch_capability_statement(),
+        lambda api: api.get_resource_by_id("Organization", "org-id"),
+        lambda api: api.search_resource("Organization", {}),
+        lambda api: api.get_history_batch("Organization"),
+    ],
+)
+@patch(PATCHED_MODULE)
+def test_get_requests_should_raise_http_exception_when_json_invalid(
+    mock_response: MagicMock,
+    request_fn: Any,
+    fhir_api: FhirApi,
+) -> None:
+    from requests import Response
+
+    resp = Response()
+    resp.status_code = 200
+    resp._content = b"Invalid JSON"
+    mock_response.return_value = resp
+
+    with pytest.raises(HTTPException) as e:
+        request_fn(fhir_api)
+    assert e.value.status_code == 200
+
 @patch(PATCHED_MODULE)
 # @patch("app.services.fhir.capability_statement_validator.is_capability_statement_valid")
 @patch("app.services.api.fhir_api.is_capability_statement_valid")
@@ -360,7 +441,7 @@ def test_update_client_service_check_capability_statement_succeeds(
 ) -> None:
     mock_request = MagicMock()
     mock_request.status_code = 200
-    mock_request.json.return_value = {}
+    mock_request.content = json.dumps({}).encode()
     mock_response.return_value = mock_request
     mock_is_valid.return_value = True
 
@@ -384,3 +465,45 @@ def test_update_client_service_check_capability_statement_fails(
         fhir_api.validate_capability_statement()
     mock_is_valid.assert_not_called()
     assert e.value.status_code == 500
+
+
+@patch(PATCHED_MODULE)
+@patch("app.services.api.fhir_api.is_capability_statement_valid")
+def test_fetch_capability_statement_returns_validators_of_response(
+    mock_is_valid: MagicMock,
+    mock_response: MagicMock,
+    fhir_api: FhirApi,
+) -> None:
+    mock_request = MagicMock()
+    mock_request.status_code = 200
+    mock_request.content = json.dumps({}).encode()
+    mock_request.headers = {"ETag": 'W/"1"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"}
+    mock_response.return_value = mock_request
+    mock_is_valid.return_value = True
+
+    actual = fhir_api.fetch_capability_statement()
+
+    assert actual == CapabilityStatementResult(
+        valid=True, etag='W/"1"', last_modified="Wed, 01 Jan 2025 00:00:00 GMT"
+    )
+    mock_response.assert_called_once_with("GET", sub_route="metadata", headers=None)
+
+
+@patch(PATCHED_MODULE)
+@patch("app.services.api.fhir_api.is_capability_statement_valid")
+def test_fetch_capability_statement_is_conditional_with_etag(
+    mock_is_valid: MagicMock,
+    mock_response: MagicMock,
+    fhir_api: FhirApi,
+) -> None:
+    mock_request = MagicMock()
+    mock_request.status_code = 304
+    mock_response.return_value = mock_request
+
+    actual = fhir_api.fetch_capability_statement(etag='W/"1"')
+
+    assert actual == CapabilityStatementResult(valid=None, etag='W/"1"')
+    mock_response.assert_called_once_with(
+        "GET", sub_route="metadata", headers={"If-None-Match": 'W/"1"'}
+    )
+    mock_is_valid.assert_not_called()
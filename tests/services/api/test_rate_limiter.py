@@ -0,0 +1,26 @@
+from unittest.mock import MagicMock, patch
+
+from app.services.api.rate_limiter import RateLimiter
+
+
+@patch("app.services.api.rate_limiter.time")
+def test_rate_limiter_spaces_out_calls(mock_time: MagicMock) -> None:
+    mock_time.monotonic.return_value = 100.0
+    limiter = RateLimiter(rate=4)
+
+    limiter.acquire()
+    limiter.acquire()
+    limiter.acquire()
+
+    waits = [c.args[0] for c in mock_time.sleep.call_args_list]
+    assert waits == [0.25, 0.5]
+
+
+@patch("app.services.api.rate_limiter.time")
+def test_rate_limiter_disabled_never_sleeps(mock_time: MagicMock) -> None:
+    limiter = RateLimiter(rate=0)
+
+    for _ in range(10):
+        limiter.acquire()
+
+    mock_time.sleep.assert_not_called()
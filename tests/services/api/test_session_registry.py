@@ -0,0 +1,86 @@
+from typing import Generator
+from unittest.mock import MagicMock, patch
+
+import pytest
+from requests import Request
+from requests.adapters import HTTPAdapter
+from requests.cookies import MockRequest, create_cookie
+
+from app.services.api.api_service import HttpService
+from app.services.api.session_registry import SessionRegistry, get_session_registry
+
+
+@pytest.fixture
+def session_registry(monkeypatch: pytest.MonkeyPatch) -> Generator[SessionRegistry, None, None]:
+    # Replaces the process wide registry for the duration of a test only
+    registry = SessionRegistry(pool_size=2)
+    monkeypatch.setattr("app.services.api.session_registry._SESSION_REGISTRY", registry)
+    yield registry
+    registry.close()
+
+
+def test_get_session_reuses_session_per_origin() -> None:
+    registry = SessionRegistry(pool_size=3)
+
+    first = registry.get_session("https://example.com/fhir")
+    second = registry.get_session("https://example.com:443/other/fhir")
+    other = registry.get_session("https://other.example.com/fhir")
+
+    assert first is second
+    assert first is not other
+    adapter = first.get_adapter("https://example.com")
+    assert isinstance(adapter, HTTPAdapter)
+    assert adapter._pool_maxsize == 3  # type: ignore[attr-defined]
+
+
+def test_get_stats_counts_acquired_sessions_per_origin() -> None:
+    registry = SessionRegistry()
+
+    registry.get_session("https://example.com/fhir")
+    registry.get_session("https://example.com/fhir")
+    registry.get_session("http://other.example.com")
+
+    assert registry.get_stats() == [
+        {
+            "origin": "https://example.com",
+            "sessions_acquired": 2,
+            "connections_opened": 0,
+            "connections_idle": 0,
+        },
+        {
+            "origin": "http://other.example.com",
+            "sessions_acquired": 1,
+            "connections_opened": 0,
+            "connections_idle": 0,
+        },
+    ]
+
+    registry.close()
+    assert registry.get_stats() == []
+
+
+@patch("requests.Session.request")
+def test_http_services_share_session_of_origin(
+    mock_request: MagicMock, session_registry: SessionRegistry
+) -> None:
+    mock_request.return_value = MagicMock(status_code=200)
+
+    for base_url in ["https://example.com/directory", "https://example.com/update_client"]:
+        HttpService(base_url=base_url, timeout=1, retries=1, backoff=0).do_request("GET")
+
+    assert mock_request.call_count == 2
+    assert get_session_registry() is session_registry
+    assert session_registry.get_stats()[0]["sessions_acquired"] == 2
+
+
+def test_sessions_do_not_keep_cookies() -> None:
+    registry = SessionRegistry()
+    session = registry.get_session("https://example.com/fhir")
+    request = MockRequest(Request("GET", "https://example.com/fhir/Organization").prepare())
+
+    session.cookies.set_cookie_if_ok(
+        create_cookie("session", "tenant-a", domain="example.com"), request  # type: ignore[no-untyped-call, arg-type]
+    )
+
+    assert len(session.cookies) == 0
+    registry.close()
@@ -1,4 +1,5 @@
 from uuid import uuid4
+from redis import ConnectionPool
 from fhir.resources.R4B.bundle import Bundle
 import pytest
 from typing import Dict, Any, List
@@ -230,6 +231,7 @@ def expected_node_org(
         node_refs=org_node_references,
         fhir_service=fhir_service,
         directory_hash=computation_service.hash_directory_entry(entry),
+        directory_payload=computation_service.create_payload(entry),
     )
 
 
@@ -263,7 +265,7 @@ def in_memory_cache_service() -> InMemoryCachingService:
 @pytest.fixture()
 def external_caching_service() -> ExternalCachingService:
     return ExternalCachingService(
-        run_id=uuid4(), host="http://example.com", port=8000, ssl_check_hostname=False
+        run_id=uuid4(), connection_pool=ConnectionPool(host="example.com", port=8000)
     )
 
 
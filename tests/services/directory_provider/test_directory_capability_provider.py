@@ -1,13 +1,18 @@
 import logging
-from typing import Any
+import threading
+from types import SimpleNamespace
+from typing import Any, List
 from unittest.mock import MagicMock
 
 import pytest
 
-from app.services.directory_provider.capability_provider import CapabilityProvider
+from app.services.directory_provider.capability_provider import (
+    CapabilityCacheEntry,
+    CapabilityProvider,
+)
 from app.services.directory_provider.directory_provider import DirectoryProvider
 from app.models.directory.dto import DirectoryDto
-from app.services.api.fhir_api import FhirApiConfig
+from app.services.api.fhir_api import CapabilityStatementResult, FhirApiConfig
 
 
 def _dto(id_: str, url: str = "https://example.org/fhir") -> DirectoryDto:
@@ -31,7 +36,7 @@ def test_get_all_directories_filters_when_validating(provider: DirectoryProvider
     dirs = [_dto("a"), _dto("b"), _dto("c")]
     inner_provider.get_all_directories.return_value = dirs
 
-    def fake_check(dto: DirectoryDto) -> bool:
+    def fake_check(dto: DirectoryDto, timeout: int) -> bool:
         return dto.id in {"a", "c"}
 
     monkeypatch.setattr(CapabilityProvider, "check_capability_statement", staticmethod(fake_check))
@@ -49,7 +54,7 @@ def test_get_all_directories_no_filter_when_validation_off(inner_provider: Magic
 
     called = {"n": 0}
 
-    def fake_check(_dto: DirectoryDto) -> bool:
+    def fake_check(_dto: DirectoryDto, timeout: int) -> bool:
         called["n"] += 1
         return False
 
@@ -67,7 +72,7 @@ def test_get_all_directories_include_ignored_ids_filters(provider: DirectoryProv
     inner_provider.get_all_directories_include_ignored_ids.return_value = dirs
 
     monkeypatch.setattr(
-        CapabilityProvider, "check_capability_statement", staticmethod(lambda d: d.id == "y")
+        CapabilityProvider, "check_capability_statement", staticmethod(lambda d, timeout: d.id == "y")
     )
 
     out = provider.get_all_directories_include_ignored_ids(include_ignored_ids=["y"])
@@ -78,7 +83,7 @@ def test_get_all_directories_include_ignored_ids_filters(provider: DirectoryProv
 def test_get_one_directory_returns_none_if_capability_fails(provider: DirectoryProvider, inner_provider: MagicMock, monkeypatch: pytest.MonkeyPatch) -> None:
     inner_provider.get_one_directory.return_value = _dto("a")
 
-    monkeypatch.setattr(CapabilityProvider, "check_capability_statement", staticmethod(lambda d: False))
+    monkeypatch.setattr(CapabilityProvider, "check_capability_statement", staticmethod(lambda d, timeout: False))
 
     with pytest.raises(Exception) as exc_info:
         _out = provider.get_one_directory("a")
@@ -89,7 +94,7 @@ def test_get_one_directory_returns_none_if_capability_fails(provider: DirectoryP
 def test_get_one_directory_propagates_none_from_inner(provider: DirectoryProvider, inner_provider: MagicMock, monkeypatch: pytest.MonkeyPatch) -> None:
     inner_provider.get_one_directory.return_value = None
 
-    def fake_check(d: DirectoryDto) -> bool:
+    def fake_check(d: DirectoryDto, timeout: int) -> bool:
         raise Exception("Dir not exist")
 
     monkeypatch.setattr(CapabilityProvider, "check_capability_statement", staticmethod(fake_check))
@@ -104,8 +109,8 @@ def test_check_capability_statement_success(monkeypatch: pytest.MonkeyPatch, cap
     class FakeFhirApi:
         def __init__(self, _config: FhirApiConfig): ...
 
-        def validate_capability_statement(self) -> bool:
-            return True
+        def fetch_capability_statement(self, **kwargs: Any) -> CapabilityStatementResult:
+            return CapabilityStatementResult(valid=True)
 
     import app.services.directory_provider.capability_provider as mod
     monkeypatch.setattr(mod, "FhirApi", FakeFhirApi)
@@ -121,8 +126,8 @@ def test_check_capability_statement_success(monkeypatch: pytest.MonkeyPatch, cap
 def test_check_capability_statement_failure_logs_warning(monkeypatch: pytest.MonkeyPatch, caplog: Any) -> None:
     class FakeFhirApi:
         def __init__(self, _config: FhirApiConfig): ...
-        def validate_capability_statement(self) -> bool:
-            return False
+        def fetch_capability_statement(self, **kwargs: Any) -> CapabilityStatementResult:
+            return CapabilityStatementResult(valid=False)
 
     import app.services.directory_provider.capability_provider as mod
     monkeypatch.setattr(mod, "FhirApi", FakeFhirApi)
@@ -150,3 +155,96 @@ def test_check_capability_statement_exception_logs_error(monkeypatch: pytest.Mon
         assert CapabilityProvider.check_capability_statement(dto) is False
 
     assert any("Error checking capability statement for err" in r.message for r in caplog.records)
+
+
+def test_filter_on_capability_caches_results_per_endpoint(inner_provider: MagicMock, monkeypatch: pytest.MonkeyPatch) -> None:
+    dirs = [_dto("a", "https://a.example.org/fhir"), _dto("b", "https://b.example.org/fhir")]
+    inner_provider.get_all_directories.return_value = dirs
+    calls: List[str] = []
+
+    def fake_fetch(dto: DirectoryDto, cached: CapabilityCacheEntry | None, timeout: int) -> CapabilityStatementResult:
+        calls.append(dto.id)
+        return CapabilityStatementResult(valid=dto.id == "a")
+
+    monkeypatch.setattr(CapabilityProvider, "fetch_capability_statement", staticmethod(fake_fetch))
+    prov = CapabilityProvider(inner=inner_provider, validate_capability_statement=True, cache_ttl=60)
+
+    assert [d.id for d in prov.get_all_directories()] == ["a"]
+    assert [d.id for d in prov.get_all_directories()] == ["a"]
+    assert calls == ["a", "b"]
+
+
+def test_filter_on_capability_revalidates_after_ttl(inner_provider: MagicMock, monkeypatch: pytest.MonkeyPatch) -> None:
+    inner_provider.get_all_directories.return_value = [_dto("a")]
+    now = {"t": 1000.0}
+    monkeypatch.setattr(
+        "app.services.directory_provider.capability_provider.time",
+        SimpleNamespace(monotonic=lambda: now["t"]),
+    )
+    seen: List[CapabilityCacheEntry | None] = []
+
+    def fake_fetch(dto: DirectoryDto, cached: CapabilityCacheEntry | None, timeout: int) -> CapabilityStatementResult:
+        seen.append(cached)
+        if cached is None:
+            return CapabilityStatementResult(valid=True, etag='W/"1"')
+        # Not modified
+        return CapabilityStatementResult(valid=None, etag=cached.etag)
+
+    monkeypatch.setattr(CapabilityProvider, "fetch_capability_statement", staticmethod(fake_fetch))
+    prov = CapabilityProvider(inner=inner_provider, validate_capability_statement=True, cache_ttl=60)
+
+    assert [d.id for d in prov.get_all_directories()] == ["a"]
+    now["t"] += 61
+    assert [d.id for d in prov.get_all_directories()] == ["a"]
+
+    assert len(seen) == 2
+    assert seen[0] is None
+    assert seen[1] is not None and seen[1].etag == 'W/"1"' and seen[1].valid is True
+
+
+def test_filter_on_capability_does_not_cache_errors(inner_provider: MagicMock, monkeypatch: pytest.MonkeyPatch) -> None:
+    inner_provider.get_all_directories.return_value = [_dto("a")]
+    results: List[CapabilityStatementResult | None] = [None, CapabilityStatementResult(valid=True)]
+
+    monkeypatch.setattr(
+        CapabilityProvider, "fetch_capability_statement", staticmethod(lambda *args: results.pop(0))
+    )
+    prov = CapabilityProvider(inner=inner_provider, validate_capability_statement=True, cache_ttl=60)
+
+    assert prov.get_all_directories() == []
+    assert [d.id for d in prov.get_all_directories()] == ["a"]
+
+
+def test_filter_on_capability_checks_concurrently(inner_provider: MagicMock, monkeypatch: pytest.MonkeyPatch) -> None:
+    dirs = [_dto(str(i), f"https://{i}.example.org/fhir") for i in range(3)]
+    inner_provider.get_all_directories.return_value = dirs
+    # Only passes when all checks are running at the same time
+    barrier = threading.Barrier(len(dirs), timeout=5)
+
+    def fake_check(dto: DirectoryDto, timeout: int) -> bool:
+        barrier.wait()
+        return True
+
+    monkeypatch.setattr(CapabilityProvider, "check_capability_statement", staticmethod(fake_check))
+    prov = CapabilityProvider(inner=inner_provider, validate_capability_statement=True, max_parallel_checks=3)
+
+    assert [d.id for d in prov.get_all_directories()] == ["0", "1", "2"]
+
+
+def test_filter_on_capability_uses_configured_timeout_without_cache(inner_provider: MagicMock, monkeypatch: pytest.MonkeyPatch) -> None:
+    inner_provider.get_all_directories.return_value = [_dto("a")]
+    timeouts: List[int] = []
+
+    class FakeFhirApi:
+        def __init__(self, config: FhirApiConfig):
+            timeouts.append(config.timeout)
+
+        def fetch_capability_statement(self, **kwargs: Any) -> CapabilityStatementResult:
+            return CapabilityStatementResult(valid=True)
+
+    import app.services.directory_provider.capability_provider as mod
+    monkeypatch.setattr(mod, "FhirApi", FakeFhirApi)
+    prov = CapabilityProvider(inner=inner_provider, validate_capability_statement=True, timeout=2)
+
+    assert [d.id for d in prov.get_all_directories()] == ["a"]
+    assert timeouts == [2]
@@ -161,3 +161,167 @@ def test_unique_constraint_on_directory_id_and_directory_resource_id(
     )
     with pytest.raises(IntegrityError):
         resource_map_service.add_one(duplicate_dto)
+
+
+def test_upsert_many_should_add_and_update_resource_maps(
+    resource_map_service: ResourceMapService, mock_dto: ResourceMapDto
+) -> None:
+    existing = resource_map_service.add_one(mock_dto)
+    new_dto = ResourceMapDto(
+        directory_id="example id",
+        resource_type="Endpoint",
+        directory_resource_id="some_endpoint_id",
+        update_client_resource_id="some_update_client_endpoint_id",
+    )
+    update_dto = ResourceMapUpdateDto(
+        directory_id=mock_dto.directory_id,
+        resource_type=mock_dto.resource_type,
+        directory_resource_id=mock_dto.directory_resource_id,
+    )
+
+    resource_map_service.upsert_many([new_dto, update_dto])
+
+    assert len(resource_map_service.find(directory_id="example id")) == 2
+    updated = resource_map_service.get_one(
+        directory_resource_id=mock_dto.directory_resource_id
+    )
+    assert updated.id == existing.id
+    assert updated.modified_at >= existing.modified_at
+    added = resource_map_service.get_one(directory_resource_id="some_endpoint_id")
+    assert added.update_client_resource_id == "some_update_client_endpoint_id"
+    assert added.resource_type == "Endpoint"
+
+
+def test_upsert_many_should_update_existing_resource_map_on_conflict(
+    resource_map_service: ResourceMapService, mock_dto: ResourceMapDto
+) -> None:
+    existing = resource_map_service.add_one(mock_dto)
+
+    resource_map_service.upsert_many(
+        [
+            mock_dto.model_copy(
+                update={"update_client_resource_id": "other_update_client_resource_id"}
+            )
+        ]
+    )
+
+    actual = resource_map_service.find(directory_id=mock_dto.directory_id)
+    assert len(actual) == 1
+    assert actual[0].id == existing.id
+    assert actual[0].update_client_resource_id == "other_update_client_resource_id"
+
+
+def test_upsert_many_should_upsert_row_by_row_without_on_conflict_support(
+    resource_map_service: ResourceMapService,
+    mock_dto: ResourceMapDto,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(
+        "app.db.repositories.resource_map_repository.ON_CONFLICT_INSERTS", {}
+    )
+    existing = resource_map_service.add_one(mock_dto)
+    new_dto = mock_dto.model_copy(
+        update={
+            "directory_resource_id": "some_endpoint_id",
+            "update_client_resource_id": "some_update_client_endpoint_id",
+            "content_hash": "hash",
+        }
+    )
+
+    resource_map_service.upsert_many(
+        [
+            mock_dto.model_copy(
+                update={
+                    "update_client_resource_id": "other_update_client_resource_id",
+                    "directory_version_id": "2",
+                }
+            ),
+            new_dto,
+        ]
+    )
+
+    actual = resource_map_service.get_one(directory_resource_id=mock_dto.directory_resource_id)
+    assert actual.id == existing.id
+    assert actual.update_client_resource_id == "other_update_client_resource_id"
+    assert actual.directory_version_id == "2"
+    added = resource_map_service.get_one(directory_resource_id="some_endpoint_id")
+    assert added.content_hash == "hash"
+    assert len(resource_map_service.find(directory_id=mock_dto.directory_id)) == 2
+
+
+def test_upsert_many_should_store_and_clear_content_hash(
+    resource_map_service: ResourceMapService, mock_dto: ResourceMapDto
+) -> None:
+    resource_map_service.upsert_many(
+        [mock_dto.model_copy(update={"content_hash": "first"})]
+    )
+    key = {"directory_resource_id": mock_dto.directory_resource_id}
+    assert resource_map_service.get_one(**key).content_hash == "first"
+
+    update_dto = ResourceMapUpdateDto(
+        directory_id=mock_dto.directory_id,
+        resource_type=mock_dto.resource_type,
+        directory_resource_id=mock_dto.directory_resource_id,
+        content_hash="second",
+    )
+    resource_map_service.upsert_many([update_dto])
+    assert resource_map_service.get_one(**key).content_hash == "second"
+
+    resource_map_service.upsert_many(
+        [update_dto.model_copy(update={"content_hash": None})]
+    )
+    assert resource_map_service.get_one(**key).content_hash is None
+
+
+def test_upsert_many_should_store_directory_version_id(
+    resource_map_service: ResourceMapService, mock_dto: ResourceMapDto
+) -> None:
+    resource_map_service.upsert_many(
+        [mock_dto.model_copy(update={"content_hash": "first", "directory_version_id": "1"})]
+    )
+    key = {"directory_resource_id": mock_dto.directory_resource_id}
+    assert resource_map_service.get_one(**key).directory_version_id == "1"
+
+    resource_map_service.upsert_many(
+        [
+            ResourceMapUpdateDto(
+                directory_id=mock_dto.directory_id,
+                resource_type=mock_dto.resource_type,
+                directory_resource_id=mock_dto.directory_resource_id,
+                content_hash="second",
+                directory_version_id="2",
+            )
+        ]
+    )
+    assert resource_map_service.get_one(**key).directory_version_id == "2"
+
+
+def test_upsert_many_should_do_nothing_without_dtos(
+    resource_map_service: ResourceMapService,
+) -> None:
+    resource_map_service.upsert_many([])
+
+    assert len(resource_map_service.find()) == 0
+
+
+def test_get_many_should_return_existing_resource_maps_by_key(
+    resource_map_service: ResourceMapService, mock_dto: ResourceMapDto
+) -> None:
+    expected = resource_map_service.add_one(mock_dto)
+    other = resource_map_service.add_one(
+        mock_dto.model_copy(
+            update={
+                "directory_id": "other id",
+                "update_client_resource_id": "other_update_client_resource_id",
+            }
+        )
+    )
+    key = (mock_dto.directory_id, mock_dto.resource_type, mock_dto.directory_resource_id)
+    missing_key = (mock_dto.directory_id, "Endpoint", mock_dto.directory_resource_id)
+
+    actual = resource_map_service.get_many([key, missing_key, key])
+
+    assert list(actual.keys()) == [key]
+    assert actual[key].id == expected.id
+    assert actual[key].id != other.id
+    assert resource_map_service.get_many([]) == {}
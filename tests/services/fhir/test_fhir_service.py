@@ -1,3 +1,5 @@
+import copy
+import json
 from typing import Any, Dict, List
 from fhir.resources.R4B.bundle import Bundle, BundleEntry, BundleEntryRequest
 from fhir.resources.R4B.domainresource import DomainResource
@@ -141,6 +143,32 @@ def test_namespace_references_should_succeed(
     assert expected == actual
 
 
+@pytest.mark.parametrize(
+    "data, expected", list(zip(complete_resources, namespaced_resources))
+)
+def test_namespace_data_references_should_match_namespaced_resource(
+    fhir_service: FhirService, data: Dict[str, Any], expected: DomainResource
+) -> None:
+    original = copy.deepcopy(data)
+
+    actual = fhir_service.namespace_data_references(data, "example")
+
+    # Dates are only parsed in the model
+    assert json.loads(json.dumps(expected.model_dump(), default=str)) == actual
+    assert original == data
+
+
+@pytest.mark.parametrize(
+    "data, expected_refs", list(zip(complete_resources, fhir_references))
+)
+def test_data_references_should_match_resource_references(
+    fhir_service: FhirService, data: Dict[str, Any], expected_refs: List[Reference]
+) -> None:
+    actual = fhir_service.get_data_references(data)
+
+    assert sorted(ref.reference for ref in expected_refs if ref.reference) == sorted(actual)
+
+
 @pytest.mark.parametrize(
     "data, expected", zip(incomplete_resources, incomplete_resources)
 )
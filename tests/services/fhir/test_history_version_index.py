@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+import pytest
+
+from app.services.fhir.bundle.parser import create_bundle_entry
+from app.models.fhir.raw_entry import RawBundleEntry
+from app.services.fhir.bundle.utils import (
+    EntryVersion,
+    HistoryVersionIndex,
+    filter_history_entries,
+    get_entry_version,
+)
+
+
+def _entry(
+    res_id: str, version_id: str | None = None, last_updated: str | None = None
+) -> Dict[str, Any]:
+    meta: Dict[str, Any] = {}
+    if version_id is not None:
+        meta["versionId"] = version_id
+    if last_updated is not None:
+        meta["lastUpdated"] = last_updated
+    return {
+        "resource": {"resourceType": "Organization", "id": res_id, "meta": meta},
+        "request": {"method": "PUT", "url": f"Organization/{res_id}"},
+    }
+
+
+def _delete_entry(res_id: str, version_id: str) -> Dict[str, Any]:
+    return {
+        "request": {"method": "DELETE", "url": f"Organization/{res_id}"},
+        "response": {"status": "204", "etag": f'W/"{version_id}"'},
+    }
+
+
+def test_get_entry_version_should_be_equal_for_raw_and_model_entries() -> None:
+    data = _entry("org-1", "3", "2024-01-01T10:00:00+01:00")
+
+    expected = EntryVersion("3", datetime(2024, 1, 1, 9, 0, tzinfo=timezone.utc))
+
+    assert get_entry_version(RawBundleEntry(data)) == expected
+    assert get_entry_version(create_bundle_entry(data)) == expected
+
+
+def test_get_entry_version_should_fall_back_to_response_etag() -> None:
+    assert get_entry_version(RawBundleEntry(_delete_entry("org-1", "4"))) == EntryVersion("4")
+
+
+@pytest.mark.parametrize(
+    "older,newer",
+    [
+        (EntryVersion("2"), EntryVersion("10")),
+        (
+            EntryVersion("b", datetime(2024, 1, 1, tzinfo=timezone.utc)),
+            EntryVersion("a", datetime(2024, 1, 2, tzinfo=timezone.utc)),
+        ),
+    ],
+)
+def test_entry_version_is_newer_than(older: EntryVersion, newer: EntryVersion) -> None:
+    assert newer.is_newer_than(older)
+    assert not older.is_newer_than(newer)
+    assert not newer.is_newer_than(newer)
+
+
+def test_entry_version_without_comparable_versions_is_not_newer() -> None:
+    assert not EntryVersion().is_newer_than(EntryVersion())
+    assert not EntryVersion("a").is_newer_than(EntryVersion("b"))
+
+
+def test_filter_history_entries_should_keep_newest_version_in_place() -> None:
+    entries = [
+        RawBundleEntry(_entry("org-1", "1")),
+        RawBundleEntry(_entry("org-2", "5")),
+        RawBundleEntry(_entry("org-1", "2")),
+        RawBundleEntry(_entry("org-2", "4")),
+    ]
+
+    actual = filter_history_entries(entries)
+
+    assert actual == [entries[2], entries[1]]
+
+
+def test_history_version_index_should_drop_older_versions_of_earlier_pages() -> None:
+    index = HistoryVersionIndex()
+    first_page = [RawBundleEntry(_entry("org-1", "3")), RawBundleEntry(_entry("org-2", "1"))]
+    second_page = [
+        RawBundleEntry(_entry("org-1", "2")),
+        RawBundleEntry(_delete_entry("org-2", "2")),
+        RawBundleEntry(_entry("org-3", "1")),
+    ]
+
+    assert filter_history_entries(first_page, index) == first_page
+    assert filter_history_entries(second_page, index) == second_page[1:]
+    assert len(index) == 3
@@ -0,0 +1,54 @@
+import json
+from typing import Any, Dict
+from unittest.mock import patch
+
+from fhir.resources.R4B.bundle import Bundle
+from pydantic import ValidationError
+import pytest
+
+from app.services.fhir.bundle.parser import create_bundle, create_bundle_from_json
+from app.services.fhir.json_codec import dump_model, loads, validate_json
+
+
+@pytest.mark.parametrize("has_orjson", [True, False])
+def test_loads_should_decode_with_either_backend(has_orjson: bool) -> None:
+    with patch("app.services.fhir.json_codec.HAS_ORJSON", has_orjson):
+        assert loads(b'{"resourceType": "Bundle", "entry": []}') == {
+            "resourceType": "Bundle",
+            "entry": [],
+        }
+
+        with pytest.raises(json.JSONDecodeError):
+            loads(b"Invalid JSON")
+
+
+def test_dump_model_should_match_model_dump(mock_org_history_bundle: Dict[str, Any]) -> None:
+    bundle = create_bundle(mock_org_history_bundle)
+
+    actual = dump_model(bundle)
+
+    assert isinstance(actual, bytes)
+    assert create_bundle(json.loads(actual)) == bundle
+
+
+def test_validate_json_should_raise_decode_error_on_invalid_json() -> None:
+    with pytest.raises(json.JSONDecodeError):
+        validate_json(Bundle, b"Invalid JSON")
+
+
+def test_validate_json_should_raise_validation_error_on_invalid_bundle() -> None:
+    with pytest.raises(ValidationError):
+        validate_json(Bundle, b'{"resourceType": "Bundle", "total": "many"}')
+
+
+@pytest.mark.parametrize("fill_required_fields", [True, False])
+def test_create_bundle_from_json_should_equal_create_bundle(
+    mock_org_history_bundle: Dict[str, Any], fill_required_fields: bool
+) -> None:
+    expected = create_bundle(mock_org_history_bundle, fill_required_fields)
+
+    actual = create_bundle_from_json(
+        json.dumps(mock_org_history_bundle).encode(), fill_required_fields
+    )
+
+    assert actual == expected
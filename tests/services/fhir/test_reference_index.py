@@ -0,0 +1,70 @@
+from typing import Any, Dict
+
+import pytest
+from fhir.resources.R4B.reference import Reference
+
+from app.services.fhir.references.reference_extractor import (
+    from_resource_data,
+    get_references,
+)
+from app.services.fhir.references.reference_index import get_reference_index
+from app.services.fhir.resources.factory import create_resource
+
+
+@pytest.fixture
+def practitioner_with_nested_refs() -> Dict[str, Any]:
+    return {
+        "resourceType": "Practitioner",
+        "id": "pract-id",
+        "extension": [
+            {
+                "url": "http://example.com/extension",
+                "valueReference": {"reference": "Organization/ext-org-id"},
+            }
+        ],
+        "qualification": [
+            {
+                "code": {"text": "example"},
+                "identifier": [
+                    {"value": "example", "assigner": {"reference": "Organization/org-id"}}
+                ],
+                "issuer": {"reference": "Organization/org-id"},
+            }
+        ],
+    }
+
+
+def test_reference_index_should_contain_paths_of_resource_type() -> None:
+    index = get_reference_index("PractitionerRole")
+
+    assert index["organization"].is_reference
+    assert index["endpoint"].is_reference
+    assert index["identifier"].children["assigner"].is_reference
+    assert "extension" not in index
+
+
+def test_reference_index_should_raise_exception_with_non_mcsd_resource() -> None:
+    with pytest.raises(ValueError):
+        get_reference_index("Medication")
+
+
+def test_get_references_should_find_nested_references_once(
+    practitioner_with_nested_refs: Dict[str, Any],
+) -> None:
+    resource = create_resource(practitioner_with_nested_refs)
+
+    actual = get_references(resource)
+
+    assert actual == [Reference(reference="Organization/org-id")]
+
+
+def test_data_references_should_find_nested_references_once(
+    practitioner_with_nested_refs: Dict[str, Any],
+) -> None:
+    assert from_resource_data(practitioner_with_nested_refs) == ["Organization/org-id"]
+
+
+def test_data_references_should_ignore_contained_refs(
+    resource_with_contained_refs: Dict[str, Any],
+) -> None:
+    assert from_resource_data(resource_with_contained_refs) == ["Endpoint/ep-id"]
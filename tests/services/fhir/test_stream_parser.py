@@ -0,0 +1,59 @@
+import json
+from typing import Any, Dict, Generator, List
+
+import pytest
+
+from app.services.fhir.bundle.stream_parser import iter_bundle_entries
+
+
+def _chunks(content: bytes, size: int) -> List[bytes]:
+    return [content[i : i + size] for i in range(0, len(content), size)]
+
+
+def _parse(chunks: List[bytes]) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    entries: List[Dict[str, Any]] = []
+    parser: Generator[Dict[str, Any], None, Dict[str, Any]] = iter_bundle_entries(chunks)
+    while True:
+        try:
+            entries.append(next(parser))
+        except StopIteration as stop:
+            return entries, stop.value
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1024 * 1024])
+def test_iter_bundle_entries_should_match_json_loads(
+    mock_org_history_bundle: Dict[str, Any], chunk_size: int
+) -> None:
+    mock_org_history_bundle["total"] = 1234
+    mock_org_history_bundle["link"] = [{"relation": "next", "url": "https://example.com"}]
+    content = json.dumps(mock_org_history_bundle, indent=2).encode()
+
+    entries, bundle = _parse(_chunks(content, chunk_size))
+
+    assert entries == mock_org_history_bundle["entry"]
+    assert bundle == {k: v for k, v in mock_org_history_bundle.items() if k != "entry"}
+
+
+def test_iter_bundle_entries_should_decode_characters_split_over_chunks() -> None:
+    content = json.dumps(
+        {"entry": [{"resource": {"name": "Zorggroep Één €"}}]}, ensure_ascii=False
+    ).encode()
+
+    entries, _ = _parse(_chunks(content, 1))
+
+    assert entries == [{"resource": {"name": "Zorggroep Één €"}}]
+
+
+@pytest.mark.parametrize("content", [b"{}", b'{"entry": []}', b' { "entry" : null } '])
+def test_iter_bundle_entries_without_entries(content: bytes) -> None:
+    entries, _ = _parse([content])
+
+    assert entries == []
+
+
+@pytest.mark.parametrize(
+    "content", [b"", b"Invalid JSON", b'{"entry": [{"resource": {}}', b'{"entry": [{}] "a": 1}']
+)
+def test_iter_bundle_entries_should_raise_exception_on_invalid_json(content: bytes) -> None:
+    with pytest.raises(json.JSONDecodeError):
+        _parse(_chunks(content, 3))
@@ -64,7 +64,8 @@ def monitor_resources(interval: float = 0.1) -> None:
 def mock_requests_request(method: str, url: str, **kwargs: Any) -> requests.Response:
     global iteration
     with get_stats().timer(f"{iteration}.patch_timing"):
-        json_data = kwargs.get("json")
+        body = kwargs.get("data")
+        json_data = json_package.loads(body) if body is not None else kwargs.get("json")
 
         if str(url) == "https://testserver/test":
             return_bundle = Bundle(type="batch-response", entry=[])
@@ -169,7 +170,7 @@ def mock_get_history_batch(
     side_effect=mock_get_history_batch,
 )
 @patch(
-    "app.services.api.api_service.request",
+    "requests.Session.request",
     side_effect=mock_requests_request,
 )
 @patch(
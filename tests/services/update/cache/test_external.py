@@ -1,95 +1,148 @@
 from unittest.mock import patch, MagicMock
-from redis import ConnectionError
+from uuid import uuid4
+from redis import ConnectionError, ConnectionPool
 from app.models.adjacency.node import Node
 from app.services.update.cache.external import ExternalCachingService
+from app.services.update.cache.node_codec import encode_node
 
 PATCHED_MODULE = "app.services.update.cache.external.Redis"
 
 
-@patch(f"{PATCHED_MODULE}.exists")
-@patch(f"{PATCHED_MODULE}.get")
+def _run_key(external_caching_service: ExternalCachingService) -> str:
+    return f"mcsd:{external_caching_service.run_id}"
+
+
+@patch(f"{PATCHED_MODULE}.hget")
 def test_get_one_should_succeed_and_return_node(
-    mock_get: MagicMock,
-    mock_exists: MagicMock,
+    mock_hget: MagicMock,
     external_caching_service: ExternalCachingService,
     expected_node_org: Node,
 ) -> None:
     expected_node_org.clear_for_cache()
-    target_key = external_caching_service.make_target_id(expected_node_org.resource_id)
-    mock_get.return_value = expected_node_org.model_dump_json()
-    mock_exists.return_value = True
+    mock_hget.return_value = encode_node(expected_node_org)
 
     actual = external_caching_service.get_node(expected_node_org.resource_id)
 
     assert expected_node_org == actual
-    mock_get.assert_called_once_with(target_key)
-    mock_exists.assert_called_once_with(target_key)
+    mock_hget.assert_called_once_with(
+        _run_key(external_caching_service), expected_node_org.resource_id
+    )
 
 
-@patch(f"{PATCHED_MODULE}.get")
-@patch(f"{PATCHED_MODULE}.exists")
+@patch(f"{PATCHED_MODULE}.hget")
 def test_get_one_should_return_none_if_node_does_not_exist(
-    mock_exists: MagicMock,
-    mock_get: MagicMock,
+    mock_hget: MagicMock,
     external_caching_service: ExternalCachingService,
     expected_node_org: Node,
 ) -> None:
-    target_id = external_caching_service.make_target_id(expected_node_org.resource_id)
-    mock_exists.return_value = False
+    mock_hget.return_value = None
 
     actual = external_caching_service.get_node(expected_node_org.resource_id)
 
     assert actual is None
-    mock_exists.assert_called_once_with(target_id)
-    mock_get.assert_not_called()
 
 
-@patch(f"{PATCHED_MODULE}.set")
-def test_add_node_should_succeed(
-    mock_set: MagicMock,
+@patch(f"{PATCHED_MODULE}.pipeline")
+def test_get_nodes_should_fetch_all_nodes_in_one_pipeline(
+    mock_pipeline: MagicMock,
+    external_caching_service: ExternalCachingService,
+    expected_node_org: Node,
+) -> None:
+    expected_node_org.clear_for_cache()
+    pipeline = mock_pipeline.return_value
+    pipeline.execute.return_value = [[encode_node(expected_node_org), None]]
+
+    actual = external_caching_service.get_nodes(
+        [expected_node_org.resource_id, "missing", expected_node_org.resource_id]
+    )
+
+    assert actual == {expected_node_org.resource_id: expected_node_org}
+    mock_pipeline.assert_called_once_with(transaction=False)
+    pipeline.hmget.assert_called_once_with(
+        _run_key(external_caching_service), [expected_node_org.resource_id, "missing"]
+    )
+    pipeline.execute.assert_called_once()
+
+
+@patch("app.services.update.cache.external.HMGET_BATCH_SIZE", 2)
+@patch(f"{PATCHED_MODULE}.pipeline")
+def test_get_nodes_should_split_large_lookups_in_batches(
+    mock_pipeline: MagicMock,
     external_caching_service: ExternalCachingService,
+) -> None:
+    pipeline = mock_pipeline.return_value
+    pipeline.execute.return_value = [[None, None], [None]]
+
+    actual = external_caching_service.get_nodes(["a", "b", "c"])
+
+    assert actual == {}
+    assert pipeline.hmget.call_count == 2
+    pipeline.execute.assert_called_once()
+
+
+@patch(f"{PATCHED_MODULE}.pipeline")
+def test_add_node_should_store_node_in_run_hash_with_ttl(
+    mock_pipeline: MagicMock,
     expected_node_org: Node,
 ) -> None:
-    target_id = external_caching_service.make_target_id(expected_node_org.resource_id)
+    service = ExternalCachingService(
+        run_id=uuid4(),
+        connection_pool=ConnectionPool(host="example.com", port=8000),
+        namespace="tenant",
+        object_ttl=30,
+    )
     expected_node_org.clear_for_cache()
-    data = expected_node_org.model_dump_json()
-    # even though the function beign tested does not return, redis set does. So
-    # will set a return value for consisntecy
-    mock_set.return_value = expected_node_org.model_dump_json()
+    data = encode_node(expected_node_org)
+    pipeline = mock_pipeline.return_value
 
-    external_caching_service.add_node(expected_node_org)
+    service.add_node(expected_node_org)
 
-    mock_set.assert_called_once_with(target_id, data)
+    run_key = f"tenant:{service.run_id}"
+    pipeline.hset.assert_called_once_with(run_key, expected_node_org.resource_id, data)
+    pipeline.expire.assert_called_once_with(run_key, 30)
+    pipeline.execute.assert_called_once()
 
 
-@patch(f"{PATCHED_MODULE}.exists")
+@patch(f"{PATCHED_MODULE}.hexists")
 def test_key_exists_should_return_true_if_key_is_valid(
-    mock_exists: MagicMock,
+    mock_hexists: MagicMock,
     external_caching_service: ExternalCachingService,
     expected_node_org: Node,
 ) -> None:
-    mock_exists.return_value = 1
-    target_id = external_caching_service.make_target_id(expected_node_org.resource_id)
+    mock_hexists.return_value = True
 
-    actual = external_caching_service.key_exists(target_id)
+    actual = external_caching_service.key_exists(expected_node_org.resource_id)
 
     assert actual is True
-    mock_exists.assert_called_once_with(target_id)
+    mock_hexists.assert_called_once_with(
+        _run_key(external_caching_service), expected_node_org.resource_id
+    )
 
 
-@patch(f"{PATCHED_MODULE}.exists")
+@patch(f"{PATCHED_MODULE}.hexists")
 def test_key_exists_should_return_false_if_key_is_invalid(
-    mock_exists: MagicMock,
+    mock_hexists: MagicMock,
     external_caching_service: ExternalCachingService,
     expected_node_org: Node,
 ) -> None:
-    mock_exists.return_value = 0
-    target_id = external_caching_service.make_target_id(expected_node_org.resource_id)
+    mock_hexists.return_value = False
 
-    actual = external_caching_service.key_exists(target_id)
+    actual = external_caching_service.key_exists(expected_node_org.resource_id)
 
     assert actual is False
-    mock_exists.assert_called_once_with(target_id)
+
+
+@patch(f"{PATCHED_MODULE}.flushdb")
+@patch(f"{PATCHED_MODULE}.delete")
+def test_clear_should_only_delete_run_hash(
+    mock_delete: MagicMock,
+    mock_flushdb: MagicMock,
+    external_caching_service: ExternalCachingService,
+) -> None:
+    external_caching_service.clear()
+
+    mock_delete.assert_called_once_with(_run_key(external_caching_service))
+    mock_flushdb.assert_not_called()
 
 
 @patch(f"{PATCHED_MODULE}.ping")
@@ -117,17 +170,16 @@ def test_is_healthy_should_return_false_if_connection_is_down(
     mock_ping.assert_called_once()
 
 
-@patch(f"{PATCHED_MODULE}.scan_iter")
+@patch(f"{PATCHED_MODULE}.hkeys")
 def test_keys_should_return_list_of_keys_in_cache(
-    mock_scan_iter: MagicMock,
+    mock_hkeys: MagicMock,
     external_caching_service: ExternalCachingService,
     expected_node_org: Node,
 ) -> None:
-    target_id = external_caching_service.make_target_id(expected_node_org.resource_id)
-    mock_scan_iter.return_value = [target_id.encode()]
+    mock_hkeys.return_value = [expected_node_org.resource_id.encode()]
     expected = [expected_node_org.resource_id]
 
     actual = external_caching_service.keys()
 
     assert expected == actual
-    mock_scan_iter.assert_called_once()
+    mock_hkeys.assert_called_once_with(_run_key(external_caching_service))
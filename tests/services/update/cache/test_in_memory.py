@@ -1,5 +1,12 @@
+from pathlib import Path
+from uuid import uuid4
+
 from app.models.adjacency.node import Node
-from app.services.update.cache.in_memory import InMemoryCachingService
+from app.services.update.cache.in_memory import (
+    NODE_BASE_SIZE,
+    InMemoryCachingService,
+    estimate_node_size,
+)
 
 
 def test_get_one_should_succeed_and_return_one_node(
@@ -20,6 +27,16 @@ def test_get_one_should_return_none_if_id_is_incorrect(
     assert actual is None
 
 
+def test_get_nodes_should_return_cached_nodes_by_id(
+    expected_node_org: Node, in_memory_cache_service: InMemoryCachingService
+) -> None:
+    in_memory_cache_service.add_node(expected_node_org)
+
+    actual = in_memory_cache_service.get_nodes([expected_node_org.resource_id, "incorrect_id"])
+
+    assert actual == {expected_node_org.resource_id: expected_node_org}
+
+
 def test_add_one_should_succeed(
     expected_node_org: Node, in_memory_cache_service: InMemoryCachingService
 ) -> None:
@@ -69,3 +86,58 @@ def test_is_healthy_should_always_be_true(
     actual = in_memory_cache_service.is_healthy()
 
     assert actual is True
+
+
+def _node(resource_id: str) -> Node:
+    return Node(resource_id=resource_id, resource_type="Organization", method="PUT")
+
+
+def test_bounded_cache_should_evict_least_recently_used_node() -> None:
+    cache = InMemoryCachingService(uuid4(), max_nodes=2)
+    cache.add_node(_node("a"))
+    cache.add_node(_node("b"))
+    assert cache.key_exists("a")
+
+    cache.add_node(_node("c"))
+
+    assert sorted(cache.keys()) == ["a", "c"]
+    assert cache.get_node("b") is None
+    assert cache.get_stats() == {
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+        "spilled": 0,
+        "nodes": 2,
+        "bytes": sum(
+            estimate_node_size(cache.make_target_id(id), _node(id)) for id in ("a", "c")
+        ),
+    }
+
+
+def test_bounded_cache_should_evict_on_memory_limit() -> None:
+    cache = InMemoryCachingService(uuid4(), max_bytes=3 * NODE_BASE_SIZE)
+
+    for i in range(5):
+        cache.add_node(_node(f"org-{i}"))
+
+    stats = cache.get_stats()
+    assert stats["nodes"] == 2
+    assert stats["bytes"] <= 3 * NODE_BASE_SIZE
+    assert stats["evictions"] == 3
+
+
+def test_bounded_cache_should_spill_evicted_nodes_to_disk(tmp_path: Path) -> None:
+    cache = InMemoryCachingService(uuid4(), max_nodes=1, spill_dir=str(tmp_path))
+    cache.add_node(_node("a"))
+    cache.add_node(_node("b"))
+
+    assert cache.key_exists("a")
+    assert sorted(cache.keys()) == ["a", "b"]
+    assert cache.get_nodes(["a", "b"]) == {"a": _node("a"), "b": _node("b")}
+    assert cache.get_stats()["spilled"] >= 2
+    assert len(list(tmp_path.iterdir())) == 1
+
+    cache.clear()
+
+    assert cache.keys() == []
+    assert list(tmp_path.iterdir()) == []
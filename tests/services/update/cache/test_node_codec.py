@@ -0,0 +1,74 @@
+import pytest
+
+from app.models.adjacency.node import Node
+from app.services.update.cache.node_codec import (
+    CODEC_VERSION,
+    FLAG_COMPRESSED,
+    decode_node,
+    encode_node,
+)
+
+
+def _cached_node(**kwargs: object) -> Node:
+    data: dict[str, object] = {
+        "resource_id": "org-1",
+        "resource_type": "Organization",
+        "method": "PUT",
+        "status": "update",
+        "updated": True,
+        "directory_hash": "0f" * 32,
+        "update_client_hash": None,
+    }
+    data.update(kwargs)
+    return Node.model_validate(data)
+
+
+def test_encode_node_should_round_trip_cached_node(expected_node_org: Node) -> None:
+    expected_node_org.clear_for_cache()
+
+    actual = decode_node(encode_node(expected_node_org))
+
+    assert actual == expected_node_org
+
+
+@pytest.mark.parametrize(
+    "node",
+    [
+        _cached_node(),
+        _cached_node(method="DELETE", status="delete", directory_hash=None, updated=False),
+        # Hashes that are not a lowercase hex digest are stored as strings
+        _cached_node(directory_hash="ABCD", update_client_hash="not-a-hash"),
+        _cached_node(resource_id="Zorggroep-Één", update_client_hash="abc"),
+    ],
+)
+def test_encode_node_should_round_trip_all_fields(node: Node) -> None:
+    actual = decode_node(encode_node(node))
+
+    assert actual == node
+
+
+def test_encode_node_should_be_smaller_than_json() -> None:
+    node = _cached_node(update_client_hash="a1" * 32)
+
+    actual = encode_node(node)
+
+    assert len(actual) < len(node.model_dump_json()) / 3
+
+
+def test_encode_node_should_only_compress_when_smaller() -> None:
+    small = _cached_node()
+    large = _cached_node(resource_id="a" * 512)
+
+    assert encode_node(small, compress=True)[1] & FLAG_COMPRESSED == 0
+    encoded = encode_node(large, compress=True)
+    assert encoded[1] & FLAG_COMPRESSED
+    assert len(encoded) < len(encode_node(large))
+    assert decode_node(encoded) == large
+
+
+def test_decode_node_should_raise_exception_on_unknown_version() -> None:
+    data = bytearray(encode_node(_cached_node()))
+    data[0] = CODEC_VERSION + 1
+
+    with pytest.raises(ValueError):
+        decode_node(bytes(data))
@@ -6,8 +6,9 @@ from app.config import ConfigExternalCache
 from app.services.update.cache.external import ExternalCachingService
 from app.services.update.cache.in_memory import InMemoryCachingService
 from app.services.update.cache.provider import CacheProvider
+from app.services.update.cache.tiered import TieredCachingService
 
-PATCHED_MODULE = "app.services.update.cache.provider.ExternalCachingService.is_healthy"
+PATCHED_MODULE = "app.services.update.cache.provider.RedisPool.is_healthy"
 
 
 @pytest.fixture()
@@ -23,7 +24,66 @@ def test_create_should_return_external_cache_instance(
     mock_is_healthy.return_value = True
     cache_instance = cache_provider.create()
 
+    assert isinstance(cache_instance, TieredCachingService)
+    assert isinstance(cache_instance.l2, ExternalCachingService)
+    assert cache_instance.run_id == cache_instance.l2.run_id
+
+
+@patch(PATCHED_MODULE)
+def test_create_should_return_external_cache_without_l1(
+    mock_is_healthy: MagicMock,
+) -> None:
+    mock_is_healthy.return_value = True
+    config = ConfigExternalCache(host="example.com", port=8000, l1_max_nodes=0)
+
+    cache_instance = CacheProvider(config=config).create()
+
+    assert isinstance(cache_instance, ExternalCachingService)
+
+
+@patch(PATCHED_MODULE)
+def test_create_should_scope_external_cache_to_configured_namespace(
+    mock_is_healthy: MagicMock,
+) -> None:
+    mock_is_healthy.return_value = True
+    config = ConfigExternalCache(
+        host="example.com",
+        port=8000,
+        default_cache_namespace="tenant",
+        object_ttl=30,
+        l1_max_nodes=0,
+    )
+
+    cache_instance = CacheProvider(config=config).create()
+
     assert isinstance(cache_instance, ExternalCachingService)
+    assert cache_instance._ExternalCachingService__run_key == f"tenant:{cache_instance.run_id}"  # type: ignore[attr-defined]
+    assert cache_instance._ExternalCachingService__object_ttl == 30  # type: ignore[attr-defined]
+
+
+@patch(PATCHED_MODULE)
+def test_create_should_share_connection_pool_between_runs(
+    mock_is_healthy: MagicMock,
+    cache_provider: CacheProvider,
+) -> None:
+    mock_is_healthy.return_value = True
+
+    first = cache_provider.create()
+    second = cache_provider.create()
+
+    assert isinstance(first, TieredCachingService)
+    assert isinstance(second, TieredCachingService)
+    assert first.run_id != second.run_id
+    assert (
+        first.l2._ExternalCachingService__redis.connection_pool  # type: ignore[attr-defined]
+        is second.l2._ExternalCachingService__redis.connection_pool  # type: ignore[attr-defined]
+    )
+
+
+def test_get_stats_should_return_none_without_external_cache(
+    cache_provier_without_config: CacheProvider,
+) -> None:
+    assert cache_provier_without_config.get_stats() is None
 
 
 @patch(PATCHED_MODULE)
@@ -0,0 +1,60 @@
+from typing import Generator
+from unittest.mock import MagicMock, patch
+
+import pytest
+from redis import ConnectionError
+
+from app.config import ConfigExternalCache
+from app.services.update.cache.redis_pool import RedisPool
+
+PATCHED_MODULE = "app.services.update.cache.redis_pool.Redis.ping"
+
+
+@pytest.fixture()
+def redis_pool() -> Generator[RedisPool, None, None]:
+    pool = RedisPool(
+        ConfigExternalCache(host="example.com", port=8000, max_connections=4, health_check_interval=60)
+    )
+    yield pool
+    pool.close()
+
+
+@patch(PATCHED_MODULE)
+def test_is_healthy_should_only_check_redis_on_first_call(
+    mock_ping: MagicMock, redis_pool: RedisPool
+) -> None:
+    mock_ping.return_value = True
+
+    assert redis_pool.is_healthy() is True
+    assert redis_pool.is_healthy() is True
+    mock_ping.assert_called_once()
+
+
+@patch(PATCHED_MODULE)
+def test_check_health_should_update_cached_health(
+    mock_ping: MagicMock, redis_pool: RedisPool
+) -> None:
+    mock_ping.return_value = True
+    assert redis_pool.is_healthy() is True
+
+    mock_ping.side_effect = ConnectionError("Failed to connect")
+
+    assert redis_pool.check_health() is False
+    assert redis_pool.is_healthy() is False
+
+
+@patch(PATCHED_MODULE)
+def test_get_stats_should_return_health_and_pool_usage(
+    mock_ping: MagicMock, redis_pool: RedisPool
+) -> None:
+    mock_ping.return_value = True
+    redis_pool.check_health()
+
+    actual = redis_pool.get_stats()
+
+    assert actual["healthy"] is True
+    assert actual["checked_at"] is not None
+    assert actual["max_connections"] == 4
+    assert actual["connections_opened"] == 0
+    assert actual["connections_in_use"] == 0
+    assert actual["connections_idle"] == 0
@@ -0,0 +1,80 @@
+from uuid import uuid4
+
+from app.models.adjacency.node import Node
+from app.services.update.cache.in_memory import InMemoryCachingService
+from app.services.update.cache.tiered import TieredCachingService
+
+
+class CountingCachingService(InMemoryCachingService):
+    """
+    Stands in for the external cache and counts the lookups that reach it.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(uuid4())
+        self.lookups = 0
+
+    def get_node(self, id: str) -> Node | None:
+        self.lookups += 1
+        return super().get_node(id)
+
+    def get_nodes(self, ids: list[str]) -> dict[str, Node]:
+        self.lookups += 1
+        return super().get_nodes(ids)
+
+    def key_exists(self, id: str) -> bool:
+        self.lookups += 1
+        return super().key_exists(id)
+
+
+def _node(resource_id: str) -> Node:
+    return Node(resource_id=resource_id, resource_type="Organization", method="PUT")
+
+
+def test_add_node_should_write_through_to_l2() -> None:
+    l2 = CountingCachingService()
+    cache = TieredCachingService(l2)
+
+    cache.add_node(_node("a"))
+
+    assert l2.keys() == ["a"]
+    assert cache.key_exists("a")
+    assert cache.get_node("a") == _node("a")
+    assert l2.lookups == 0
+
+
+def test_lookups_should_keep_l2_hits_in_l1() -> None:
+    l2 = CountingCachingService()
+    l2.add_node(_node("a"))
+    l2.add_node(_node("b"))
+    cache = TieredCachingService(l2)
+
+    assert cache.key_exists("a")
+    assert cache.get_nodes(["a", "b", "c"]) == {"a": _node("a"), "b": _node("b")}
+    assert cache.get_node("b") == _node("b")
+    assert cache.key_exists("a")
+
+    # One lookup for "a", one batch lookup for "b" and "c"
+    assert l2.lookups == 2
+
+
+def test_l1_should_be_bounded() -> None:
+    l2 = CountingCachingService()
+    cache = TieredCachingService(l2, max_nodes=1)
+    cache.add_node(_node("a"))
+    cache.add_node(_node("b"))
+
+    assert cache.get_node("a") == _node("a")
+    assert l2.lookups == 1
+    assert cache.get_stats()["l1_evictions"] == 2
+
+
+def test_clear_should_clear_both_levels() -> None:
+    l2 = CountingCachingService()
+    cache = TieredCachingService(l2)
+    cache.add_node(_node("a"))
+
+    cache.clear()
+
+    assert not cache.key_exists("a")
+    assert l2.keys() == []
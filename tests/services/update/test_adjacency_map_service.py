@@ -1,18 +1,29 @@
+import copy
 from typing import Any, Dict, List
 from unittest.mock import MagicMock, patch
 import pytest
 from fhir.resources.R4B.domainresource import DomainResource
+from fhir.resources.R4B.organization import Organization
 from requests.exceptions import ConnectionError
 
 from app.models.adjacency.adjacency_map import AdjacencyMap
 from app.models.adjacency.node import Node, NodeReference
 from app.models.fhir.types import BundleRequestParams
 from app.models.resource_map.dto import ResourceMapDto
+from app.services.api.fhir_api import FhirApi
 from app.services.entity.resource_map_service import ResourceMapService
 from app.services.fhir.bundle.parser import create_bundle_entry
+from app.models.fhir.raw_entry import RawBundleEntry
 from app.services.fhir.fhir_service import FhirService
+from app.services.fhir.bundle.utils import HistoryVersionIndex
 from app.services.update.adjacency_map_service import AdjacencyMapService
-from app.services.update.computation_service import ComputationService
+from app.services.update.cache.in_memory import InMemoryCachingService
+from app.services.update.computation_service import (
+    DELETED_CONTENT_HASH,
+    ComputationService,
+)
+from app.services.update.filter_ura import ID_SYSTEM_URA
+from app.services.update.node_state import NodeStateStore
 
 PATCHED_MODULE = "app.services.update.adjacency_map_service.FhirApi.post_bundle"
 
@@ -172,6 +183,165 @@ def test_build_adjacency_map_should_succeed_when_data_from_update_client_exists(
     assert expected.data == actual.data
 
 
+def store_resource_maps(
+    resource_map_service: ResourceMapService, nodes: List[Node], directory_id: str
+) -> None:
+    for node in nodes:
+        resource_map_service.add_one(
+            ResourceMapDto(
+                directory_id=directory_id,
+                directory_resource_id=node.resource_id,
+                resource_type=node.resource_type,
+                update_client_resource_id=f"{directory_id}-{node.resource_id}",
+                content_hash=node.directory_hash,
+            )
+        )
+
+
+def test_build_adjacency_map_should_use_stored_content_hash_without_reading_update_client(
+    adjacency_map_service: AdjacencyMapService,
+    resource_map_service: ResourceMapService,
+    org_history_entry_1: Dict[str, Any],
+    ep_history_entry: Dict[str, Any],
+    mock_directory_id: str,
+) -> None:
+    org_entry = create_bundle_entry(org_history_entry_1)
+    ep_entry = create_bundle_entry(ep_history_entry)
+    org_node = adjacency_map_service.create_node(org_entry)
+    ep_node = adjacency_map_service.create_node(ep_entry)
+    store_resource_maps(resource_map_service, [org_node, ep_node], mock_directory_id)
+    adjacency_map_service.get_directory_data = MagicMock(return_value=[ep_entry])  # type: ignore
+    adjacency_map_service.get_update_client_data = MagicMock(return_value=[])  # type: ignore
+
+    actual = adjacency_map_service.build_adjacency_map([org_entry])
+
+    adjacency_map_service.get_update_client_data.assert_not_called()
+    assert actual.data[org_node.resource_id].status == "equal"
+    assert actual.data[ep_node.resource_id].status == "equal"
+
+
+def _add_deleted_resource_map(
+    resource_map_service: ResourceMapService, directory_id: str, content_hash: str | None
+) -> RawBundleEntry:
+    resource_map_service.add_one(
+        ResourceMapDto(
+            directory_id=directory_id,
+            directory_resource_id="org-deleted",
+            resource_type="Organization",
+            update_client_resource_id=f"{directory_id}-org-deleted",
+            content_hash=content_hash,
+        )
+    )
+    return RawBundleEntry({"request": {"method": "DELETE", "url": "Organization/org-deleted"}})
+
+
+def test_build_adjacency_map_should_not_read_deleted_resources_from_update_client(
+    adjacency_map_service: AdjacencyMapService,
+    resource_map_service: ResourceMapService,
+    mock_directory_id: str,
+) -> None:
+    entry = _add_deleted_resource_map(
+        resource_map_service, mock_directory_id, DELETED_CONTENT_HASH
+    )
+    adjacency_map_service.get_update_client_data = MagicMock(return_value=[])  # type: ignore
+
+    actual = adjacency_map_service.build_adjacency_map([entry])
+
+    adjacency_map_service.get_update_client_data.assert_not_called()
+    assert actual.data["org-deleted"].status == "ignore"
+    assert actual.data["org-deleted"].update_data is None
+
+
+def test_build_adjacency_map_should_mark_earlier_deletions_once(
+    adjacency_map_service: AdjacencyMapService,
+    resource_map_service: ResourceMapService,
+    mock_directory_id: str,
+) -> None:
+    entry = _add_deleted_resource_map(resource_map_service, mock_directory_id, None)
+    adjacency_map_service.get_update_client_data = MagicMock(return_value=[])  # type: ignore
+
+    actual = adjacency_map_service.build_adjacency_map([entry])
+
+    adjacency_map_service.get_update_client_data.assert_called_once()
+    node = actual.data["org-deleted"]
+    assert node.status == "ignore"
+    assert node.update_data is not None
+    assert node.update_data.bundle_entry is None
+    assert node.update_data.resource_map_dto is not None
+    assert node.update_data.resource_map_dto.content_hash == DELETED_CONTENT_HASH
+
+
+def test_build_adjacency_map_should_resolve_unchanged_references_from_node_state(
+    fhir_api: FhirApi,
+    resource_map_service: ResourceMapService,
+    in_memory_cache_service: InMemoryCachingService,
+    org_history_entry_1: Dict[str, Any],
+    ep_history_entry: Dict[str, Any],
+    mock_directory_id: str,
+) -> None:
+    node_state = NodeStateStore(mock_directory_id, resource_map_service, HistoryVersionIndex())
+    node_state.complete_resource_type("Endpoint")
+    adjacency_map_service = AdjacencyMapService(
+        directory_id=mock_directory_id,
+        directory_api=fhir_api,
+        update_client_api=fhir_api,
+        resource_map_service=resource_map_service,
+        cache_service=in_memory_cache_service,
+        uras_allowed=[],
+        node_state=node_state,
+    )
+    org_entry = create_bundle_entry(org_history_entry_1)
+    ep_node = adjacency_map_service.create_node(create_bundle_entry(ep_history_entry))
+    store_resource_maps(resource_map_service, [ep_node], mock_directory_id)
+    adjacency_map_service.get_directory_data = MagicMock(return_value=[])  # type: ignore
+    adjacency_map_service.get_update_client_data = MagicMock(return_value=[])  # type: ignore
+
+    actual = adjacency_map_service.build_adjacency_map([org_entry])
+
+    adjacency_map_service.get_directory_data.assert_not_called()
+    adjacency_map_service.get_update_client_data.assert_not_called()
+    node = actual.data[ep_node.resource_id]
+    assert node.status == "equal"
+    assert node.updated is True
+    assert node.directory_hash == ep_node.directory_hash
+
+
+def test_build_adjacency_map_should_read_update_client_when_verifying(
+    fhir_api: FhirApi,
+    resource_map_service: ResourceMapService,
+    in_memory_cache_service: InMemoryCachingService,
+    org_history_entry_1: Dict[str, Any],
+    ep_history_entry: Dict[str, Any],
+    mock_directory_id: str,
+) -> None:
+    adjacency_map_service = AdjacencyMapService(
+        directory_id=mock_directory_id,
+        directory_api=fhir_api,
+        update_client_api=fhir_api,
+        resource_map_service=resource_map_service,
+        cache_service=in_memory_cache_service,
+        uras_allowed=[],
+        verify_update_client=True,
+    )
+    org_entry = create_bundle_entry(org_history_entry_1)
+    ep_entry = create_bundle_entry(ep_history_entry)
+    org_node = adjacency_map_service.create_node(org_entry)
+    ep_node = adjacency_map_service.create_node(ep_entry)
+    store_resource_maps(resource_map_service, [org_node, ep_node], mock_directory_id)
+    adjacency_map_service.get_directory_data = MagicMock(return_value=[ep_entry])  # type: ignore
+    # The resources were removed from the update client, so they have to be written again
+    adjacency_map_service.get_update_client_data = MagicMock(return_value=[])  # type: ignore
+
+    actual = adjacency_map_service.build_adjacency_map([org_entry])
+
+    adjacency_map_service.get_update_client_data.assert_called_once()
+    node = actual.data[ep_node.resource_id]
+    assert node.status == "update"
+    assert node.update_data is not None
+    assert node.update_data.resource_map_dto is not None
+    assert node.update_data.resource_map_dto.content_hash == ep_node.directory_hash
+
+
 @patch(PATCHED_MODULE)
 def test_build_adjacency_map_should_raise_exception_when_directory_is_down(
     mock_response: MagicMock,
@@ -253,7 +423,9 @@ def test_create_node_references_should_succeed(
     node = adjacency_map_service.create_node(entry)
 
     assert node.references == org_node_references
-    adjacency_map_service.create_node_references.assert_called_once_with(entry)
+    adjacency_map_service.create_node_references.assert_called_once_with(
+        RawBundleEntry.from_bundle_entry(entry)
+    )
 
 
 def test_create_update_data_should_succeed_and_mark_item_as_new(
@@ -289,6 +461,35 @@ def test_create_update_data_should_succeed_and_mark_item_as_new(
     assert node.update_data.bundle_entry == expected_data
 
 
+def test_create_update_data_should_write_filtered_payload_and_keep_directory_entry(
+    mock_org_bundle_entry: Dict[str, Any],
+    mock_directory_id: str,
+    adjacency_map_service: AdjacencyMapService,
+    computation_service: ComputationService,
+) -> None:
+    mock_org_bundle_entry["resource"]["identifier"] = [
+        {"system": ID_SYSTEM_URA, "value": "12345678"}
+    ]
+    original = copy.deepcopy(mock_org_bundle_entry)
+    entry = RawBundleEntry(mock_org_bundle_entry)
+    node = adjacency_map_service.create_node(entry)
+    node.status = "new"
+
+    node.update_data = adjacency_map_service.create_update_data(node, None)
+
+    assert node.update_data is not None
+    assert node.update_data.bundle_entry is not None
+    resource = node.update_data.bundle_entry.resource
+    assert isinstance(resource, Organization)
+    assert resource.id == f"{mock_directory_id}-{node.resource_id}"
+    assert resource.identifier == []
+    assert resource.endpoint is not None
+    assert resource.endpoint[0].reference == f"Endpoint/{mock_directory_id}-ep-id"
+    # The stored hash is the hash of what is written
+    assert computation_service.hash_resource(resource) == node.directory_hash
+    assert entry.data == original
+
+
 def test_create_node_data_should_succeed_with_status_update(
     mock_org_bundle_entry: Dict[str, Any],
     update_client_org_bundle_entry: Dict[str, Any],
@@ -327,6 +528,39 @@ def test_create_node_data_should_succeed_with_status_update(
     assert node.update_data.bundle_entry is not None
 
 
+def test_create_update_data_should_store_newer_version_of_equal_resource(
+    mock_org_bundle_entry: Dict[str, Any],
+    mock_directory_id: str,
+    adjacency_map_service: AdjacencyMapService,
+    resource_map_service: ResourceMapService,
+) -> None:
+    entry = copy.deepcopy(mock_org_bundle_entry)
+    entry["resource"]["meta"] = {"versionId": "2"}
+    node = adjacency_map_service.create_node(create_bundle_entry(entry))
+    res_map = resource_map_service.add_one(
+        ResourceMapDto(
+            directory_id=mock_directory_id,
+            directory_resource_id=node.resource_id,
+            resource_type=node.resource_type,
+            update_client_resource_id=f"{mock_directory_id}-{node.resource_id}",
+            content_hash="hash",
+            directory_version_id="1",
+        )
+    )
+    node.status = "equal"
+    node.directory_hash = node.update_client_hash = "hash"
+
+    node.update_data = adjacency_map_service.create_update_data(node, res_map)
+
+    assert node.update_data is not None
+    assert node.update_data.bundle_entry is None
+    assert node.update_data.resource_map_dto is not None
+    assert node.update_data.resource_map_dto.directory_version_id == "2"
+
+    res_map.directory_version_id = "2"
+    assert adjacency_map_service.create_update_data(node, res_map) is None
+
+
 def test_create_node_update_data_should_raise_exception_when_status_is_unknown(
     mock_org_bundle_entry: Dict[str, Any],
     adjacency_map_service: AdjacencyMapService,
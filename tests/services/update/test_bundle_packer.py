@@ -0,0 +1,69 @@
+from fhir.resources.R4B.bundle import BundleEntry, BundleEntryRequest
+
+from app.models.adjacency.node import Node, NodeUpdateData
+from app.services.update.bundle_packer import BundleBatch, BundlePacker
+
+
+def _node(resource_id: str, with_entry: bool = True) -> Node:
+    return Node(
+        resource_id=resource_id,
+        resource_type="Organization",
+        method="PUT",
+        update_data=NodeUpdateData(
+            bundle_entry=BundleEntry(
+                request=BundleEntryRequest(method="PUT", url=f"Organization/{resource_id}")
+            )
+        )
+        if with_entry
+        else None,
+    )
+
+
+def test_pack_combines_groups_up_to_max_entries() -> None:
+    groups = [[_node("a"), _node("b")], [_node("c")], [_node("d"), _node("e")]]
+
+    batches = BundlePacker(max_entries=3).pack(groups)
+
+    assert [b.groups for b in batches] == [groups[:2], groups[2:]]
+
+
+def test_pack_keeps_groups_larger_than_limit_whole() -> None:
+    groups = [[_node("a")], [_node("b"), _node("c"), _node("d")], [_node("e")]]
+
+    batches = BundlePacker(max_entries=2).pack(groups)
+
+    assert [b.groups for b in batches] == [[groups[0]], [groups[1]], [groups[2]]]
+
+
+def test_pack_limits_batches_by_size_in_bytes() -> None:
+    groups = [[_node("a")], [_node("b")], [_node("c")]]
+    entry_size = len(
+        BundleEntry(
+            request=BundleEntryRequest(method="PUT", url="Organization/a")
+        ).model_dump_json(exclude_none=True)
+    )
+
+    batches = BundlePacker(max_entries=100, max_bytes=entry_size * 2).pack(groups)
+
+    assert [b.groups for b in batches] == [groups[:2], groups[2:]]
+
+
+def test_pack_with_default_limit_sends_every_group_separately() -> None:
+    groups = [[_node("a")], [_node("b")], [_node("c", with_entry=False)]]
+
+    batches = BundlePacker().pack(groups)
+
+    # Groups without entries do not count towards the limit
+    assert [b.groups for b in batches] == [[groups[0]], groups[1:]]
+
+
+def test_group_of_entry_maps_entry_index_back_to_group() -> None:
+    first = [_node("a"), _node("b", with_entry=False), _node("c")]
+    second = [_node("d")]
+    batch = BundleBatch(groups=[first, second])
+
+    assert len(batch.entries()) == 3
+    assert batch.group_of_entry(0) is first
+    assert batch.group_of_entry(1) is first
+    assert batch.group_of_entry(2) is second
+    assert batch.group_of_entry(3) is None
@@ -0,0 +1,162 @@
+import os
+import subprocess
+import sys
+from datetime import datetime
+from typing import Any, Dict
+
+from fhir.resources.R4B.location import Location
+from fhir.resources.R4B.organization import Organization
+import pytest
+
+from app.db.entities.resource_map import ResourceMap
+from app.services.fhir.bundle.parser import create_bundle_entry
+from app.models.fhir.raw_entry import RawBundleEntry
+from app.services.update.computation_service import ComputationService
+
+
+def test_hash_resource_ignores_id_and_meta(
+    computation_service: ComputationService, mock_org: Dict[str, Any]
+) -> None:
+    other = {**mock_org, "id": "other-id", "meta": {"versionId": "12"}}
+
+    assert computation_service.hash_resource(
+        Organization.model_validate(mock_org)
+    ) == computation_service.hash_resource(Organization.model_validate(other))
+
+
+def test_hash_resource_changes_with_content(
+    computation_service: ComputationService, mock_org: Dict[str, Any]
+) -> None:
+    other = {**mock_org, "name": "Some other name"}
+
+    assert computation_service.hash_resource(
+        Organization.model_validate(mock_org)
+    ) != computation_service.hash_resource(Organization.model_validate(other))
+
+
+def test_hash_update_client_entry_does_not_modify_resource(
+    computation_service: ComputationService, mock_org_bundle_entry: Dict[str, Any]
+) -> None:
+    entry = create_bundle_entry(mock_org_bundle_entry)
+    assert entry.resource is not None
+    expected_id = entry.resource.id
+
+    actual = computation_service.hash_update_client_entry(entry)
+
+    assert actual is not None
+    assert len(actual) == 32
+    assert entry.resource.id == expected_id
+
+
+def test_hash_resource_is_the_same_across_processes(
+    computation_service: ComputationService, mock_org: Dict[str, Any]
+) -> None:
+    script = (
+        "from fhir.resources.R4B.organization import Organization;"
+        "from app.services.update.computation_service import ComputationService;"
+        "from tests.mock_data import organization;"
+        "print(ComputationService('example-directory-id').hash_resource("
+        "Organization.model_validate(organization)))"
+    )
+    digests = {
+        subprocess.run(
+            [sys.executable, "-c", script],
+            env={**os.environ, "PYTHONHASHSEED": seed},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        for seed in ("1", "2")
+    }
+
+    assert digests == {
+        computation_service.hash_resource(Organization.model_validate(mock_org))
+    }
+
+
+def test_get_update_status_compares_with_stored_content_hash(
+    computation_service: ComputationService,
+) -> None:
+    resource_map = ResourceMap(
+        directory_id="directory",
+        resource_type="Organization",
+        directory_resource_id="org",
+        update_client_resource_id="directory-org",
+        content_hash="abc",
+    )
+
+    assert (
+        computation_service.get_update_status(
+            method="PUT", directory_hash="abc", resource_map=resource_map
+        )
+        == "equal"
+    )
+    assert (
+        computation_service.get_update_status(
+            method="PUT", directory_hash="def", resource_map=resource_map
+        )
+        == "update"
+    )
+    assert (
+        computation_service.get_update_status(
+            method="DELETE", resource_map=resource_map
+        )
+        == "delete"
+    )
+
+
+@pytest.mark.parametrize(
+    "extra",
+    [
+        {},
+        {"telecom": None, "alias": [], "address": {"line": None}},
+        {"extension": [{"url": "http://example.org/opened", "valueInstant": "2024-01-01T08:00:00.000Z"}]},
+        {"extension": [{"url": "http://example.org/opened", "valueDateTime": "2024-01-01T09:00:00.12+01:00"}]},
+        {"hoursOfOperation": [{"openingTime": "08:00:00.000", "closingTime": "17:30:00"}]},
+    ],
+)
+def test_hash_is_the_same_for_raw_and_validated_resources(
+    computation_service: ComputationService, extra: Dict[str, Any]
+) -> None:
+    resource: Dict[str, Any] = {
+        "resourceType": "Location",
+        "id": "location-1",
+        "meta": {"lastUpdated": "2024-01-01T00:00:00Z"},
+        "name": "Some location",
+        "position": {"longitude": 4.9, "latitude": 52.37},
+        "hoursOfOperation": [{"openingTime": "08:00:00", "closingTime": "17:30:00"}],
+        "extension": [
+            {"url": "http://example.org/opened", "valueDateTime": "2024-01-01T08:00:00+01:00"}
+        ],
+        **extra,
+    }
+    raw_entry = {"resource": resource, "request": {"method": "PUT", "url": "Location/location-1"}}
+
+    expected = computation_service.hash_resource(Location.model_validate(resource))
+
+    assert computation_service.hash_directory_entry(RawBundleEntry(raw_entry)) == expected
+    assert computation_service.hash_directory_entry(create_bundle_entry(raw_entry)) == expected
+
+
+def test_hash_resource_changes_with_moment_in_time(computation_service: ComputationService) -> None:
+    def hash_with_opened(value: str) -> str:
+        return computation_service.hash_data(
+            {
+                "resourceType": "Location",
+                "extension": [{"url": "http://example.org/opened", "valueDateTime": value}],
+            }
+        )
+
+    assert hash_with_opened("2024-01-01T08:00:00.000Z") == hash_with_opened(
+        "2024-01-01T09:00:00+01:00"
+    )
+    assert hash_with_opened("2024-01-01T08:00:00Z") != hash_with_opened("2024-01-01T08:00:01Z")
+
+
+def test_hash_data_rejects_values_that_are_not_json(
+    computation_service: ComputationService,
+) -> None:
+    with pytest.raises(TypeError):
+        computation_service.hash_data(
+            {"resourceType": "Location", "period": {"start": datetime(2024, 1, 1)}}
+        )
@@ -0,0 +1,39 @@
+import pytest
+
+from app.models.fhir.types import McsdResources
+from app.services.update.dependency_scheduler import (
+    MCSD_RESOURCE_DEPENDENCIES,
+    create_stages,
+)
+
+
+def test_create_stages_contains_every_resource_type_once() -> None:
+    stages = create_stages()
+
+    flattened = [res for stage in stages for res in stage]
+    assert sorted(r.value for r in flattened) == sorted(r.value for r in McsdResources)
+
+
+def test_create_stages_orders_dependencies_first() -> None:
+    stages = create_stages()
+    stage_of = {res: idx for idx, stage in enumerate(stages) for res in stage}
+
+    for res, deps in MCSD_RESOURCE_DEPENDENCIES.items():
+        for dep in deps:
+            assert stage_of[dep] < stage_of[res]
+
+    assert stages[0] == [McsdResources.ORGANIZATION]
+    assert stages[-1] == [
+        McsdResources.ORGANIZATION_AFFILIATION,
+        McsdResources.PRACTITIONER_ROLE,
+    ]
+
+
+def test_create_stages_raises_on_circular_dependencies() -> None:
+    with pytest.raises(ValueError, match="Circular dependency"):
+        create_stages(
+            {
+                McsdResources.ORGANIZATION: {McsdResources.ENDPOINT},
+                McsdResources.ENDPOINT: {McsdResources.ORGANIZATION},
+            }
+        )
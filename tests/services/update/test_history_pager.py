@@ -0,0 +1,110 @@
+import threading
+from typing import Any, Dict, Generator, List
+from unittest.mock import MagicMock
+
+import pytest
+from app.models.fhir.raw_entry import RawBundleEntry
+from app.services.update.history_pager import iter_history_pages
+
+
+def _mock_api(page_count: int) -> MagicMock:
+    """
+    Returns an api that serves page_count pages, each page containing a single entry
+    with the page number as fullUrl.
+    """
+    api = MagicMock()
+
+    def get_history_batch(
+        resource_type: str, params: Dict[str, Any]
+    ) -> tuple[Dict[str, Any] | None, List[RawBundleEntry]]:
+        page = params["page"]
+        next_params = {"page": page + 1} if page + 1 < page_count else None
+        return next_params, [RawBundleEntry({"fullUrl": f"Organization/{page}"})]
+
+    def stream_history_batch(
+        resource_type: str, params: Dict[str, Any]
+    ) -> Generator[RawBundleEntry, None, Dict[str, Any] | None]:
+        next_params, entries = get_history_batch(resource_type, params)
+        yield from entries * 3
+        return next_params
+
+    api.get_history_batch.side_effect = get_history_batch
+    api.stream_history_batch.side_effect = stream_history_batch
+    return api
+
+
+@pytest.mark.parametrize("prefetch_depth", [0, 1, 3])
+def test_iter_history_pages_yields_all_pages_in_order(prefetch_depth: int) -> None:
+    api = _mock_api(page_count=5)
+
+    pages = list(iter_history_pages(api, "Organization", {"page": 0}, prefetch_depth))
+
+    assert [p[0].data["fullUrl"] for p in pages] == [f"Organization/{i}" for i in range(5)]
+    assert api.get_history_batch.call_count == 5
+
+
+@pytest.mark.parametrize("prefetch_depth", [0, 2])
+def test_iter_history_pages_streams_pages_in_windows(prefetch_depth: int) -> None:
+    api = _mock_api(page_count=3)
+
+    windows = list(
+        iter_history_pages(
+            api, "Organization", {"page": 0}, prefetch_depth, stream_window=2
+        )
+    )
+
+    # Every streamed page holds 3 entries, so it is split into a window of 2 and one of 1
+    assert [len(w) for w in windows] == [2, 1] * 3
+    assert [w[0].data["fullUrl"] for w in windows[::2]] == [
+        f"Organization/{i}" for i in range(3)
+    ]
+    assert api.stream_history_batch.call_count == 3
+    api.get_history_batch.assert_not_called()
+
+
+def test_iter_history_pages_without_params_fetches_nothing() -> None:
+    api = _mock_api(page_count=5)
+
+    assert list(iter_history_pages(api, "Organization", None, prefetch_depth=2)) == []
+    api.get_history_batch.assert_not_called()
+
+
+def test_iter_history_pages_applies_backpressure() -> None:
+    api = _mock_api(page_count=10)
+    fetched = threading.Semaphore(0)
+    side_effect = api.get_history_batch.side_effect
+
+    def counting_fetch(*args: Any) -> Any:
+        result = side_effect(*args)
+        fetched.release()
+        return result
+
+    api.get_history_batch.side_effect = counting_fetch
+    pages = iter_history_pages(api, "Organization", {"page": 0}, prefetch_depth=2)
+
+    next(pages)
+    # One page has been consumed, 2 are queued and 1 is waiting to be queued
+    for _ in range(4):
+        assert fetched.acquire(timeout=5)
+    assert not fetched.acquire(timeout=0.3)
+    assert api.get_history_batch.call_count == 4
+
+    pages.close()
+
+
+def test_iter_history_pages_raises_producer_errors() -> None:
+    api = _mock_api(page_count=5)
+    side_effect = api.get_history_batch.side_effect
+
+    def failing_fetch(resource_type: str, params: Dict[str, Any]) -> Any:
+        if params["page"] == 2:
+            raise ConnectionError("directory unavailable")
+        return side_effect(resource_type, params)
+
+    api.get_history_batch.side_effect = failing_fetch
+    pages = iter_history_pages(api, "Organization", {"page": 0}, prefetch_depth=2)
+
+    assert next(pages)[0].data["fullUrl"] == "Organization/0"
+    assert next(pages)[0].data["fullUrl"] == "Organization/1"
+    with pytest.raises(ConnectionError, match="directory unavailable"):
+        next(pages)
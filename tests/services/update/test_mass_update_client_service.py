@@ -1,6 +1,9 @@
+import threading
+from typing import Any
 from unittest.mock import MagicMock
 from datetime import datetime, timedelta
 import pytest
+from app.models.directory.dto import DirectoryDto
 from app.services.entity.directory_info_service import DirectoryInfoService
 from app.services.update.mass_update_client_service import MassUpdateClientService
 from app.stats import NoopStats
@@ -291,3 +294,116 @@ def test_cleanup_old_directories_mixed_scenarios(
     )  # Added to the to be deleted list because it was very old
 
     mock_update_client_service.cleanup.assert_called_once_with("lrza_deleted_directory")
+
+
+def test_update_all_isolates_failing_directories(
+    mass_update_client_service: MassUpdateClientService,
+    mock_update_client_service: MagicMock,
+    mock_directory_provider: MagicMock,
+    directory_info_service: DirectoryInfoService,
+) -> None:
+    for directory_id in ["ok_directory", "failing_directory"]:
+        directory_info_service.create(
+            directory_id=directory_id,
+            endpoint_address=f"https://example.com/{directory_id}",
+            ura="12345678",
+        )
+    mock_directory_provider.get_all_directories.return_value = [
+        directory_info_service.get_one_by_id("failing_directory"),
+        directory_info_service.get_one_by_id("ok_directory"),
+    ]
+
+    def update(directory: DirectoryDto, *_args: Any) -> dict[str, Any]:
+        if directory.id == "failing_directory":
+            raise Exception("directory unavailable")
+        return {"directory_id": directory.id}
+
+    mock_update_client_service.update.side_effect = update
+
+    results = mass_update_client_service.update_all()
+
+    assert results == [{"directory_id": "ok_directory"}]
+    failing = directory_info_service.get_one_by_id("failing_directory")
+    assert failing.failed_attempts == 1
+    assert failing.failed_sync_count == 1
+    ok = directory_info_service.get_one_by_id("ok_directory")
+    assert ok.failed_attempts == 0
+    assert ok.last_success_sync is not None
+
+
+def test_update_all_runs_directories_concurrently(
+    mock_update_client_service: MagicMock,
+    mock_directory_provider: MagicMock,
+) -> None:
+    directories = [
+        DirectoryDto(id=f"dir-{i}", ura="12345678", endpoint_address=f"https://example.com/{i}")
+        for i in range(4)
+    ]
+    mock_directory_provider.get_all_directories.return_value = directories
+    mock_directory_info_service = MagicMock()
+    barrier = threading.Barrier(len(directories), timeout=5)
+
+    def update(directory: DirectoryDto, *_args: Any) -> dict[str, Any]:
+        # Only passes when all directories are being updated at the same time
+        barrier.wait()
+        return {"directory_id": directory.id}
+
+    mock_update_client_service.update.side_effect = update
+    service = MassUpdateClientService(
+        update_client_service=mock_update_client_service,
+        directory_provider=mock_directory_provider,
+        directory_info_service=mock_directory_info_service,
+        mark_client_directory_as_deleted_after_success_timeout_seconds=7200,
+        stats=NoopStats(),
+        mark_client_directory_as_deleted_after_lrza_delete=True,
+        ignore_client_directory_after_success_timeout_seconds=3600,
+        ignore_client_directory_after_failed_attempts_threshold=5,
+        max_parallel_directories=len(directories),
+    )
+
+    results = service.update_all()
+
+    assert results == [{"directory_id": d.id} for d in directories]
+    assert mock_update_client_service.update.call_count == len(directories)
+
+
+def test_update_all_continues_when_recording_a_failure_fails(
+    mock_update_client_service: MagicMock,
+    mock_directory_provider: MagicMock,
+) -> None:
+    directories = [
+        DirectoryDto(id=f"dir-{i}", ura="12345678", endpoint_address=f"https://example.com/{i}")
+        for i in range(3)
+    ]
+    mock_directory_provider.get_all_directories.return_value = directories
+    mock_directory_info_service = MagicMock()
+
+    def update(directory: DirectoryDto, *_args: Any) -> dict[str, Any]:
+        if directory.id == "dir-0":
+            raise Exception("directory unavailable")
+        return {"directory_id": directory.id}
+
+    def update_info(directory_id: str, **kwargs: Any) -> None:
+        if "failed_attempts" in kwargs and kwargs["failed_attempts"] != 0:
+            raise Exception("database unavailable")
+
+    mock_update_client_service.update.side_effect = update
+    mock_directory_info_service.get_one_by_id.side_effect = lambda directory_id: DirectoryDto(
+        id=directory_id, ura="12345678", endpoint_address="https://example.com"
+    )
+    mock_directory_info_service.update.side_effect = update_info
+    service = MassUpdateClientService(
+        update_client_service=mock_update_client_service,
+        directory_provider=mock_directory_provider,
+        directory_info_service=mock_directory_info_service,
+        mark_client_directory_as_deleted_after_success_timeout_seconds=7200,
+        stats=NoopStats(),
+        mark_client_directory_as_deleted_after_lrza_delete=True,
+        ignore_client_directory_after_success_timeout_seconds=3600,
+        ignore_client_directory_after_failed_attempts_threshold=5,
+        max_parallel_directories=len(directories),
+    )
+
+    results = service.update_all()
+
+    assert results == [{"directory_id": "dir-1"}, {"directory_id": "dir-2"}]
@@ -0,0 +1,92 @@
+from app.models.adjacency.node import NodeReference
+from app.models.resource_map.dto import ResourceMapDto
+from app.services.entity.resource_map_service import ResourceMapService
+from app.models.fhir.raw_entry import RawBundleEntry
+from app.services.fhir.bundle.utils import HistoryVersionIndex
+from app.services.update.computation_service import DELETED_CONTENT_HASH
+from app.services.update.node_state import NodeStateStore
+
+DIRECTORY_ID = "example-directory"
+
+
+def _add_resource_map(
+    resource_map_service: ResourceMapService,
+    res_id: str,
+    content_hash: str | None = "hash",
+    version_id: str | None = "1",
+) -> None:
+    resource_map_service.upsert_many(
+        [
+            ResourceMapDto(
+                directory_id=DIRECTORY_ID,
+                resource_type="Organization",
+                directory_resource_id=res_id,
+                update_client_resource_id=f"{DIRECTORY_ID}-{res_id}",
+                content_hash=content_hash,
+                directory_version_id=version_id,
+            )
+        ]
+    )
+
+
+def _history_entry(res_id: str, version_id: str) -> RawBundleEntry:
+    return RawBundleEntry(
+        {
+            "resource": {
+                "resourceType": "Organization",
+                "id": res_id,
+                "meta": {"versionId": version_id},
+            },
+            "request": {"method": "PUT", "url": f"Organization/{res_id}"},
+        }
+    )
+
+
+def _ref(res_id: str) -> NodeReference:
+    return NodeReference(id=res_id, resource_type="Organization")
+
+
+def test_resolve_should_only_resolve_completed_resource_types(
+    resource_map_service: ResourceMapService,
+) -> None:
+    _add_resource_map(resource_map_service, "org-1")
+    node_state = NodeStateStore(DIRECTORY_ID, resource_map_service, HistoryVersionIndex())
+
+    assert node_state.resolve([_ref("org-1")]) == []
+
+    node_state.complete_resource_type("Organization")
+    actual = node_state.resolve([_ref("org-1")])
+
+    assert len(actual) == 1
+    assert actual[0].resource_id == "org-1"
+    assert actual[0].status == "equal"
+    assert actual[0].updated is True
+    assert actual[0].directory_hash == actual[0].update_client_hash == "hash"
+
+
+def test_resolve_should_skip_unknown_and_deleted_resources(
+    resource_map_service: ResourceMapService,
+) -> None:
+    _add_resource_map(resource_map_service, "org-legacy", content_hash=None)
+    _add_resource_map(resource_map_service, "org-deleted", content_hash=DELETED_CONTENT_HASH)
+    node_state = NodeStateStore(DIRECTORY_ID, resource_map_service, HistoryVersionIndex())
+    node_state.complete_resource_type("Organization")
+
+    refs = [_ref("org-unknown"), _ref("org-legacy"), _ref("org-deleted")]
+    assert node_state.resolve(refs) == []
+
+
+def test_resolve_should_be_invalidated_by_newer_history_version(
+    resource_map_service: ResourceMapService,
+) -> None:
+    _add_resource_map(resource_map_service, "org-stored", version_id="2")
+    _add_resource_map(resource_map_service, "org-stale", version_id="1")
+    version_index = HistoryVersionIndex()
+    version_index.add(_history_entry("org-stored", "2"))
+    version_index.add(_history_entry("org-stale", "2"))
+    node_state = NodeStateStore(DIRECTORY_ID, resource_map_service, version_index)
+    node_state.complete_resource_type("Organization")
+
+    actual = node_state.resolve([_ref("org-stored"), _ref("org-stale")])
+
+    assert [node.resource_id for node in actual] == ["org-stored"]
@@ -1,5 +1,8 @@
+import asyncio
+import json
+import threading
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from types import SimpleNamespace
 from typing import Any, Dict
 from unittest.mock import ANY, MagicMock, patch
@@ -9,18 +12,22 @@ from app.config import ConfigExternalCache
 from app.db.entities.resource_map import ResourceMap
 from app.models.adjacency.node import Node
 from app.models.directory.dto import DirectoryDto
-from app.models.fhir.types import McsdResources
+from app.models.fhir.types import BundleError, McsdResources
 from app.models.resource_map.dto import (
     ResourceMapDeleteDto,
     ResourceMapDto,
     ResourceMapUpdateDto,
 )
 from app.services.api.authenticators.null_authenticator import NullAuthenticator
+from app.services.api.async_fhir_api import AsyncFhirApi
 from app.services.api.fhir_api import FhirApiConfig
 from app.services.entity.resource_map_service import ResourceMapService
+from app.services.fhir.bundle.utils import HistoryVersionIndex
 from app.services.fhir.fhir_service import FhirService
+from app.services.update.bundle_packer import BundleBatch
 from app.services.update.cache.in_memory import InMemoryCachingService
 from app.services.update.cache.provider import CacheProvider
+from app.services.update.node_state import NodeStateStore
 from app.services.update.update_client_service import (
     UpdateClientService,
     UpdateClientException,
@@ -48,6 +55,7 @@ def _node(  # type: ignore[no-untyped-def]
             self.resource_type = resource_type
             self.status = status
             self.updated = updated
+            self.visited = False
             self.update_data = SimpleNamespace(
                 bundle_entry=bundle_entry,
                 resource_map_dto=dto,
@@ -89,8 +97,8 @@ def directory_dto() -> DirectoryDto:
     )
 
 @pytest.fixture
-def update_client_service(resource_map_service: MagicMock) -> UpdateClientService:
-    api_config = FhirApiConfig(
+def api_config() -> FhirApiConfig:
+    return FhirApiConfig(
         base_url="https://example.com",
         fill_required_fields=False,
         timeout=30,
@@ -102,10 +110,30 @@ def update_client_service(resource_map_service: MagicMock) -> UpdateClientServic
         mtls_key=None,
         verify_ca=True,
     )
+
+
+@pytest.fixture
+def update_client_service(
+    api_config: FhirApiConfig, resource_map_service: MagicMock
+) -> UpdateClientService:
+    return UpdateClientService(
+        api_config=api_config,
+        resource_map_service=resource_map_service,
+        cache_provider=CacheProvider(config=ConfigExternalCache()),
+        resource_type_delay=0,
+    )
+
+
+@pytest.fixture
+def verifying_update_client_service(
+    api_config: FhirApiConfig, resource_map_service: MagicMock
+) -> UpdateClientService:
     return UpdateClientService(
         api_config=api_config,
         resource_map_service=resource_map_service,
         cache_provider=CacheProvider(config=ConfigExternalCache()),
+        verify_update_client=True,
+        resource_type_delay=0,
     )
 
 
@@ -148,11 +176,9 @@ def test_cleanup_per_resource_type_finds_and_deletes_resource_map_items(
     ]
     mock_do_request.return_value = MagicMock(
         status_code=200,
-        json=MagicMock(
-            return_value=Bundle(
-                id="abc132", type="transaction", entry=[], total=0
-            ).model_dump()
-        ),
+        content=Bundle(
+            id="abc132", type="transaction", entry=[], total=0
+        ).model_dump_json().encode(),
     )
     update_client_service._UpdateClientService__cleanup_resource_type("directory_1", McsdResources.ENDPOINT)  # type: ignore[attr-defined]
     resource_map_service.find.assert_called_once_with(
@@ -172,30 +198,27 @@ def test_cleanup_per_resource_type_finds_and_deletes_resource_map_items(
             directory_resource_id="dir_res_2",
         )
     )
-    mock_do_request.assert_called_once_with(
-        ANY,
-        "POST",
-        json={
-            "resourceType": "Bundle",
-            "id": "638bdbfa-8658-4f29-b0e7-5abdada97067",
-            "type": "transaction",
-            "total": 2,
-            "entry": [
-                {
-                    "request": {
-                        "method": "DELETE",
-                        "url": "Endpoint/update_res_1?_cascade=delete",
-                    }
-                },
-                {
-                    "request": {
-                        "method": "DELETE",
-                        "url": "Endpoint/update_res_2?_cascade=delete",
-                    }
-                },
-            ],
-        },
-    )
+    mock_do_request.assert_called_once_with(ANY, "POST", content=ANY)
+    assert json.loads(mock_do_request.call_args.kwargs["content"]) == {
+        "resourceType": "Bundle",
+        "id": "638bdbfa-8658-4f29-b0e7-5abdada97067",
+        "type": "transaction",
+        "total": 2,
+        "entry": [
+            {
+                "request": {
+                    "method": "DELETE",
+                    "url": "Endpoint/update_res_1?_cascade=delete",
+                }
+            },
+            {
+                "request": {
+                    "method": "DELETE",
+                    "url": "Endpoint/update_res_2?_cascade=delete",
+                }
+            },
+        ],
+    }
 
 
 @patch("app.services.api.api_service.HttpService.do_request", autospec=True)
@@ -219,11 +242,9 @@ def test_cleanup_with_more_than_hundred_items_creates_max_size_bundles(
     ]
     mock_do_request.return_value = MagicMock(
         status_code=200,
-        json=MagicMock(
-            return_value=Bundle(
-                id="abc132", type="transaction", entry=[], total=0
-            ).model_dump()
-        ),
+        content=Bundle(
+            id="abc132", type="transaction", entry=[], total=0
+        ).model_dump_json().encode(),
     )
     update_client_service._UpdateClientService__cleanup_resource_type("directory_1", McsdResources.ENDPOINT)  # type: ignore[attr-defined]
     resource_map_service.find.assert_called_once_with(
@@ -237,44 +258,39 @@ def test_cleanup_with_more_than_hundred_items_creates_max_size_bundles(
                 directory_resource_id=f"dir_res_{x}",
             )
         )
-    mock_do_request.assert_any_call(
-        ANY,
-        "POST",
-        json={
-            "resourceType": "Bundle",
-            "id": "638bdbfa-8658-4f29-b0e7-5abdada97067",
-            "type": "transaction",
-            "total": 100,
-            "entry": [
-                {
-                    "request": {
-                        "method": "DELETE",
-                        "url": f"Endpoint/update_res_{x}?_cascade=delete",
-                    }
+    bodies = [
+        json.loads(call.kwargs["content"]) for call in mock_do_request.call_args_list
+    ]
+    assert {
+        "resourceType": "Bundle",
+        "id": "638bdbfa-8658-4f29-b0e7-5abdada97067",
+        "type": "transaction",
+        "total": 100,
+        "entry": [
+            {
+                "request": {
+                    "method": "DELETE",
+                    "url": f"Endpoint/update_res_{x}?_cascade=delete",
                 }
-                for x in range(100)
-            ],
-        },
-    )
-    mock_do_request.assert_any_call(
-        ANY,
-        "POST",
-        json={
-            "resourceType": "Bundle",
-            "id": "638bdbfa-8658-4f29-b0e7-5abdada97067",
-            "type": "transaction",
-            "total": 50,
-            "entry": [
-                {
-                    "request": {
-                        "method": "DELETE",
-                        "url": f"Endpoint/update_res_{x}?_cascade=delete",
-                    }
+            }
+            for x in range(100)
+        ],
+    } in bodies
+    assert {
+        "resourceType": "Bundle",
+        "id": "638bdbfa-8658-4f29-b0e7-5abdada97067",
+        "type": "transaction",
+        "total": 50,
+        "entry": [
+            {
+                "request": {
+                    "method": "DELETE",
+                    "url": f"Endpoint/update_res_{x}?_cascade=delete",
                 }
-                for x in range(100, 150)
-            ],
-        },
-    )
+            }
+            for x in range(100, 150)
+        ],
+    } in bodies
 
 
 @patch("app.services.update.update_client_service.UpdateClientService.update_resource")
@@ -333,11 +349,9 @@ def test_update_resource_requests_history_batch(
 
     mock_do_request.return_value = MagicMock(
         status_code=200,
-        json=MagicMock(
-            return_value=Bundle(
-                id="abc132", type="transaction", entry=[], total=0
-            ).model_dump()
-        ),
+        content=Bundle(
+            id="abc132", type="transaction", entry=[], total=0
+        ).model_dump_json().encode(),
     )
     update_client_service.update_resource(
         directory_dto, McsdResources.ENDPOINT.value, in_memory_cache_service, since
@@ -353,10 +367,10 @@ def test_update_resource_requests_history_batch(
     )
 
 
-@patch("app.services.api.api_service.request", autospec=True)
+@patch("requests.Session.request")
 def test_update_requests_resources(
     mock_request: MagicMock,
-    update_client_service: UpdateClientService,
+    verifying_update_client_service: UpdateClientService,
     directory_dto: DirectoryDto,
     mock_org_history_bundle: Dict[str, Any],
     mock_ep: Dict[str, Any],
@@ -368,22 +382,16 @@ def test_update_requests_resources(
         if f"{McsdResources.ORGANIZATION.value}/_history" in kwargs.get("url", ""):
             return MagicMock(
                 status_code=200,
-                json=MagicMock(
-                    return_value=fhir_service.create_bundle(
-                        mock_org_history_bundle
-                    ).model_dump()
-                ),
+                content=fhir_service.create_bundle(mock_org_history_bundle)
+                .model_dump_json()
+                .encode(),
             )
         if kwargs.get("method") == "GET":
             return MagicMock(
                 status_code=200,
-                json=MagicMock(
-                    return_value={
-                        "resourceType": "Bundle",
-                        "type": "batch",
-                        "entry": [],
-                    }
-                ),
+                content=json.dumps(
+                    {"resourceType": "Bundle", "type": "batch", "entry": []}
+                ).encode(),
             )
         if (
             kwargs.get("method") == "POST"
@@ -391,18 +399,14 @@ def test_update_requests_resources(
         ):
             return MagicMock(
                 status_code=200,
-                json=MagicMock(
-                    return_value={
-                        "resourceType": "Bundle",
-                        "type": "batch",
-                        "entry": [],
-                    }
-                ),
+                content=json.dumps(
+                    {"resourceType": "Bundle", "type": "batch", "entry": []}
+                ).encode(),
             )
         if (
             kwargs.get("method") == "POST"
             and kwargs.get("url") == "https://example.com/directory"
-            and kwargs.get("json", {})
+            and json.loads(kwargs.get("data") or "{}")
             .get("entry", [{}])[0]
             .get("request", {})
             .get("url")
@@ -410,8 +414,8 @@ def test_update_requests_resources(
         ):
             return MagicMock(
                 status_code=200,
-                json=MagicMock(
-                    return_value={
+                content=json.dumps(
+                    {
                         "resourceType": "Bundle",
                         "type": "batch",
                         "entry": [
@@ -432,12 +436,12 @@ def test_update_requests_resources(
                             }
                         ],
                     }
-                ),
+                ).encode(),
             )
         assert False, f"Should not reach here: {args}, {kwargs}"
 
     mock_request.side_effect = mock_request_side_effect
-    update_client_service.update(directory_dto, since)
+    verifying_update_client_service.update(directory_dto, since)
 
     for res_type in McsdResources:
         mock_request.assert_any_call(
@@ -446,6 +450,8 @@ def test_update_requests_resources(
             headers=ANY,
             timeout=ANY,
             json=ANY,
+            data=ANY,
+            stream=ANY,
             cert=ANY,
             verify=ANY,
             auth=ANY,
@@ -456,39 +462,53 @@ def test_update_requests_resources(
         url="https://example.com",
         headers=ANY,
         timeout=ANY,
-        json={
-            "resourceType": "Bundle",
-            "type": "batch",
-            "entry": [
-                {
-                    "request": {
-                        "method": "GET",
-                        "url": "/Organization/1-org-id/_history",
-                    }
-                },
-                {"request": {"method": "GET", "url": "/Endpoint/1-ep-id/_history"}},
-            ],
-        },
+        json=None,
+        data=ANY,
+        stream=False,
         cert=ANY,
         verify=ANY,
         auth=ANY,
     )
+    assert {
+        "resourceType": "Bundle",
+        "type": "batch",
+        "entry": [
+            {
+                "request": {
+                    "method": "GET",
+                    "url": "/Organization/1-org-id/_history",
+                }
+            },
+            {"request": {"method": "GET", "url": "/Endpoint/1-ep-id/_history"}},
+        ],
+    } in [
+        json.loads(call.kwargs["data"])
+        for call in mock_request.call_args_list
+        if call.kwargs["url"] == "https://example.com"
+    ]
     mock_request.assert_any_call(
         method="POST",
         url="https://example.com/directory",
         headers=ANY,
         timeout=ANY,
-        json={
-            "resourceType": "Bundle",
-            "type": "batch",
-            "entry": [
-                {"request": {"method": "GET", "url": "/Endpoint/ep-id/_history"}}
-            ],
-        },
+        json=None,
+        data=ANY,
+        stream=False,
         cert=ANY,
         verify=ANY,
         auth=ANY,
     )
+    assert {
+        "resourceType": "Bundle",
+        "type": "batch",
+        "entry": [
+            {"request": {"method": "GET", "url": "/Endpoint/ep-id/_history"}}
+        ],
+    } in [
+        json.loads(call.kwargs["data"])
+        for call in mock_request.call_args_list
+        if call.kwargs["url"] == "https://example.com/directory"
+    ]
 
 
 def test_flush_delete_bundle_noop_when_total_zero(
@@ -571,8 +591,7 @@ def test_update_with_bundle_posts_bundle_handles_dtos_and_marks_updated(
     assert request_url is not None
     assert request_url.endswith("Organization/A")
 
-    resource_map_service.add_one.assert_called_once_with(add_dto)
-    resource_map_service.update_one.assert_called_once_with(upd_dto)
+    resource_map_service.upsert_many.assert_called_once_with([add_dto, upd_dto])
 
     assert all(n.updated for n in out)
 
@@ -581,7 +600,10 @@ def test_update_with_bundle_raises_when_api_returns_errors(
     update_client_service: UpdateClientService, monkeypatch: Any
 ) -> None:
     def bad_post(bundle: Bundle) -> tuple[list[Bundle], list[Any]]:
-        return [], ["err1", "err2"]
+        return [], [
+            BundleError(entry=0, status=400, severity="error", code="invalid", diagnostics=None),
+            BundleError(entry=0, status=400, severity="fatal", code="invalid", diagnostics=None),
+        ]
 
     monkeypatch.setattr(
         update_client_service,
@@ -636,19 +658,19 @@ def test_update_page_builds_groups_and_skips_updated(
 
     called = {}
 
-    def fake_update_with_bundle(nodes: list[Node]) -> list[Node]:
-        for n in nodes:
+    def fake_update_with_batch(batch: BundleBatch) -> list[Node]:
+        for n in batch.nodes:
             n.updated = True
-        called["args"] = nodes
-        return nodes
+        called["args"] = batch.groups
+        return batch.nodes
 
     monkeypatch.setattr(
-        update_client_service, "update_with_bundle", fake_update_with_bundle
+        update_client_service, "update_with_batch", fake_update_with_batch
     )
 
     updated_nodes = update_client_service.update_page(entries, fake_adjsvc)
 
-    assert called["args"] == [n_fresh]
+    assert called["args"] == [[n_fresh]]
     assert updated_nodes == [n_fresh]
     assert n_fresh.updated is True
     assert n_updated.updated is True
@@ -661,7 +683,7 @@ def test_update_invokes_update_resource_for_all_resource_types(
     directory_dto: DirectoryDto,
     monkeypatch: Any,
 ) -> None:
-    fake_cache = SimpleNamespace(keys=lambda: [], clear=lambda: None)
+    fake_cache = SimpleNamespace(keys=lambda: [], clear=lambda: None, get_stats=lambda: {})
     monkeypatch.setattr(
         update_client_service,
         "_UpdateClientService__cache_provider",
@@ -681,4 +703,276 @@ def test_update_invokes_update_resource_for_all_resource_types(
             fake_cache,
             None,
             None,
+            ANY,
+            None,
         )
+
+    # All resource types of a sync share a single version index
+    version_indexes = {id(call.args[-2]) for call in mock_update_resource.call_args_list}
+    assert len(version_indexes) == 1
+    assert isinstance(mock_update_resource.call_args.args[-2], HistoryVersionIndex)
+
+
+@patch.object(UpdateClientService, "update_resource", autospec=True)
+def test_update_shares_node_state_between_resource_types_when_enabled(
+    mock_update_resource: Any,
+    update_client_service: UpdateClientService,
+    directory_dto: DirectoryDto,
+    monkeypatch: Any,
+) -> None:
+    fake_cache = SimpleNamespace(keys=lambda: [], clear=lambda: None, get_stats=lambda: {})
+    monkeypatch.setattr(
+        update_client_service,
+        "_UpdateClientService__cache_provider",
+        SimpleNamespace(create=lambda: fake_cache),
+    )
+    monkeypatch.setattr(update_client_service, "_UpdateClientService__persistent_node_state", True)
+
+    update_client_service.update(directory_dto)
+
+    node_states = {id(call.args[-1]) for call in mock_update_resource.call_args_list}
+    assert len(node_states) == 1
+    assert isinstance(mock_update_resource.call_args.args[-1], NodeStateStore)
+
+
+@pytest.mark.parametrize(
+    "since,expected",
+    [
+        (None, NodeStateStore),
+        (datetime(2024, 1, 1, tzinfo=timezone.utc), NodeStateStore),
+        (datetime(2024, 1, 3, tzinfo=timezone.utc), type(None)),
+    ],
+)
+@patch.object(UpdateClientService, "update_resource", autospec=True)
+def test_update_only_uses_node_state_when_history_covers_last_sync(
+    mock_update_resource: Any,
+    since: datetime | None,
+    expected: type,
+    update_client_service: UpdateClientService,
+    directory_dto: DirectoryDto,
+    monkeypatch: Any,
+) -> None:
+    fake_cache = SimpleNamespace(keys=lambda: [], clear=lambda: None, get_stats=lambda: {})
+    monkeypatch.setattr(
+        update_client_service,
+        "_UpdateClientService__cache_provider",
+        SimpleNamespace(create=lambda: fake_cache),
+    )
+    monkeypatch.setattr(update_client_service, "_UpdateClientService__persistent_node_state", True)
+    directory = directory_dto.model_copy(
+        update={"last_success_sync": datetime(2024, 1, 2, tzinfo=timezone.utc)}
+    )
+
+    update_client_service.update(directory, since)
+
+    assert isinstance(mock_update_resource.call_args.args[-1], expected)
+
+
+def test_update_runs_independent_resource_types_in_parallel(
+    resource_map_service: MagicMock,
+    directory_dto: DirectoryDto,
+    monkeypatch: Any,
+) -> None:
+    service = UpdateClientService(
+        api_config=FhirApiConfig(
+            base_url="https://example.com",
+            fill_required_fields=False,
+            timeout=30,
+            backoff=0.1,
+            retries=5,
+            request_count=3,
+            auth=NullAuthenticator(),
+            mtls_cert=None,
+            mtls_key=None,
+            verify_ca=True,
+        ),
+        resource_map_service=resource_map_service,
+        cache_provider=CacheProvider(config=ConfigExternalCache()),
+        max_parallel_resource_types=2,
+        resource_type_delay=0,
+    )
+    fake_cache = SimpleNamespace(keys=lambda: [], clear=lambda: None, get_stats=lambda: {})
+    monkeypatch.setattr(
+        service,
+        "_UpdateClientService__cache_provider",
+        SimpleNamespace(create=lambda: fake_cache),
+    )
+
+    # PractitionerRole and OrganizationAffiliation are in the same stage, so they
+    # can only pass the barrier when they are updated at the same time.
+    barrier = threading.Barrier(2, timeout=5)
+    order: list[str] = []
+
+    def fake_update_resource(
+        directory: DirectoryDto, resource_type: str, *_args: Any
+    ) -> None:
+        if resource_type in (
+            McsdResources.PRACTITIONER_ROLE.value,
+            McsdResources.ORGANIZATION_AFFILIATION.value,
+        ):
+            barrier.wait()
+        order.append(resource_type)
+
+    monkeypatch.setattr(service, "update_resource", fake_update_resource)
+
+    result = service.update(directory_dto)
+
+    assert "log" in result
+    assert order[0] == McsdResources.ORGANIZATION.value
+    assert set(order[-2:]) == {
+        McsdResources.PRACTITIONER_ROLE.value,
+        McsdResources.ORGANIZATION_AFFILIATION.value,
+    }
+
+
+@pytest.mark.parametrize(
+    "requests_per_second,expected_pauses", [(0, len(McsdResources)), (2, 0)]
+)
+def test_update_pauses_after_every_resource_type_without_rate_limit(
+    resource_map_service: MagicMock,
+    directory_dto: DirectoryDto,
+    monkeypatch: Any,
+    requests_per_second: float,
+    expected_pauses: int,
+) -> None:
+    service = UpdateClientService(
+        api_config=FhirApiConfig(
+            base_url="https://example.com",
+            fill_required_fields=False,
+            timeout=30,
+            backoff=0.1,
+            retries=5,
+            request_count=3,
+            auth=NullAuthenticator(),
+            mtls_cert=None,
+            mtls_key=None,
+            verify_ca=True,
+        ),
+        resource_map_service=resource_map_service,
+        cache_provider=CacheProvider(config=ConfigExternalCache()),
+        directory_requests_per_second=requests_per_second,
+    )
+    fake_cache = SimpleNamespace(keys=lambda: [], clear=lambda: None, get_stats=lambda: {})
+    monkeypatch.setattr(
+        service,
+        "_UpdateClientService__cache_provider",
+        SimpleNamespace(create=lambda: fake_cache),
+    )
+    monkeypatch.setattr(service, "update_resource", MagicMock())
+
+    with patch("app.services.update.update_client_service.time.sleep") as mock_sleep:
+        service.update(directory_dto)
+
+    assert mock_sleep.call_count == expected_pauses
+    for call in mock_sleep.call_args_list:
+        assert call.args == (0.5,)
+
+
+@patch.object(UpdateClientService, "update_resource_async", autospec=True)
+def test_update_async_invokes_update_resource_async_for_all_resource_types(
+    mock_update_resource_async: Any,
+    update_client_service: UpdateClientService,
+    directory_dto: DirectoryDto,
+    monkeypatch: Any,
+) -> None:
+    fake_cache = SimpleNamespace(keys=lambda: [], clear=lambda: None, get_stats=lambda: {})
+    monkeypatch.setattr(
+        update_client_service,
+        "_UpdateClientService__cache_provider",
+        SimpleNamespace(create=lambda: fake_cache),
+    )
+
+    result = asyncio.run(update_client_service.update_async(directory_dto))
+
+    assert result["log"] == "updated 0"
+    assert mock_update_resource_async.await_count == len(McsdResources)
+    called_types = [c.args[2] for c in mock_update_resource_async.await_args_list]
+    assert called_types[0] == McsdResources.ORGANIZATION.value
+    assert set(called_types) == {res.value for res in McsdResources}
+
+
+@patch("app.services.api.async_fhir_api.AsyncFhirApi.get_history_batch", autospec=True)
+@patch.object(UpdateClientService, "update_page", autospec=True)
+def test_update_resource_async_processes_all_pages(
+    mock_update_page: MagicMock,
+    mock_get_history_batch: MagicMock,
+    update_client_service: UpdateClientService,
+    in_memory_cache_service: InMemoryCachingService,
+    directory_dto: DirectoryDto,
+) -> None:
+    first_page = [_be("Organization/1")]
+    second_page = [_be("Organization/2")]
+    mock_get_history_batch.side_effect = [
+        ({"_page": "2"}, first_page),
+        (None, second_page),
+    ]
+    mock_update_page.return_value = []
+
+    async def run() -> None:
+        async with AsyncFhirApi(update_client_service.api_config) as directory_api:
+            await update_client_service.update_resource_async(
+                directory_dto,
+                McsdResources.ORGANIZATION.value,
+                directory_api,
+                in_memory_cache_service,
+            )
+
+    asyncio.run(run())
+
+    assert mock_get_history_batch.call_count == 2
+    assert mock_get_history_batch.call_args_list[1].args[1:] == (
+        McsdResources.ORGANIZATION.value,
+        {"_page": "2"},
+    )
+    assert [c.args[1] for c in mock_update_page.call_args_list] == [first_page, second_page]
+
+
+def test_update_page_combines_independent_groups_into_one_bundle(
+    resource_map_service: MagicMock,
+    monkeypatch: Any,
+) -> None:
+    service = UpdateClientService(
+        api_config=FhirApiConfig(
+            base_url="https://example.com",
+            fill_required_fields=False,
+            timeout=30,
+            backoff=0.1,
+            retries=5,
+            request_count=3,
+            auth=NullAuthenticator(),
+            mtls_cert=None,
+            mtls_key=None,
+            verify_ca=True,
+        ),
+        resource_map_service=resource_map_service,
+        cache_provider=CacheProvider(config=ConfigExternalCache()),
+        max_bundle_entries=2,
+    )
+    posted: list[Bundle] = []
+
+    def ok_post(bundle: Bundle) -> tuple[list[Bundle], list[Any]]:
+        posted.append(bundle)
+        return [], []
+
+    monkeypatch.setattr(
+        service,
+        "_UpdateClientService__update_client_fhir_api",
+        SimpleNamespace(post_bundle=ok_post),
+    )
+    nodes = [_node(rid, bundle_entry=_be(f"Organization/{rid}")) for rid in "ABC"]
+
+    class FakeAdjMap:
+        def __init__(self) -> None:
+            self.data = {n.resource_id: n for n in nodes}
+
+        def get_group(self, node: Node) -> list[Node]:
+            return [node]
+
+    fake_adjsvc = MagicMock()
+    fake_adjsvc.build_adjacency_map.return_value = FakeAdjMap()
+
+    updated = service.update_page([BundleEntry()], fake_adjsvc)
+
+    assert updated == nodes
+    assert [len(b.entry or []) for b in posted] == [2, 1]
+    assert resource_map_service.upsert_many.call_count == 2
@@ -14,6 +14,7 @@ from app.models.adjacency.node import (
     NodeUpdateData,
 )
 from app.models.fhir.types import McsdResources
+from app.models.fhir.raw_entry import RawBundleEntry
 from app.services.fhir.fhir_service import FhirService
 import numpy as np
 from app.container import get_database
@@ -118,9 +119,10 @@ def create_mock_node(
     bundle_entry: BundleEntry,
     node_refs: List[NodeReference],
     fhir_service: FhirService,
-    directory_hash: int | None = None,
-    update_client_hash: int | None = None,
+    directory_hash: str | None = None,
+    update_client_hash: str | None = None,
     node_update_data: NodeUpdateData | None = None,
+    directory_payload: Dict[str, Any] | None = None,
 ) -> Node:
     """
     Helper function to create mock nodes
@@ -133,7 +135,8 @@ def create_mock_node(
         resource_type=res_type,
         references=node_refs,
         method=method,
-        directory_entry=bundle_entry,
+        directory_entry=RawBundleEntry.from_bundle_entry(bundle_entry),
+        directory_payload=directory_payload,
         directory_hash=directory_hash,
         update_client_hash=update_client_hash,
         update_data=node_update_data,